@@ -0,0 +1,179 @@
+import asyncio
+import json
+import time
+from collections import deque
+from typing import Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+metrics.describe("concurrency_limit", "Límite actual de peticiones concurrentes hacia la BD")
+metrics.describe("concurrency_in_flight", "Peticiones en curso dentro del límite")
+metrics.describe("concurrency_queue_depth", "Peticiones esperando un lugar")
+metrics.describe("concurrency_shed_total", "Peticiones rechazadas con 503")
+
+
+class AIMDLimiter:
+    """
+    Límite de concurrencia adaptativo (incremento aditivo, reducción multiplicativa).
+    Si la latencia supera el objetivo o la petición falla, el límite baja en
+    proporción `backoff`; si no, sube 1/limit por petición (≈ +1 por ventana).
+    Las peticiones que exceden el límite esperan en una cola acotada con deadline.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        latency_target: float,
+        queue_size: int,
+        queue_timeout: float,
+        backoff: float = 0.9,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.backoff = backoff
+        self.in_flight = 0
+        self.shed = 0
+        self._waiters: deque = deque()
+        self._publish()
+
+    def _publish(self) -> None:
+        metrics.set("concurrency_limit", int(self.limit))
+        metrics.set("concurrency_in_flight", self.in_flight)
+        metrics.set("concurrency_queue_depth", len(self._waiters))
+
+    def _reject(self) -> bool:
+        self.shed += 1
+        metrics.inc("concurrency_shed_total")
+        self._publish()
+        return False
+
+    async def acquire(self) -> bool:
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self._publish()
+            return True
+
+        if len(self._waiters) >= self.queue_size:
+            return self._reject()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._publish()
+        try:
+            # release() transfiere el lugar directamente al que espera
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+            return True
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                return True
+            waiter.cancel()
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+            return self._reject()
+        except asyncio.CancelledError:
+            # El cliente se fue mientras esperaba: no perder el lugar si ya se le asignó
+            if waiter.done() and not waiter.cancelled():
+                self._free_slot()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+                self._publish()
+            raise
+
+    def _free_slot(self) -> None:
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(True)
+        self._publish()
+
+    def release(self, latency: float, failed: bool = False) -> None:
+        if failed or latency > self.latency_target:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._free_slot()
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Middleware ASGI que aplica el AIMDLimiter a las rutas que usan la BD.
+    Las rechazadas reciben 503 con cabecera Retry-After.
+    """
+
+    def __init__(
+        self,
+        app,
+        limiter: Optional[AIMDLimiter] = None,
+        exempt_prefixes: Tuple[str, ...] = (
+            "/health", "/metrics", "/books/suggest", "/docs", "/redoc", "/openapi.json", "/catalog/snapshot",
+            "/books/events",
+        ),
+        retry_after: Optional[int] = None,
+    ):
+        self.app = app
+        self.limiter = limiter or AIMDLimiter(
+            initial_limit=settings.CONCURRENCY_INITIAL_LIMIT,
+            min_limit=settings.CONCURRENCY_MIN_LIMIT,
+            max_limit=settings.CONCURRENCY_MAX_LIMIT,
+            latency_target=settings.CONCURRENCY_LATENCY_TARGET_MS / 1000,
+            queue_size=settings.CONCURRENCY_QUEUE_SIZE,
+            queue_timeout=settings.CONCURRENCY_QUEUE_TIMEOUT_MS / 1000,
+        )
+        self.exempt_prefixes = exempt_prefixes
+        self.retry_after = settings.CONCURRENCY_RETRY_AFTER_SECONDS if retry_after is None else retry_after
+
+    def _is_limited(self, scope) -> bool:
+        path = scope.get("path", "")
+        return scope["type"] == "http" and path != "/" and not path.startswith(self.exempt_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if not self._is_limited(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not await self.limiter.acquire():
+            await self._send_overloaded(send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.limiter.release(time.perf_counter() - started, failed=status_code >= 500)
+
+    async def _send_overloaded(self, send) -> None:
+        body = json.dumps({"status": "error", "message": "Servicio saturado, intente más tarde"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -6,6 +6,79 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "secreta_clave_super_segura_123456"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Conexiones que se abren al arrancar para calentar el pool
+    DB_POOL_WARMUP_CONNECTIONS: int = 5
+    # Si el calentamiento falla se reintenta con espera exponencial (segundos)
+    WARMUP_RETRY_BASE_SECONDS: float = 1.0
+    WARMUP_RETRY_MAX_SECONDS: float = 30.0
+
+    # Préstamos: plazo y barrido periódico de vencidos
+    LOAN_PERIOD_DAYS: int = 14
+    OVERDUE_SWEEP_INTERVAL_SECONDS: float = 300.0
+    OVERDUE_SWEEP_BATCH_SIZE: int = 500
+    OVERDUE_SWEEP_MAX_BATCHES: int = 20
+
+    # Escritura por lotes del historial de préstamos
+    LOAN_EVENTS_BATCH_SIZE: int = 200
+    LOAN_EVENTS_FLUSH_INTERVAL_MS: float = 500.0
+    LOAN_EVENTS_QUEUE_SIZE: int = 10000
+
+    # Circuito y reintentos ante caídas de la BD
+    DB_CIRCUIT_ERROR_RATE: float = 0.5
+    DB_CIRCUIT_MIN_CALLS: int = 10
+    DB_CIRCUIT_WINDOW_SECONDS: float = 30.0
+    DB_CIRCUIT_PROBE_INTERVAL_SECONDS: int = 5
+    DB_RETRY_ATTEMPTS: int = 2
+    DB_RETRY_BASE_MS: float = 50.0
+
+    # Límite de concurrencia adaptativo delante del pool de la BD
+    CONCURRENCY_INITIAL_LIMIT: int = 20
+    CONCURRENCY_MIN_LIMIT: int = 2
+    CONCURRENCY_MAX_LIMIT: int = 200
+    CONCURRENCY_LATENCY_TARGET_MS: float = 250.0
+    CONCURRENCY_QUEUE_SIZE: int = 50
+    CONCURRENCY_QUEUE_TIMEOUT_MS: float = 1000.0
+    CONCURRENCY_RETRY_AFTER_SECONDS: int = 1
+
+    # Perfilado bajo demanda (vacío = deshabilitado)
+    PROFILER_TOKEN: str = ""
+    PROFILER_MIN_INTERVAL_SECONDS: float = 30.0
+    PROFILER_SAMPLE_INTERVAL_MS: float = 2.0
+    PROFILER_OUTPUT_DIR: str = "profiles"
+
+    # Lectura por lotes (?ids=)
+    BATCH_MAX_IDS: int = 100
+
+    # Búsqueda difusa (similitud de trigramas)
+    FUZZY_SEARCH_THRESHOLD: float = 0.3
+    FUZZY_SEARCH_LIMIT: int = 50
+    # Autores que se devuelven en las facetas de la búsqueda
+    SEARCH_FACET_TOP_AUTHORS: int = 10
+    # Caché de resultados de búsqueda (tamaño aproximado en JSON)
+    SEARCH_CACHE_MAX_BYTES: int = 8 * 1024 * 1024
+    # Lecturas idénticas concurrentes: cuánto espera un seguidor al líder
+    SINGLE_FLIGHT_TIMEOUT_MS: float = 2000.0
+
+    # Snapshot comprimido del catálogo (GET /catalog/snapshot)
+    CATALOG_SNAPSHOT_PATH: str = "snapshots/catalog.json.gz"
+    CATALOG_SNAPSHOT_DEBOUNCE_SECONDS: float = 5.0
+
+    # Registro de cambios (GET /changes): compactación de lo anterior a la retención
+    CHANGES_RETENTION_HOURS: float = 72.0
+    CHANGES_COMPACT_INTERVAL_SECONDS: float = 3600.0
+
+    # Eventos de libros por SSE (GET /books/events)
+    BOOK_EVENTS_BUFFER_SIZE: int = 64
+    BOOK_EVENTS_MAX_SUBSCRIBERS: int = 5000
+    BOOK_EVENTS_HEARTBEAT_SECONDS: float = 15.0
+
+    # Invalidación entre workers: "local" (un solo worker), "unix" (mismo host) o "postgres"
+    INVALIDATION_BUS: str = "local"
+    INVALIDATION_BUS_SOCKET_DIR: str = "/tmp/kamina-invalidation"
+    INVALIDATION_BUS_CHANNEL: str = "kamina_invalidation"
+    # Cada worker anuncia su última secuencia: así se detecta un mensaje final perdido
+    INVALIDATION_BUS_HEARTBEAT_SECONDS: float = 5.0
+
     model_config = ConfigDict(
         env_file=".env",
         env_file_encoding="utf-8",
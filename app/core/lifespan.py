@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from app.core.config import settings
+from app.core.security import encrypt_password
+from app.crud import author_crud, book_crud, user_crud
+from app.db.session import engine, AsyncLocalSession
+from app.schemas.book import SearchBook
+from app.services.loan_events import loan_event_writer
+from app.services.overdue_service import overdue_sweeper
+from app.services.suggest import book_suggester
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.change_service import change_compactor
+from app.services.book_events import book_event_hub
+from app.services.invalidation import invalidation_bus
+
+logger = logging.getLogger("uvicorn.error")
+
+
+# Estado de arranque que consulta /health/ready
+class Readiness:
+    def __init__(self):
+        self.ready = False
+        self.error: str | None = None
+        self.warmup_seconds: float | None = None
+
+
+readiness = Readiness()
+
+
+# Abre varias conexiones a la vez para que queden en el pool
+async def warm_up_pool(db_engine: AsyncEngine, connections: int) -> int:
+    pool_size = getattr(db_engine.pool, "size", lambda: connections)()
+    connections = max(0, min(connections, pool_size))
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = await db_engine.connect()
+            opened.append(conn)
+            await conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            await conn.close()
+    return len(opened)
+
+
+# Argon2 reserva memoria y carga la librería en el primer hash
+async def warm_up_argon2() -> None:
+    await asyncio.to_thread(encrypt_password, "Warm-up.1")
+
+
+# Ejecuta las consultas más usadas para llenar la caché de sentencias compiladas
+async def precompile_hot_statements(session_factory: async_sessionmaker) -> None:
+    async with session_factory() as session:
+        await book_crud.get_book_by_id(session, 0)
+        await author_crud.get_author_by_id(session, 0)
+        await user_crud.get_user_by_id(session, 0)
+        await user_crud.get_user_by_email(session, "")
+        # Las 8 formas posibles de search_book
+        for mask in range(8):
+            await book_crud.search_book(session, SearchBook(
+                title="-" if mask & 1 else None,
+                author_name="-" if mask & 2 else None,
+                year=-1 if mask & 4 else None,
+            ))
+        # Y las formas de orden paginado más comunes (primera página y siguientes)
+        for sort in ("title", "year", "-year", "author"):
+            for after in (None, "0"):
+                await book_crud.search_book(session, SearchBook(
+                    sort=sort, after_value=after, after_id=0 if after else None,
+                    after_author_id=0 if after else None, limit=1
+                ))
+
+
+async def warm_up(db_engine: AsyncEngine = engine, session_factory: async_sessionmaker = AsyncLocalSession) -> None:
+    started = time.perf_counter()
+    try:
+        opened = await warm_up_pool(db_engine, settings.DB_POOL_WARMUP_CONNECTIONS)
+        await warm_up_argon2()
+        await precompile_hot_statements(session_factory)
+        await book_suggester.build(session_factory)
+    except Exception as e:
+        readiness.ready = False
+        readiness.error = str(e)
+        logger.error(f"Falló el calentamiento inicial: {e}")
+        return
+    readiness.warmup_seconds = time.perf_counter() - started
+    readiness.error = None
+    readiness.ready = True
+    logger.info(f"Calentamiento completo: {opened} conexiones en {readiness.warmup_seconds:.3f}s")
+
+
+# Reintenta el calentamiento con espera exponencial hasta que salga bien (por
+# ejemplo, si la BD todavía no aceptaba conexiones al arrancar). Mientras tanto
+# /health/ready responde que no está listo
+async def warm_up_until_ready(
+    db_engine: AsyncEngine = engine,
+    session_factory: async_sessionmaker = AsyncLocalSession,
+    base_delay: float = settings.WARMUP_RETRY_BASE_SECONDS,
+    max_delay: float = settings.WARMUP_RETRY_MAX_SECONDS,
+) -> None:
+    delay = base_delay
+    while True:
+        await warm_up(db_engine, session_factory)
+        if readiness.ready:
+            return
+        logger.info(f"Reintentando el calentamiento en {delay:.1f}s")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, max_delay)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm_up_task = asyncio.create_task(warm_up_until_ready(), name="warm-up")
+    loan_event_writer.start()
+    overdue_sweeper.start()
+    await invalidation_bus.start()
+    catalog_snapshot.start()
+    change_compactor.start()
+    yield
+    readiness.ready = False
+    warm_up_task.cancel()
+    try:
+        await warm_up_task
+    except asyncio.CancelledError:
+        pass
+    book_event_hub.close()
+    await change_compactor.stop()
+    await catalog_snapshot.stop()
+    await invalidation_bus.stop()
+    await overdue_sweeper.stop()
+    await loan_event_writer.stop()
+    await engine.dispose()
+    logger.info("Engine cerrado correctamente")
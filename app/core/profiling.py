@@ -0,0 +1,237 @@
+import hmac
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+from urllib.parse import parse_qs
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.core.config import settings
+
+logger = logging.getLogger("uvicorn.error")
+
+PROFILE_HEADER = b"x-debug-profile"
+PROFILE_QUERY_FLAG = "__profile"
+
+
+# Tiempo acumulado en el driver de la BD para la petición que se está perfilando
+class SqlClock:
+    def __init__(self):
+        self.seconds = 0.0
+        self.statements = 0
+
+
+_sql_clock: ContextVar[Optional[SqlClock]] = ContextVar("_sql_clock", default=None)
+
+
+def install_sql_timer(engine: AsyncEngine) -> None:
+    """
+    Registra listeners en el engine para medir el tiempo de cada sentencia.
+    Solo se acumula cuando hay un perfilado activo en el contexto actual.
+    """
+    sync_engine = engine.sync_engine
+    if getattr(sync_engine, "_kamina_sql_timer", False):
+        return
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _sql_clock.get() is not None:
+            conn.info.setdefault("kamina_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        clock = _sql_clock.get()
+        starts = conn.info.get("kamina_query_start")
+        if clock is None or not starts:
+            return
+        clock.seconds += time.perf_counter() - starts.pop()
+        clock.statements += 1
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("kamina_query_start"):
+            conn.info["kamina_query_start"].pop()
+
+    sync_engine._kamina_sql_timer = True
+
+
+class StackSampler:
+    """
+    Perfilador estadístico: un hilo toma muestras de la pila del hilo del
+    event loop cada `interval` segundos y las agrupa en formato "collapsed"
+    (una línea `a;b;c N` por pila), compatible con flamegraph.pl / speedscope.
+
+    Como el event loop es compartido, las muestras pueden incluir trabajo de
+    otras peticiones concurrentes.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="kamina-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(parts))] += 1
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+class ProfilerMiddleware:
+    """
+    Middleware ASGI que perfila una petición concreta cuando llega la cabecera
+    `X-Debug-Profile: <PROFILER_TOKEN>` o el parámetro `?__profile=<PROFILER_TOKEN>`.
+
+    - Sin token configurado el perfilado queda deshabilitado.
+    - Solo se perfila una petición a la vez y como mucho una cada
+      PROFILER_MIN_INTERVAL_SECONDS; el resto se atiende normalmente.
+    - El perfil se guarda en PROFILER_OUTPUT_DIR/<id>.collapsed y el resumen
+      (tiempo SQL vs Python) se devuelve en cabeceras X-Profile-*.
+    """
+
+    def __init__(
+        self,
+        app,
+        token: Optional[str] = None,
+        min_interval: Optional[float] = None,
+        sample_interval: Optional[float] = None,
+        output_dir: Optional[str] = None,
+    ):
+        self.app = app
+        self.token = settings.PROFILER_TOKEN if token is None else token
+        self.min_interval = settings.PROFILER_MIN_INTERVAL_SECONDS if min_interval is None else min_interval
+        self.sample_interval = (
+            settings.PROFILER_SAMPLE_INTERVAL_MS / 1000 if sample_interval is None else sample_interval
+        )
+        self.output_dir = settings.PROFILER_OUTPUT_DIR if output_dir is None else output_dir
+        self._busy = False
+        self._last_started = float("-inf")
+
+    # Devuelve el token enviado por el cliente (cabecera o query string)
+    def _requested_token(self, scope) -> Optional[str]:
+        for name, value in scope.get("headers", []):
+            if name == PROFILE_HEADER:
+                return value.decode("latin-1")
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        values = query.get(PROFILE_QUERY_FLAG)
+        return values[0] if values else None
+
+    def _authorized(self, scope) -> Optional[bool]:
+        supplied = self._requested_token(scope)
+        if supplied is None:
+            return None
+        return bool(self.token) and hmac.compare_digest(supplied, self.token)
+
+    # Limitador: una sola petición perfilada a la vez y un intervalo mínimo entre ellas
+    def _try_acquire(self) -> bool:
+        now = time.monotonic()
+        if self._busy or now - self._last_started < self.min_interval:
+            return False
+        self._busy = True
+        self._last_started = now
+        return True
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        authorized = self._authorized(scope)
+        if not authorized:
+            await self.app(scope, receive, send)
+            return
+
+        if not self._try_acquire():
+            async def send_skipped(message):
+                if message["type"] == "http.response.start":
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [(b"x-profile", b"rate-limited")]
+                await send(message)
+
+            await self.app(scope, receive, send_skipped)
+            return
+
+        profile_id = uuid.uuid4().hex
+        clock = SqlClock()
+        token = _sql_clock.set(clock)
+        sampler = StackSampler(threading.get_ident(), self.sample_interval)
+        started = time.perf_counter()
+        sampler.start()
+        finished = False
+
+        def finish() -> list:
+            nonlocal finished
+            finished = True
+            wall = time.perf_counter() - started
+            sampler.stop()
+            summary = {
+                "id": profile_id,
+                "path": scope.get("path"),
+                "method": scope.get("method"),
+                "wall_ms": round(wall * 1000, 3),
+                "sql_ms": round(clock.seconds * 1000, 3),
+                "python_ms": round(max(wall - clock.seconds, 0.0) * 1000, 3),
+                "sql_statements": clock.statements,
+                "samples": sum(sampler.stacks.values()),
+            }
+            self._store(profile_id, sampler.collapsed(), summary)
+            return [
+                (b"x-profile-id", profile_id.encode()),
+                (b"x-profile-wall-ms", str(summary["wall_ms"]).encode()),
+                (b"x-profile-sql-ms", str(summary["sql_ms"]).encode()),
+                (b"x-profile-python-ms", str(summary["python_ms"]).encode()),
+                (b"x-profile-sql-statements", str(summary["sql_statements"]).encode()),
+            ]
+
+        async def send_profiled(message):
+            # Las cabeceras salen con http.response.start: el trabajo del endpoint ya terminó
+            if message["type"] == "http.response.start" and not finished:
+                message["headers"] = list(message.get("headers", [])) + finish()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_profiled)
+        finally:
+            if not finished:
+                sampler.stop()
+            _sql_clock.reset(token)
+            self._busy = False
+
+    def _store(self, profile_id: str, collapsed: str, summary: dict) -> None:
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            base = os.path.join(self.output_dir, profile_id)
+            with open(f"{base}.collapsed", "w", encoding="utf-8") as f:
+                f.write(collapsed)
+            with open(f"{base}.json", "w", encoding="utf-8") as f:
+                json.dump(summary, f)
+        except OSError as e:
+            logger.error(f"No se pudo guardar el perfil {profile_id}: {e}")
+        logger.info(f"Perfil {profile_id} guardado: {summary}")
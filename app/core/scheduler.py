@@ -0,0 +1,44 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class PeriodicTask:
+    """
+    Ejecuta `job` cada `interval` segundos en el event loop de la app.
+    Los errores se registran y no detienen las siguientes ejecuciones.
+    Se inicia y se detiene desde el lifespan.
+    """
+
+    def __init__(self, name: str, interval: float, job: Callable[[], Awaitable[object]]):
+        self.name = name
+        self.interval = interval
+        self.job = job
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(), name=self.name)
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def run_once(self) -> None:
+        try:
+            await self.job()
+        except Exception as e:
+            logger.error(f"Tarea periódica {self.name} falló: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.run_once()
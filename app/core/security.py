@@ -57,6 +57,22 @@ def parse_token(token: str) -> dict:
 
 
 
+# Id del usuario autenticado, solo desde el JWT (sin consultar la BD)
+
+def get_current_user_id(token: str = Depends(oauth_bearer)) -> int:
+    data = parse_token(token)
+
+    user_id = data.get("sub")
+    if not user_id:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token sin información válida",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+    return int(user_id)
+
+
+
 # Obtener usuario autenticado
 
 async def get_current_user(
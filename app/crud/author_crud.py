@@ -1,7 +1,10 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import List, Optional
+from sqlalchemy import select, update, exists, lambda_stmt
+from sqlalchemy.engine import Row
+from typing import List, Optional, Sequence
 from app.db.models.author import Author
+from app.db.models.book import Book
+from app.crud import change_crud
 
 
 # Obtener todos los autores
@@ -10,15 +13,76 @@ async def get_authors(db: AsyncSession) -> List[Author]:
     return result.scalars().all()   #type: ignore
 
 
-# Obtener autor por ID
+# Solo las columnas pedidas (?fields=); id va siempre para ordenar lotes
+async def get_authors_columns(
+    db: AsyncSession, fields: Sequence[str], ids: Optional[List[int]] = None
+) -> List[Row]:
+    stmt = select(Author.id, *[getattr(Author, f) for f in fields if f != "id"])
+    if ids is not None:
+        stmt = stmt.where(Author.id.in_(ids))
+    result = await db.execute(stmt)
+    return result.all()   #type: ignore
+
+
+# Varios por id en una sola consulta (WHERE id IN (...)); el orden lo arma el servicio
+async def get_authors_by_ids(db: AsyncSession, ids: List[int]) -> List[Author]:
+    result = await db.execute(select(Author).where(Author.id.in_(ids)))
+    return result.scalars().all()   #type: ignore
+
+
+# Obtener autor por ID (sentencia cacheada)
 async def get_author_by_id(db: AsyncSession, author_id: int) -> Optional[Author]:
-    result = await db.execute(select(Author).where(Author.id == author_id))
+    result = await db.execute(lambda_stmt(lambda: select(Author).where(Author.id == author_id)))
     return result.scalar_one_or_none()
 
 
+# Primeros libros de un autor (solo las columnas que se muestran) sobre el índice de author_id
+async def get_author_books(db: AsyncSession, author_id: int, limit: int) -> List[Row]:
+    result = await db.execute(
+        select(Book.id, Book.title, Book.publication_year)
+        .where(Book.author_id == author_id)
+        .order_by(Book.id)
+        .limit(limit)
+    )
+    return result.all()   #type: ignore
+
+
+# Suma delta al contador de libros (sin commit: va en la transacción del libro)
+async def shift_book_count(db: AsyncSession, author_id: int, delta: int) -> None:
+    await db.execute(
+        update(Author)
+        .where(Author.id == author_id)
+        .values(book_count=Author.book_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# ¿Tiene libros? EXISTS sobre el índice de books.author_id, cuesta lo mismo con 1 o 10.000 libros
+async def has_books(db: AsyncSession, author_id: int) -> bool:
+    result = await db.execute(select(exists().where(Book.author_id == author_id)))
+    return result.scalar()   #type: ignore
+
+
+# Pasa todos los libros a otro autor en un solo UPDATE (sin commit). Devuelve los ids movidos
+async def reassign_books(db: AsyncSession, from_author_id: int, to_author_id: int) -> List[int]:
+    result = await db.execute(
+        update(Book)
+        .where(Book.author_id == from_author_id)
+        .values(author_id=to_author_id)
+        .returning(Book.id)
+        .execution_options(synchronize_session=False)
+    )
+    book_ids = result.scalars().all()
+    await shift_book_count(db, to_author_id, len(book_ids))
+    return book_ids   #type: ignore
+
+
 # Crear autor
 async def create_author(db: AsyncSession, author: Author) -> Author:
     db.add(author)
+    # flush para tener el id: el alta va al registro de cambios en el mismo commit
+    await db.flush()
+    await change_crud.record_change(db, "author", author.id, "upsert")
     await db.commit()
     await db.refresh(author)
     return author
@@ -26,12 +90,22 @@ async def create_author(db: AsyncSession, author: Author) -> Author:
 
 # Actualizar autor
 async def update_author(db: AsyncSession, author: Author) -> Author:
+    await change_crud.record_change(db, "author", author.id, "upsert")
     await db.commit()
     await db.refresh(author)
     return author
 
 
-# Eliminar autor
-async def delete_author(db: AsyncSession, author: Author) -> None:
+# Eliminar autor. Los libros que se movieron o borraron en la misma transacción
+# (reassign_books / delete_author_books) van al registro junto con el autor
+async def delete_author(
+    db: AsyncSession,
+    author: Author,
+    moved_book_ids: Sequence[int] = (),
+    deleted_book_ids: Sequence[int] = (),
+) -> None:
     await db.delete(author)
+    await change_crud.record_changes(db, "book", moved_book_ids, "upsert")
+    await change_crud.record_changes(db, "book", deleted_book_ids, "delete")
+    await change_crud.record_change(db, "author", author.id, "delete")
     await db.commit()
@@ -1,53 +1,418 @@
+from datetime import datetime, UTC
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import joinedload
-from typing import List, Optional
+from sqlalchemy.engine import Row
+from sqlalchemy import select, lambda_stmt, update, delete, exists, func, text, literal, null, case, union_all, tuple_
+from sqlalchemy.orm import joinedload, contains_eager
+from typing import List, Optional, Sequence, Tuple
 from app.db.models.book import Book
+from app.db.models.book_copy import BookCopy
+from app.db.models.hold import Hold
 from app.db.models.author import Author
 from app.schemas.book import SearchBook
+from app.crud import change_crud
 from sqlalchemy.orm import selectinload
 
 # Obtener todos
 async def get_books(db: AsyncSession) -> List[Book]:
     result = await db.execute(select(Book))
     return result.scalars().all()   #type: ignore
-# Obtener por ID
+# Solo las columnas pedidas (?fields=); id va siempre para ordenar lotes
+async def get_books_columns(
+    db: AsyncSession, fields: Sequence[str], ids: Optional[List[int]] = None
+) -> List[Row]:
+    stmt = select(Book.id, *[getattr(Book, f) for f in fields if f != "id"])
+    if ids is not None:
+        stmt = stmt.where(Book.id.in_(ids))
+    result = await db.execute(stmt)
+    return result.all()   #type: ignore
+# Varios por id en una sola consulta (WHERE id IN (...)); el orden lo arma el servicio
+async def get_books_by_ids(db: AsyncSession, ids: List[int]) -> List[Book]:
+    result = await db.execute(select(Book).where(Book.id.in_(ids)))
+    return result.scalars().all()   #type: ignore
+# Obtener por ID (sentencia cacheada, book_id viaja como parámetro)
 async def get_book_by_id(db: AsyncSession, book_id: int) -> Optional[Book]:
-    result = await db.execute(select(Book).where(Book.id == book_id))
+    result = await db.execute(lambda_stmt(lambda: select(Book).where(Book.id == book_id)))
     return result.scalar_one_or_none()
 # Crear 
 async def create_book(db: AsyncSession, book: Book) -> Book:
     db.add(book)
+    # flush para tener el id: el alta va al registro de cambios en el mismo commit
+    await db.flush()
+    await change_crud.record_change(db, "book", book.id, "upsert")
     await db.commit()
     await db.refresh(book)
     return book
 # Actualizar 
 async def update_book(db: AsyncSession, book: Book) -> Book:
+    await change_crud.record_change(db, "book", book.id, "upsert")
     await db.commit()
     await db.refresh(book)
     return book
 
-# Eliminar 
+# Eliminar (primero sus ejemplares y reservas)
 async def delete_book(db: AsyncSession, book: Book) -> None:
+    await db.execute(delete(BookCopy).where(BookCopy.book_id == book.id))
+    await db.execute(delete(Hold).where(Hold.book_id == book.id))
     await db.delete(book)
+    await change_crud.record_change(db, "book", book.id, "delete")
     await db.commit()
+
+
+# ¿Algún ejemplar de los libros del autor está prestado? (EXISTS, sin cargar libros)
+async def author_has_borrowed_copies(db: AsyncSession, author_id: int) -> bool:
+    result = await db.execute(
+        select(
+            exists()
+            .where(BookCopy.book_id == Book.id, Book.author_id == author_id, BookCopy.borrower_id.is_not(None))
+        )
+    )
+    return result.scalar()   #type: ignore
+
+
+# ¿El usuario ya tiene un ejemplar de este título?
+async def user_has_copy(db: AsyncSession, book_id: int, user_id: int) -> bool:
+    result = await db.execute(
+        select(exists().where(BookCopy.book_id == book_id, BookCopy.borrower_id == user_id))
+    )
+    return result.scalar()   #type: ignore
+
+
+# Borra en bloque los libros del autor con sus ejemplares y reservas (sin commit).
+# Devuelve los ids borrados para el registro de cambios
+async def delete_author_books(db: AsyncSession, author_id: int) -> List[int]:
+    book_ids = select(Book.id).where(Book.author_id == author_id).scalar_subquery()
+    await db.execute(delete(BookCopy).where(BookCopy.book_id.in_(book_ids)))
+    await db.execute(delete(Hold).where(Hold.book_id.in_(book_ids)))
+    result = await db.execute(
+        delete(Book)
+        .where(Book.author_id == author_id)
+        .returning(Book.id)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalars().all()   #type: ignore
+
+
+def _is_postgres(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+# Suma o resta al contador de disponibles en una sola sentencia y devuelve el nuevo valor.
+# Es la última escritura del título antes del commit (detrás solo va el registro
+# de cambios): el bloqueo de la fila dura lo mínimo.
+async def _shift_available(db: AsyncSession, book_id: int, delta: int) -> int:
+    result = await db.execute(
+        update(Book)
+        .where(Book.id == book_id)
+        .values(available_count=Book.available_count + delta)
+        .returning(Book.available_count)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one()
+
+
+# Asigna cualquier ejemplar libre al usuario. Devuelve (id del ejemplar, disponibles) o None.
+async def claim_copy(db: AsyncSession, book_id: int, user_id: int, due_at: datetime) -> Optional[Tuple[int, int]]:
+    loan = dict(borrower_id=user_id, borrowed_at=datetime.now(UTC), due_at=due_at, overdue_notified_at=None)
+    free_copy = (
+        select(BookCopy.id)
+        .where(BookCopy.book_id == book_id, BookCopy.borrower_id.is_(None))
+        .limit(1)
+    )
+
+    if _is_postgres(db):
+        # SKIP LOCKED: préstamos concurrentes del mismo título toman ejemplares distintos sin esperarse
+        copy_id = (await db.execute(free_copy.with_for_update(skip_locked=True))).scalar_one_or_none()
+        if copy_id is not None:
+            await db.execute(
+                update(BookCopy)
+                .where(BookCopy.id == copy_id)
+                .values(**loan)
+                .execution_options(synchronize_session=False)
+            )
+    else:
+        # SQLite serializa las escrituras: el UPDATE condicional ya es atómico
+        result = await db.execute(
+            update(BookCopy)
+            .where(BookCopy.id == free_copy.scalar_subquery(), BookCopy.borrower_id.is_(None))
+            .values(**loan)
+            .returning(BookCopy.id)
+            .execution_options(synchronize_session=False)
+        )
+        copy_id = result.scalar_one_or_none()
+
+    if copy_id is None:
+        return None
+
+    available = await _shift_available(db, book_id, -1)
+    # available_count cambió: va al registro en la misma transacción del préstamo
+    await change_crud.record_change(db, "book", book_id, "upsert")
+    await db.commit()
+    return copy_id, available
+
+
+# Devuelve el ejemplar que tiene el usuario. Si hay reservas, en la misma transacción
+# el ejemplar pasa a la primera de la cola en lugar de quedar libre.
+# Devuelve (id del ejemplar, disponibles, usuario que lo recibe o None) o None.
+async def release_copy(
+    db: AsyncSession, book_id: int, user_id: int, due_at: datetime
+) -> Optional[Tuple[int, int, Optional[int]]]:
+    held_copy = await db.execute(
+        select(BookCopy.id)
+        .where(BookCopy.book_id == book_id, BookCopy.borrower_id == user_id)
+        .limit(1)
+    )
+    copy_id = held_copy.scalar_one_or_none()
+    if copy_id is None:
+        return None
+
+    head_of_queue = select(Hold.id, Hold.user_id).where(Hold.book_id == book_id).order_by(Hold.id).limit(1)
+    if _is_postgres(db):
+        # Devoluciones simultáneas atienden reservas distintas
+        head_of_queue = head_of_queue.with_for_update(skip_locked=True)
+    head = (await db.execute(head_of_queue)).first()
+
+    if head is not None:
+        loan = dict(borrower_id=head.user_id, borrowed_at=datetime.now(UTC), due_at=due_at, overdue_notified_at=None)
+    else:
+        loan = dict(borrower_id=None, borrowed_at=None, due_at=None, overdue_notified_at=None)
+    result = await db.execute(
+        update(BookCopy)
+        .where(BookCopy.id == copy_id, BookCopy.borrower_id == user_id)
+        .values(**loan)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        return None
+
+    if head is not None:
+        await db.execute(delete(Hold).where(Hold.id == head.id))
+        available = (await db.execute(select(Book.available_count).where(Book.id == book_id))).scalar_one()
+    else:
+        available = await _shift_available(db, book_id, 1)
+    await change_crud.record_change(db, "book", book_id, "upsert")
+    await db.commit()
+    return copy_id, available, head.user_id if head is not None else None
+
+
+# Agrega ejemplares nuevos (sin commit). Si hay reservas, los primeros de la cola
+# reciben los ejemplares nuevos ya prestados, igual que al devolver: un ejemplar
+# nunca queda libre mientras alguien espera. Devuelve [(id del ejemplar, usuario)]
+async def add_copies(db: AsyncSession, book_id: int, amount: int, due_at: datetime) -> List[Tuple[int, int]]:
+    heads_of_queue = select(Hold.id, Hold.user_id).where(Hold.book_id == book_id).order_by(Hold.id).limit(amount)
+    if _is_postgres(db):
+        # Las reservas que está atendiendo una devolución en curso quedan para ella
+        heads_of_queue = heads_of_queue.with_for_update(skip_locked=True)
+    heads = (await db.execute(heads_of_queue)).all()
+
+    borrowed_at = datetime.now(UTC)
+    handed = [
+        BookCopy(book_id=book_id, borrower_id=head.user_id, borrowed_at=borrowed_at, due_at=due_at)
+        for head in heads
+    ]
+    db.add_all(handed + [BookCopy(book_id=book_id) for _ in range(amount - len(heads))])
+    if heads:
+        await db.execute(delete(Hold).where(Hold.id.in_([head.id for head in heads])))
+    await db.execute(
+        update(Book)
+        .where(Book.id == book_id)
+        .values(total_copies=Book.total_copies + amount, available_count=Book.available_count + amount - len(heads))
+        .execution_options(synchronize_session=False)
+    )
+    # flush para tener los ids de los ejemplares entregados (eventos de préstamo)
+    await db.flush()
+    return [(copy.id, copy.borrower_id) for copy in handed]
+
+
+# Quita ejemplares libres (sin commit). Devuelve False si no hay suficientes libres.
+async def remove_free_copies(db: AsyncSession, book_id: int, amount: int) -> bool:
+    free_copies = (
+        select(BookCopy.id)
+        .where(BookCopy.book_id == book_id, BookCopy.borrower_id.is_(None))
+        .limit(amount)
+    )
+    if _is_postgres(db):
+        free_copies = free_copies.with_for_update(skip_locked=True)
+    copy_ids = (await db.execute(free_copies)).scalars().all()
+    if len(copy_ids) < amount:
+        return False
+
+    result = await db.execute(
+        delete(BookCopy)
+        .where(BookCopy.id.in_(copy_ids), BookCopy.borrower_id.is_(None))
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != amount:
+        return False
+
+    await db.execute(
+        update(Book)
+        .where(Book.id == book_id)
+        .values(total_copies=Book.total_copies - amount, available_count=Book.available_count - amount)
+        .execution_options(synchronize_session=False)
+    )
+    return True
+
 # Buscar por filtros
+# Cada filtro y cada orden se agrega como lambda fija: hay pocas formas posibles
+# de la consulta y cada una se compila una sola vez; los valores van como parámetros.
+# Con sort se pagina por keyset (after_value, after_id) sobre el índice compuesto
+# que coincide con el orden, así nunca se ordena el resultado completo en memoria.
+# Por autor el orden es (nombre, id del autor, id del libro): recorre
+# ix_authors_name_id y, por cada autor, ix_books_author_id_id ya en orden.
 async def search_book(db: AsyncSession, book_search: SearchBook) -> List[Book]:
     # Selecciona instancias de Book y carga la relación author
-    stmt = select(Book).options(selectinload(Book.author))
+    stmt = lambda_stmt(lambda: select(Book).options(selectinload(Book.author)))
 
     # Filtrado por título
     if book_search.title:
-        stmt = stmt.where(Book.title.ilike(f"%{book_search.title}%"))
+        title_pattern = f"%{book_search.title}%"
+        stmt += lambda s: s.where(Book.title.ilike(title_pattern))
 
-    # Filtrado por autor
+    # Filtrado por autor (el join también sirve para ordenar por autor)
     if book_search.author_name:
-        stmt = stmt.join(Book.author).where(Author.name.ilike(f"%{book_search.author_name}%"))
+        author_pattern = f"%{book_search.author_name}%"
+        stmt += lambda s: s.join(Book.author).where(Author.name.ilike(author_pattern))
+    elif book_search.sort == "author":
+        stmt += lambda s: s.join(Book.author)
 
-    # Filtrado por año de publicación
+    # Filtrado por año de publicación (exacto o por rango)
     if book_search.year:
-        stmt = stmt.where(Book.publication_year == book_search.year)
+        year = book_search.year
+        stmt += lambda s: s.where(Book.publication_year == year)
+    if book_search.year_from is not None:
+        year_from = book_search.year_from
+        stmt += lambda s: s.where(Book.publication_year >= year_from)
+    if book_search.year_to is not None:
+        year_to = book_search.year_to
+        stmt += lambda s: s.where(Book.publication_year <= year_to)
+
+    # Solo con ejemplares libres (índices parciales available_count > 0)
+    if book_search.available_only:
+        stmt += lambda s: s.where(Book.available_count > 0)
+
+    # Orden + keyset. Al ordenar por año quedan fuera los libros sin año
+    after = book_search.after_value is not None and book_search.after_id is not None
+    after_value, after_id, limit = book_search.after_value, book_search.after_id, book_search.limit
+    after_author_id = book_search.after_author_id
+    if after and book_search.sort in ("year", "-year"):
+        after_value = int(after_value)
+    if book_search.sort == "title":
+        if after:
+            stmt += lambda s: s.where(tuple_(Book.title, Book.id) > tuple_(after_value, after_id))
+        stmt += lambda s: s.order_by(Book.title, Book.id).limit(limit)
+    elif book_search.sort == "year":
+        stmt += lambda s: s.where(Book.publication_year.is_not(None))
+        if after:
+            stmt += lambda s: s.where(tuple_(Book.publication_year, Book.id) > tuple_(after_value, after_id))
+        stmt += lambda s: s.order_by(Book.publication_year, Book.id).limit(limit)
+    elif book_search.sort == "-year":
+        stmt += lambda s: s.where(Book.publication_year.is_not(None))
+        if after:
+            stmt += lambda s: s.where(tuple_(Book.publication_year, Book.id) < tuple_(after_value, after_id))
+        stmt += lambda s: s.order_by(Book.publication_year.desc(), Book.id.desc()).limit(limit)
+    elif book_search.sort == "author":
+        if after and after_author_id is not None:
+            stmt += lambda s: s.where(
+                tuple_(Author.name, Author.id, Book.id) > tuple_(after_value, after_author_id, after_id)
+            )
+        stmt += lambda s: s.order_by(Author.name, Author.id, Book.id).limit(limit)
 
     # Ejecuta la consulta
     result = await db.execute(stmt)
     return result.scalars().all()  # Devuelve lista de Book
+
+
+# Facetas de search_book en una sola sentencia: el conjunto filtrado es un CTE y
+# cada faceta es un GROUP BY sobre él, unidos con UNION ALL (un solo viaje a la BD).
+# Con ids (búsqueda difusa) el conjunto son esos libros. Filas: (faceta, clave, etiqueta, cantidad)
+async def search_facets(
+    db: AsyncSession, book_search: SearchBook, top_authors: int, ids: Optional[List[int]] = None
+) -> List[Row]:
+    filtered = select(Book.publication_year, Book.author_id, Book.available_count)
+    if ids is not None:
+        filtered = filtered.where(Book.id.in_(ids))
+    elif book_search.title:
+        filtered = filtered.where(Book.title.ilike(f"%{book_search.title}%"))
+    if ids is None and book_search.author_name:
+        filtered = filtered.join(Book.author).where(Author.name.ilike(f"%{book_search.author_name}%"))
+    if ids is None:
+        filtered = _filter_year_and_availability(filtered, book_search)
+    filtered = filtered.cte("filtered")
+
+    years = select(
+        literal("year").label("facet"), filtered.c.publication_year.label("key"),
+        null().label("label"), func.count().label("count")
+    ).group_by(filtered.c.publication_year)
+    authors = (
+        select(
+            literal("author").label("facet"), filtered.c.author_id.label("key"),
+            Author.name.label("label"), func.count().label("count")
+        )
+        .join(Author, Author.id == filtered.c.author_id)
+        .group_by(filtered.c.author_id, Author.name)
+        .order_by(func.count().desc(), filtered.c.author_id)
+        .limit(top_authors)
+        .subquery()
+    )
+    status_label = case((filtered.c.available_count > 0, "available"), else_="borrowed")
+    availability = select(
+        literal("availability").label("facet"), null().label("key"),
+        status_label.label("label"), func.count().label("count")
+    ).group_by(status_label)
+
+    result = await db.execute(union_all(years, select(authors), availability))
+    return result.all()   #type: ignore
+
+
+# Filtros de año (exacto o rango) y de disponibilidad, iguales a los de search_book,
+# para las sentencias armadas sin lambda (facetas y búsqueda difusa)
+def _filter_year_and_availability(stmt, book_search: SearchBook):
+    if book_search.year:
+        stmt = stmt.where(Book.publication_year == book_search.year)
+    if book_search.year_from is not None:
+        stmt = stmt.where(Book.publication_year >= book_search.year_from)
+    if book_search.year_to is not None:
+        stmt = stmt.where(Book.publication_year <= book_search.year_to)
+    if book_search.available_only:
+        stmt = stmt.where(Book.available_count > 0)
+    return stmt
+
+
+# La búsqueda difusa se resuelve en SQL solo si hay pg_trgm (PostgreSQL)
+def supports_trigram_search(db: AsyncSession) -> bool:
+    return _is_postgres(db)
+
+
+# Búsqueda difusa con pg_trgm: `%` usa los índices GIN de trigramas para elegir
+# candidatos y similarity() los ordena. Devuelve (libro, similitud)
+async def fuzzy_search_book(
+    db: AsyncSession, book_search: SearchBook, threshold: float, limit: int
+) -> List[Tuple[Book, float]]:
+    await db.execute(
+        text("SELECT set_config('pg_trgm.similarity_threshold', :threshold, true)"),
+        {"threshold": str(threshold)},
+    )
+    stmt = select(Book).join(Book.author).options(contains_eager(Book.author))
+    scores = []
+    if book_search.title:
+        stmt = stmt.where(Book.title.op("%")(book_search.title))
+        scores.append(func.similarity(Book.title, book_search.title))
+    if book_search.author_name:
+        stmt = stmt.where(Author.name.op("%")(book_search.author_name))
+        scores.append(func.similarity(Author.name, book_search.author_name))
+    stmt = _filter_year_and_availability(stmt, book_search)
+    score = (sum(scores[1:], scores[0]) / len(scores)).label("score")
+    result = await db.execute(stmt.add_columns(score).order_by(score.desc(), Book.id).limit(limit))
+    return [(book, similarity) for book, similarity in result.all()]
+
+
+# Libros candidatos por id con su autor (la búsqueda difusa en SQLite los elige en
+# memoria); con book_search se aplican sus filtros de año y disponibilidad
+async def get_books_with_author(
+    db: AsyncSession, ids: List[int], book_search: Optional[SearchBook] = None
+) -> List[Book]:
+    stmt = select(Book).options(selectinload(Book.author)).where(Book.id.in_(ids))
+    if book_search is not None:
+        stmt = _filter_year_and_availability(stmt, book_search)
+    result = await db.execute(stmt)
+    return result.scalars().all()   #type: ignore
@@ -0,0 +1,94 @@
+from datetime import datetime
+from typing import List, Sequence
+
+from sqlalchemy import select, insert, update, delete, exists, func, and_, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.db.models.change import Change
+
+# Clave del advisory lock de quien numera el registro en PostgreSQL (solo lectores del feed)
+_SEQUENCER_LOCK_KEY = 7_310_048
+
+
+def _is_postgres(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name == "postgresql"
+
+
+# Registra cambios de varias entidades en un solo INSERT (sin commit: va en la
+# transacción de la escritura). No toma ningún bloqueo: el seq se asigna después
+# del commit (assign_sequence); acá solo se anota la transacción que escribe
+async def record_changes(db: AsyncSession, entity: str, entity_ids: Sequence[int], op: str) -> None:
+    if not entity_ids:
+        return
+    rows = [dict(entity=entity, entity_id=entity_id, op=op) for entity_id in entity_ids]
+    if _is_postgres(db):
+        txid = text("pg_current_xact_id()::text::bigint")
+        rows = [dict(row, txid=txid) for row in rows]
+    await db.execute(insert(Change).values(rows))
+
+
+# Registra un cambio (igual que record_changes)
+async def record_change(db: AsyncSession, entity: str, entity_id: int, op: str) -> None:
+    await record_changes(db, entity, [entity_id], op)
+
+
+# Numera (seq) las filas ya confirmadas que todavía no tienen número, siguiendo
+# el orden de confirmación. Un seq repartido al insertar no sirve: se vuelve
+# visible al hacer commit y un lector podría ver el 11 antes que el 10.
+# En PostgreSQL solo se numeran las filas de transacciones anteriores al xmin
+# del snapshot (la transacción en curso más vieja): todas terminaron y ninguna
+# fila nueva puede quedar antes que ellas, así que el orden (txid, id) ya es
+# definitivo. Las escrituras no esperan a nadie; solo los lectores del feed se
+# turnan con un try-lock (si otro ya está numerando, se lee lo que hay).
+# En SQLite las escrituras se serializan y el orden de id ya es el de commit.
+async def assign_sequence(db: AsyncSession) -> None:
+    pending = Change.seq.is_(None)
+    if _is_postgres(db):
+        locked = await db.execute(select(func.pg_try_advisory_xact_lock(_SEQUENCER_LOCK_KEY)))
+        if not locked.scalar():
+            return
+        pending = and_(pending, Change.txid < text("pg_snapshot_xmin(pg_current_snapshot())::text::bigint"))
+    ready = (
+        select(Change.id, func.row_number().over(order_by=(Change.txid, Change.id)).label("n"))
+        .where(pending)
+        .subquery()
+    )
+    numbered = aliased(Change)
+    top = select(func.coalesce(func.max(numbered.seq), 0)).scalar_subquery()
+    await db.execute(
+        update(Change)
+        .where(Change.id == ready.c.id)
+        .values(seq=top + ready.c.n)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# Página del registro a partir de since, sobre el índice único de seq
+async def get_changes(db: AsyncSession, since: int, limit: int) -> List[Change]:
+    result = await db.execute(
+        select(Change).where(Change.seq > since).order_by(Change.seq).limit(limit)
+    )
+    return result.scalars().all()   #type: ignore
+
+
+# Borra los cambios anteriores a horizon que tienen uno más nuevo de la misma
+# entidad: de cada entidad queda al menos el último (también los "delete"). Dos
+# escrituras de la misma entidad se turnan por el bloqueo de su fila, así que
+# entre ellas el id sigue el orden de commit
+async def compact_changes(db: AsyncSession, horizon: datetime) -> int:
+    newer = aliased(Change)
+    result = await db.execute(
+        delete(Change)
+        .where(
+            Change.changed_at < horizon,
+            exists().where(
+                newer.entity == Change.entity,
+                newer.entity_id == Change.entity_id,
+                newer.id > Change.id,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
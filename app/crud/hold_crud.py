@@ -0,0 +1,38 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, delete, func
+from typing import Optional
+from app.db.models.hold import Hold
+
+
+# Reserva de un usuario para un título
+async def get_hold(db: AsyncSession, book_id: int, user_id: int) -> Optional[Hold]:
+    result = await db.execute(select(Hold).where(Hold.book_id == book_id, Hold.user_id == user_id))
+    return result.scalar_one_or_none()
+
+
+# Crear reserva (al final de la cola)
+async def create_hold(db: AsyncSession, hold: Hold) -> Hold:
+    db.add(hold)
+    await db.commit()
+    await db.refresh(hold)
+    return hold
+
+
+# Posición en la cola: cuenta sobre el rango del índice (book_id, id) hasta la reserva.
+# Es O(posición): recorre las entradas del índice anteriores, sin leer filas.
+# Una posición O(log n) necesitaría un rango guardado por reserva y un desplazamiento
+# por libro, pero cancelar en medio de la cola obligaría a renumerar a todos los de
+# atrás (O(n) escrituras con bloqueo) y la cola se consulta mucho más de lo que se
+# cancela. Una cola por título no pasa de la cantidad de usuarios que lo esperan,
+# así que se prefiere el conteo.
+async def get_hold_position(db: AsyncSession, hold: Hold) -> int:
+    result = await db.execute(
+        select(func.count()).where(Hold.book_id == hold.book_id, Hold.id <= hold.id)
+    )
+    return result.scalar_one()
+
+
+# Cancelar reserva
+async def delete_hold(db: AsyncSession, hold: Hold) -> None:
+    await db.execute(delete(Hold).where(Hold.id == hold.id))
+    await db.commit()
@@ -0,0 +1,100 @@
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, update, func, tuple_
+from typing import List, Optional, Tuple
+from sqlalchemy.engine import Row
+from app.db.models.book import Book
+from app.db.models.book_copy import BookCopy
+from app.db.models.loan_event import LoanEvent
+
+
+# Insertar varios eventos en una sola sentencia (INSERT ... VALUES (...), (...))
+async def insert_loan_events(db: AsyncSession, events: List[dict]) -> None:
+    await db.execute(insert(LoanEvent).values(events))
+    await db.commit()
+
+
+# Préstamos históricos por libro (popularidad para el índice de sugerencias)
+async def count_borrows_by_book(db: AsyncSession) -> List[Row]:
+    result = await db.execute(
+        select(LoanEvent.book_id, func.count())
+        .where(LoanEvent.event == "borrow")
+        .group_by(LoanEvent.book_id)
+    )
+    return result.all()   #type: ignore
+
+
+# Historial de un usuario, del más reciente al más antiguo, paginado por id
+async def get_user_loan_events(
+    db: AsyncSession, user_id: int, before_id: Optional[int], limit: int
+) -> List[LoanEvent]:
+    stmt = select(LoanEvent).where(LoanEvent.user_id == user_id)
+    if before_id is not None:
+        stmt = stmt.where(LoanEvent.id < before_id)
+    result = await db.execute(stmt.order_by(LoanEvent.id.desc()).limit(limit))
+    return result.scalars().all()   #type: ignore
+
+
+# Libros que tiene hoy un usuario: un solo SELECT sobre el índice (borrower_id, id)
+# con solo las columnas de BookOut más las del préstamo, paginado por id del ejemplar
+async def get_user_borrowed_books(
+    db: AsyncSession, user_id: int, after_id: Optional[int], limit: int
+) -> List[Row]:
+    stmt = (
+        select(
+            Book.id, Book.title, Book.publication_year, Book.author_id,
+            Book.total_copies, Book.available_count,
+            BookCopy.id.label("copy_id"), BookCopy.borrowed_at, BookCopy.due_at,
+        )
+        .join(Book, Book.id == BookCopy.book_id)
+        .where(BookCopy.borrower_id == user_id)
+    )
+    if after_id is not None:
+        stmt = stmt.where(BookCopy.id > after_id)
+    result = await db.execute(stmt.order_by(BookCopy.id).limit(limit))
+    return result.all()   #type: ignore
+
+
+# Préstamos abiertos vencidos, ordenados por (due_at, id) sobre el índice parcial
+async def get_overdue_copies(
+    db: AsyncSession,
+    now: datetime,
+    after_due_at: Optional[datetime],
+    after_id: Optional[int],
+    limit: int,
+) -> List[BookCopy]:
+    stmt = select(BookCopy).where(BookCopy.borrower_id.is_not(None), BookCopy.due_at < now)
+    if after_due_at is not None and after_id is not None:
+        stmt = stmt.where(tuple_(BookCopy.due_at, BookCopy.id) > tuple_(after_due_at, after_id))
+    result = await db.execute(stmt.order_by(BookCopy.due_at, BookCopy.id).limit(limit))
+    return result.scalars().all()   #type: ignore
+
+
+# Marca como procesado un lote de préstamos vencidos y devuelve (copy_id, book_id, borrower_id)
+async def mark_overdue_batch(db: AsyncSession, now: datetime, batch_size: int) -> List[Tuple[int, int, int]]:
+    pending = (
+        select(BookCopy.id)
+        .where(
+            BookCopy.borrower_id.is_not(None),
+            BookCopy.overdue_notified_at.is_(None),
+            BookCopy.due_at < now,
+        )
+        .order_by(BookCopy.due_at)
+        .limit(batch_size)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        pending = pending.with_for_update(skip_locked=True)
+    copy_ids = (await db.execute(pending)).scalars().all()
+    if not copy_ids:
+        return []
+
+    result = await db.execute(
+        update(BookCopy)
+        .where(BookCopy.id.in_(copy_ids), BookCopy.overdue_notified_at.is_(None))
+        .values(overdue_notified_at=now)
+        .returning(BookCopy.id, BookCopy.book_id, BookCopy.borrower_id)
+        .execution_options(synchronize_session=False)
+    )
+    rows = [tuple(row) for row in result.all()]
+    await db.commit()
+    return rows
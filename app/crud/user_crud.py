@@ -1,7 +1,11 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy.engine import Row
+from sqlalchemy import select, delete, exists, lambda_stmt
 from app.db.models.user import User
-from typing import List, Optional
+from app.db.models.book_copy import BookCopy
+from app.db.models.hold import Hold
+from app.crud import change_crud
+from typing import List, Optional, Sequence
 
 
 #obtener todos
@@ -10,20 +14,38 @@ async def get_users(db: AsyncSession)-> List[User]:
     result = await db.execute(select(User))
     return result.scalars().all()   #type: ignore
 
-# obtener por email
+# Solo las columnas pedidas (?fields=); id va siempre para ordenar lotes
+async def get_users_columns(
+    db: AsyncSession, fields: Sequence[str], ids: Optional[List[int]] = None
+) -> List[Row]:
+    stmt = select(User.id, *[getattr(User, f) for f in fields if f != "id"])
+    if ids is not None:
+        stmt = stmt.where(User.id.in_(ids))
+    result = await db.execute(stmt)
+    return result.all()   #type: ignore
+
+# Varios por id en una sola consulta (WHERE id IN (...)); el orden lo arma el servicio
+async def get_users_by_ids(db: AsyncSession, ids: List[int]) -> List[User]:
+    result = await db.execute(select(User).where(User.id.in_(ids)))
+    return result.scalars().all()   #type: ignore
+
+# obtener por email (sentencia cacheada)
 async def get_user_by_email(db: AsyncSession, email: str) -> Optional[User]:
-    result = await db.execute(select(User).where(User.email == email))
+    result = await db.execute(lambda_stmt(lambda: select(User).where(User.email == email)))
     return result.scalar_one_or_none()
 
 
-#obtener por id
+#obtener por id (sentencia cacheada)
 async def get_user_by_id(db: AsyncSession, user_id: int) -> Optional[User]:
-    result = await db.execute(select(User).where(User.id == user_id))
+    result = await db.execute(lambda_stmt(lambda: select(User).where(User.id == user_id)))
     return result.scalar_one_or_none()
 
 #Crear usuario
 async def create_user(db: AsyncSession, user: User) -> User:
     db.add(user)
+    # flush para tener el id: el alta va al registro de cambios en el mismo commit
+    await db.flush()
+    await change_crud.record_change(db, "user", user.id, "upsert")
     await db.commit()
     await db.refresh(user)
     return user
@@ -31,12 +53,21 @@ async def create_user(db: AsyncSession, user: User) -> User:
 #Actualizar usuario
 
 async def update_user(db: AsyncSession, user: User) -> User:
+    await change_crud.record_change(db, "user", user.id, "upsert")
     await db.commit()
     await db.refresh(user)
     return user
 
+#¿Tiene libros prestados? EXISTS sobre el índice de book_copies.borrower_id
+
+async def has_borrowed_copies(db: AsyncSession, user_id: int) -> bool:
+    result = await db.execute(select(exists().where(BookCopy.borrower_id == user_id)))
+    return result.scalar()   #type: ignore
+
 #Borrar usuario
 
 async def delete_user(db: AsyncSession, user: User) -> None:
+    await db.execute(delete(Hold).where(Hold.user_id == user.id))
     await db.delete(user)
+    await change_crud.record_change(db, "user", user.id, "delete")
     await db.commit()
\ No newline at end of file
@@ -1,8 +1,16 @@
 
+from sqlalchemy import DDL, event
 from sqlalchemy.orm import DeclarativeBase
 
 class Base(DeclarativeBase):
     pass
 
+# Los índices de trigramas (búsqueda difusa) necesitan pg_trgm en PostgreSQL
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
 # export explícito
 __all__ = ["Base"]
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+from app.core.metrics import metrics
+
+logger = logging.getLogger("uvicorn.error")
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+metrics.describe("db_circuit_state", "Estado del circuito de la BD (0 cerrado, 1 semiabierto, 2 abierto)")
+metrics.describe("db_circuit_transitions_total", "Cambios de estado del circuito de la BD")
+
+
+class CircuitBreaker:
+    """
+    Circuito alrededor del engine, según la tasa de error reciente:
+
+    - cerrado: todo pasa; si en la ventana hay al menos `min_calls` llamadas y
+      la proporción de errores supera `error_rate`, se abre.
+    - abierto: las peticiones fallan de inmediato y una tarea de fondo ejecuta
+      `probe` cada `probe_interval` segundos.
+    - semiabierto: tras una sonda exitosa pasan peticiones; con
+      `half_open_successes` éxitos se cierra y con un fallo vuelve a abrirse.
+    """
+
+    def __init__(
+        self,
+        probe: Callable[[], Awaitable[None]],
+        error_rate: float,
+        min_calls: int,
+        window_seconds: float,
+        probe_interval: float,
+        half_open_successes: int = 3,
+        name: str = "db",
+    ):
+        self.probe = probe
+        self.error_rate = error_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.probe_interval = probe_interval
+        self.half_open_successes = half_open_successes
+        self.name = name
+        self.state = CLOSED
+        self._calls: deque = deque()
+        self._half_open_ok = 0
+        self._probe_task: Optional[asyncio.Task] = None
+        metrics.set("db_circuit_state", _STATE_VALUE[CLOSED], {"circuit": name})
+
+    def allow(self) -> bool:
+        return self.state != OPEN
+
+    def _transition(self, new_state: str) -> None:
+        if new_state == self.state:
+            return
+        logger.warning(f"Circuito {self.name}: {self.state} -> {new_state}")
+        metrics.inc("db_circuit_transitions_total", labels={"circuit": self.name, "from": self.state, "to": new_state})
+        metrics.set("db_circuit_state", _STATE_VALUE[new_state], {"circuit": self.name})
+        self.state = new_state
+        self._calls.clear()
+        self._half_open_ok = 0
+        if new_state == OPEN:
+            self._start_probe()
+
+    def _trim(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            self._calls.popleft()
+
+    def record_success(self) -> None:
+        if self.state == HALF_OPEN:
+            self._half_open_ok += 1
+            if self._half_open_ok >= self.half_open_successes:
+                self._transition(CLOSED)
+            return
+        now = time.monotonic()
+        self._calls.append((now, True))
+        self._trim(now)
+
+    def record_failure(self) -> None:
+        if self.state == HALF_OPEN:
+            self._transition(OPEN)
+            return
+        if self.state == OPEN:
+            return
+        now = time.monotonic()
+        self._calls.append((now, False))
+        self._trim(now)
+        failures = sum(1 for _, ok in self._calls if not ok)
+        if len(self._calls) >= self.min_calls and failures / len(self._calls) >= self.error_rate:
+            self._transition(OPEN)
+
+    def _start_probe(self) -> None:
+        if self._probe_task is not None and not self._probe_task.done():
+            return
+        try:
+            self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop())
+        except RuntimeError:
+            # Sin event loop (p. ej. en pruebas síncronas) no hay sondas
+            self._probe_task = None
+
+    async def _probe_loop(self) -> None:
+        while self.state == OPEN:
+            await asyncio.sleep(self.probe_interval)
+            try:
+                await self.probe()
+            except Exception as e:
+                logger.info(f"Sonda del circuito {self.name} falló: {e}")
+                continue
+            self._transition(HALF_OPEN)
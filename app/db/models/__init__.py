@@ -1,4 +1,8 @@
 from app.db.models.user import User
 from app.db.models.author import Author
 from app.db.models.book import Book
+from app.db.models.book_copy import BookCopy
+from app.db.models.loan_event import LoanEvent
+from app.db.models.hold import Hold
+from app.db.models.change import Change
 #igual, necesito esto aqui porque mi pces rara y sin esto aqui no importa estos archivos en toros lados que se necesitan
\ No newline at end of file
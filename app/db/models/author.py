@@ -1,14 +1,25 @@
 from __future__ import annotations
 from datetime import date
-from sqlalchemy import Integer, String, Date
+from sqlalchemy import Integer, String, Date, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 
 class Author(Base):
     __tablename__ = "authors"
+    __table_args__ = (
+        # Candidatos de la búsqueda difusa (solo PostgreSQL; en SQLite usa el índice en memoria)
+        Index(
+            "ix_authors_name_trgm", "name",
+            postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        # Orden por autor en /books/search?sort=author
+        Index("ix_authors_name_id", "name", "id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String, nullable=False)
     birth_date: Mapped[date] = mapped_column(Date, nullable=True)
-    # Relación con libros
-    books: Mapped[list["Book"]] = relationship("Book", back_populates="author") # type: ignore
+    # Contador desnormalizado que mantiene BookService en la misma transacción
+    book_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    # Relación con libros; al borrar no se carga la colección (lo valida AuthorService con EXISTS)
+    books: Mapped[list["Book"]] = relationship("Book", back_populates="author", passive_deletes=True) # type: ignore
@@ -1,11 +1,33 @@
 from __future__ import annotations
 from typing import Optional
-from sqlalchemy import Integer, String, ForeignKey
+from sqlalchemy import Integer, String, ForeignKey, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.base import Base
 
 class Book(Base):
     __tablename__ = "books"
+    __table_args__ = (
+        # Candidatos de la búsqueda difusa (solo PostgreSQL; en SQLite usa el índice en memoria)
+        Index(
+            "ix_books_title_trgm", "title",
+            postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        # Un índice por orden de /books/search?sort= (id desempata el keyset);
+        # los parciales cubren available_only=true
+        Index("ix_books_title_id", "title", "id"),
+        Index("ix_books_year_id", "publication_year", "id"),
+        Index("ix_books_author_id_id", "author_id", "id"),
+        Index(
+            "ix_books_available_title_id", "title", "id",
+            postgresql_where=text("available_count > 0"),
+            sqlite_where=text("available_count > 0"),
+        ),
+        Index(
+            "ix_books_available_year_id", "publication_year", "id",
+            postgresql_where=text("available_count > 0"),
+            sqlite_where=text("available_count > 0"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     title: Mapped[str] = mapped_column(String, nullable=False)
@@ -14,5 +36,13 @@ class Book(Base):
     author_id: Mapped[int] = mapped_column(ForeignKey("authors.id"), nullable=False)
     author: Mapped["Author"] = relationship("Author", back_populates="books")  # type: ignore
 
-    borrower_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"), nullable=True)
-    borrower: Mapped[Optional["User"]] = relationship("User", back_populates="books")  # type: ignore
+    # Ejemplares físicos; available_count responde la disponibilidad en O(1)
+    total_copies: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+    available_count: Mapped[int] = mapped_column(Integer, nullable=False, default=1, server_default="1")
+    copies: Mapped[list["BookCopy"]] = relationship("BookCopy", back_populates="book", passive_deletes=True)  # type: ignore
+
+    # Un libro nuevo tiene un ejemplar disponible salvo que se indique otra cosa
+    def __init__(self, **kwargs):
+        kwargs.setdefault("total_copies", 1)
+        kwargs.setdefault("available_count", kwargs["total_copies"])
+        super().__init__(**kwargs)
@@ -0,0 +1,38 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Integer, DateTime, ForeignKey, Index, text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from app.db.base import Base
+
+class BookCopy(Base):
+    __tablename__ = "book_copies"
+    __table_args__ = (
+        # Buscar un ejemplar libre de un título recorre solo este índice
+        Index("ix_book_copies_book_borrower", "book_id", "borrower_id"),
+        # Préstamos de un usuario paginados por id (también sirve para buscar por borrower_id)
+        Index("ix_book_copies_borrower_id_id", "borrower_id", "id"),
+        # Índices parciales: solo préstamos abiertos, ordenados por vencimiento
+        Index(
+            "ix_book_copies_open_due", "due_at", "id",
+            postgresql_where=text("borrower_id IS NOT NULL"),
+            sqlite_where=text("borrower_id IS NOT NULL"),
+        ),
+        Index(
+            "ix_book_copies_overdue_pending", "due_at",
+            postgresql_where=text("borrower_id IS NOT NULL AND overdue_notified_at IS NULL"),
+            sqlite_where=text("borrower_id IS NOT NULL AND overdue_notified_at IS NULL"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    book_id: Mapped[int] = mapped_column(ForeignKey("books.id"), nullable=False)
+    book: Mapped["Book"] = relationship("Book", back_populates="copies")  # type: ignore
+
+    # Préstamo actual del ejemplar (NULL = disponible)
+    borrower_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"), nullable=True)
+    borrower: Mapped[Optional["User"]] = relationship("User", back_populates="borrowed_copies")  # type: ignore
+    borrowed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    due_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    # Se marca cuando el barrido de vencidos ya procesó este préstamo
+    overdue_notified_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
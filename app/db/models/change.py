@@ -0,0 +1,37 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Integer, BigInteger, String, DateTime, Index, func, text
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+# Registro de cambios del catálogo para sincronizar clientes (GET /changes?since=).
+# Solo dice qué entidad cambió; el cliente vuelve a pedir las que le interesan
+class Change(Base):
+    __tablename__ = "changes"
+    __table_args__ = (
+        # La compactación busca cambios más nuevos de la misma entidad
+        Index("ix_changes_entity_entity_id_id", "entity", "entity_id", "id"),
+        Index("ix_changes_seq", "seq", unique=True),
+        # Filas que el secuenciador todavía no numeró
+        Index(
+            "ix_changes_unsequenced", "txid", "id",
+            postgresql_where=text("seq IS NULL"),
+            sqlite_where=text("seq IS NULL"),
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # Posición en el feed; la asigna change_crud.assign_sequence después del commit
+    seq: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    # Transacción que escribió la fila (pg_current_xact_id en PostgreSQL; en SQLite va NULL)
+    txid: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    # "book", "author" o "user"
+    entity: Mapped[str] = mapped_column(String(10), nullable=False)
+    # Sin FK: el cambio de una entidad borrada debe quedar registrado
+    entity_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    # "upsert" o "delete"
+    op: Mapped[str] = mapped_column(String(10), nullable=False)
+    changed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
@@ -0,0 +1,21 @@
+from __future__ import annotations
+from datetime import datetime
+from sqlalchemy import Integer, DateTime, ForeignKey, Index, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+# Cola de reservas por título: el orden FIFO lo da el id
+class Hold(Base):
+    __tablename__ = "holds"
+    __table_args__ = (
+        # Cabeza de la cola y posición = rango del índice (book_id, id)
+        Index("ix_holds_book_id_id", "book_id", "id"),
+        UniqueConstraint("book_id", "user_id", name="uq_holds_book_user"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    book_id: Mapped[int] = mapped_column(ForeignKey("books.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id"), nullable=False, index=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
@@ -0,0 +1,20 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Integer, String, DateTime, Index
+from sqlalchemy.orm import Mapped, mapped_column
+from app.db.base import Base
+
+# Historial de préstamos: solo se insertan filas, nunca se actualizan
+class LoanEvent(Base):
+    __tablename__ = "loan_events"
+    # Historial por usuario paginado por id (keyset)
+    __table_args__ = (Index("ix_loan_events_user_id_id", "user_id", "id"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    # Sin FK: el historial se conserva aunque se borre el usuario o el libro
+    user_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    book_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    copy_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    event: Mapped[str] = mapped_column(String(20), nullable=False)
+    occurred_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
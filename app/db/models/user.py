@@ -17,4 +17,4 @@ class User(Base):
         DateTime(timezone=True), server_default=func.now()
     )
 
-    books: Mapped[list["Book"]] = relationship("Book", back_populates="borrower")  # type: ignore
+    borrowed_copies: Mapped[list["BookCopy"]] = relationship("BookCopy", back_populates="borrower", passive_deletes=True)  # type: ignore
@@ -1,24 +1,145 @@
+import asyncio
+import functools
 import logging
+import random
+from contextvars import ContextVar
+from typing import Callable, List, Optional
+from fastapi.routing import APIRoute
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import OperationalError, InterfaceError
 from fastapi import HTTPException, status
 from app.core.config import settings
+from app.db.circuit import CircuitBreaker
+from app.exceptions import DatabaseUnavailable
 
 logger = logging.getLogger("uvicorn.error")
 
 engine = create_async_engine(settings.DATABASE_URL,
                               echo = False
 )
-AsyncLocalSession = async_sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False, class_=AsyncSession)
 
+# Errores que indican caída o corte de la conexión, no errores de la consulta
+TRANSIENT_ERRORS = (OperationalError, InterfaceError, OSError)
+
+
+async def _probe_database() -> None:
+    async with engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+db_breaker = CircuitBreaker(
+    probe=_probe_database,
+    error_rate=settings.DB_CIRCUIT_ERROR_RATE,
+    min_calls=settings.DB_CIRCUIT_MIN_CALLS,
+    window_seconds=settings.DB_CIRCUIT_WINDOW_SECONDS,
+    probe_interval=settings.DB_CIRCUIT_PROBE_INTERVAL_SECONDS,
+)
+
+
+class ResilientSession(AsyncSession):
+    """
+    AsyncSession que informa al circuito del resultado de cada sentencia y
+    reintenta lecturas ante errores transitorios con backoff exponencial y
+    jitter. El circuito ve un resultado por sentencia, no por intento: un
+    fallo si se agotan los reintentos, un éxito si alguno sale bien. Solo se reintenta si la sesión todavía no cargó ni modificó
+    objetos: el rollback previo al reintento no invalida nada ya leído.
+    """
+
+    breaker = db_breaker
+
+    def _can_retry(self, statement) -> bool:
+        return (
+            getattr(statement, "is_select", False)
+            and not self.identity_map
+            and not (self.new or self.dirty or self.deleted)
+        )
+
+    async def execute(self, statement, *args, **kwargs):
+        attempts = settings.DB_RETRY_ATTEMPTS if self._can_retry(statement) else 0
+        for attempt in range(attempts + 1):
+            try:
+                result = await super().execute(statement, *args, **kwargs)
+            except TRANSIENT_ERRORS:
+                if attempt >= attempts or not self.breaker.allow():
+                    self.breaker.record_failure()
+                    raise
+                await self.rollback()
+                backoff = settings.DB_RETRY_BASE_MS / 1000 * (2 ** attempt)
+                await asyncio.sleep(random.uniform(0, backoff))
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def commit(self) -> None:
+        try:
+            await super().commit()
+        except TRANSIENT_ERRORS:
+            self.breaker.record_failure()
+            raise
+
+
+AsyncLocalSession = async_sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False, class_=ResilientSession)
+
+# La sesión no toma conexión del pool hasta la primera consulta (autobegin).
+# Con el circuito abierto se responde 503 sin esperar timeouts de conexión.
 async def get_async_db():
+    if not db_breaker.allow():
+        raise DatabaseUnavailable(retry_after=settings.DB_CIRCUIT_PROBE_INTERVAL_SECONDS)
     async with AsyncLocalSession() as session:
+        track_session(session)
         try:
             yield session
-        except OperationalError as oe:
+        except TRANSIENT_ERRORS as oe:
             logger.error(f"Ocurrió un error al conectar con la base de datos: {oe}")
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="Fallo en la base de datos"
             )
-# como estoy usando async no debo cerrar "manualmente"
\ No newline at end of file
+# como estoy usando async no debo cerrar "manualmente"
+
+
+# Sesiones abiertas durante la request actual, incluidas las que piden
+# sub-dependencias como get_current_user y que nunca llegan al endpoint
+_request_sessions: ContextVar[Optional[List[AsyncSession]]] = ContextVar("request_sessions", default=None)
+
+
+def track_session(session: AsyncSession) -> AsyncSession:
+    """
+    Registra la sesión para que EarlyReleaseRoute la cierre aunque llegue al
+    endpoint a través de otra dependencia.
+    """
+    sessions = _request_sessions.get()
+    if sessions is None:
+        sessions = []
+        _request_sessions.set(sessions)
+    sessions.append(session)
+    return session
+
+
+def release_sessions_early(endpoint: Callable) -> Callable:
+    """
+    Envuelve un endpoint para cerrar las sesiones de la request apenas termina
+    la llamada al servicio, antes de serializar la respuesta. Cierra tanto las
+    que recibe como parámetro como las registradas con track_session. Con
+    expire_on_commit=False los objetos ya cargados siguen siendo legibles.
+    """
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        try:
+            return await endpoint(*args, **kwargs)
+        finally:
+            sessions = [value for value in kwargs.values() if isinstance(value, AsyncSession)]
+            sessions.extend(_request_sessions.get() or [])
+            _request_sessions.set(None)
+            # close() es idempotente, así que no importa si una sesión se repite
+            for session in sessions:
+                await session.close()
+
+    return wrapper
+
+
+# Ruta que devuelve la conexión al pool antes de serializar la respuesta
+class EarlyReleaseRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, release_sessions_early(endpoint), **kwargs)
@@ -17,6 +17,20 @@ class AuthorHasBooks(HTTPException):
         super().__init__(status_code=400, detail="El autor tiene libros asociados")
 
 
+class UserHasLoans(HTTPException):
+    def __init__(self):
+        super().__init__(status_code=400, detail="El usuario tiene libros prestados")
+
+
+class DatabaseUnavailable(HTTPException):
+    def __init__(self, retry_after: int = 5):
+        super().__init__(
+            status_code=503,
+            detail="Base de datos no disponible",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
 class NotFound(HTTPException):
     def __init__(self, entity: str = "Recurso"):
         super().__init__(status_code=404, detail=f"{entity} no encontrado")
@@ -45,6 +59,13 @@ def register_exception_handler(app: FastAPI):
             content={"status": "error", "message": exc.detail}
         )
 
+    @app.exception_handler(UserHasLoans)
+    async def user_has_loans_handler(request: Request, exc: UserHasLoans):
+        return JSONResponse(
+            status_code=exc.status_code,
+            content={"status": "error", "message": exc.detail}
+        )
+
     @app.exception_handler(NotFound)
     async def not_found_handler(request: Request, exc: NotFound):
         return JSONResponse(
@@ -52,5 +73,13 @@ def register_exception_handler(app: FastAPI):
             content={"status": "error", "message": exc.detail}
         )
 
+    @app.exception_handler(DatabaseUnavailable)
+    async def database_unavailable_handler(request: Request, exc: DatabaseUnavailable):
+        return JSONResponse(
+            status_code=exc.status_code,
+            content={"status": "error", "message": exc.detail},
+            headers=exc.headers
+        )
+
 
 #al final no usé esto
\ No newline at end of file
@@ -1,14 +1,30 @@
 from fastapi import FastAPI
-from app.routers import user_router, author_router, book_router, auth
+from app.routers import user_router, author_router, book_router, auth, health, metrics, loan_router, catalog_router, change_router
 from app.exceptions import register_exception_handler
+from app.core.profiling import ProfilerMiddleware, install_sql_timer
+from app.core.concurrency import ConcurrencyLimitMiddleware
+from app.core.lifespan import lifespan
+from app.db.session import engine
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+# Perfilado de peticiones bajo demanda
+install_sql_timer(engine)
+app.add_middleware(ProfilerMiddleware)
+
+# Limita la concurrencia hacia la BD y descarta el exceso con 503
+app.add_middleware(ConcurrencyLimitMiddleware)
 
 # Routers
 app.include_router(auth.router)
 app.include_router(user_router.router)
 app.include_router(book_router.router)
 app.include_router(author_router.router)
+app.include_router(loan_router.router)
+app.include_router(catalog_router.router)
+app.include_router(change_router.router)
+app.include_router(health.router)
+app.include_router(metrics.router)
 
 register_exception_handler(app)
 
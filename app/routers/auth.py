@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Depends, Form, HTTPException
+from fastapi import APIRouter, Depends, Form, HTTPException, Query
+from typing import List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.db.session import get_async_db
+from app.db.session import get_async_db, EarlyReleaseRoute
 from app.db.models.user import User
 from app.schemas.user import UserOut
+from app.schemas.loan import BorrowedBookOut
+from app.services.loan_service import loan_service
 from app.services import auth as auth_service
 from app.schemas.auth import JWT
-from app.core.security import get_current_user
+from app.core.security import get_current_user, get_current_user_id
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+router = APIRouter(prefix="/auth", tags=["auth"], route_class=EarlyReleaseRoute)
 
 
 # Login usando solo email y password
@@ -33,3 +36,17 @@ async def read_current_user(
     Devuelve los datos del usuario autenticado según el JWT enviado en headers.
     """
     return current_user
+
+
+# Libros que tiene prestados el usuario autenticado
+@router.get("/me/books", response_model=List[BorrowedBookOut])
+async def read_current_user_books(
+    after_id: Optional[int] = Query(None, description="copy_id del último libro recibido"),
+    limit: int = Query(50, ge=1, le=200),
+    user_id: int = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    El id sale del JWT, así que no se consulta la fila del usuario.
+    """
+    return await loan_service.current_loans(db, user_id, after_id, limit, validate_user=False)
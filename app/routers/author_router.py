@@ -1,22 +1,54 @@
-from fastapi import APIRouter, Depends, Response, status
+from fastapi import APIRouter, Depends, Response, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from typing import List, Literal, Optional, Union
 
-from app.db.session import get_async_db
+from app.db.session import get_async_db, EarlyReleaseRoute
 from app.services.author_service import author_service
-from app.schemas.author import CreateAuthor, UpdateAuthor, AuthorOut
+from app.schemas.author import CreateAuthor, UpdateAuthor, AuthorOut, AuthorDetailOut
+from app.schemas.batch import Batch
+from app.services.sparse import parse_fields, sparse_response
+from app.db.models.author import Author
 
-router = APIRouter(prefix="/authors", tags=["authors"])
+router = APIRouter(prefix="/authors", tags=["authors"], route_class=EarlyReleaseRoute)
 
 
-@router.get("", response_model=List[AuthorOut])
-async def get_authors(session: AsyncSession = Depends(get_async_db)):
-    return await author_service.consult_all(session)
+# ?include=book_count agrega el número de libros de cada autor; ?ids= lee por lotes;
+# ?fields= devuelve solo esas columnas (entonces include no aplica)
+@router.get(
+    "",
+    response_model=Union[List[AuthorDetailOut], Batch[AuthorDetailOut]],
+    response_model_exclude_unset=True
+)
+async def get_authors(
+    include: List[Literal["book_count"]] = Query([]),
+    ids: Optional[str] = Query(None, description="ids separados por coma", examples=["3,1,7"]),
+    fields: Optional[str] = Query(None, description="campos separados por coma", examples=["id,name"]),
+    session: AsyncSession = Depends(get_async_db)
+):
+    if fields is not None:
+        selected = parse_fields(fields, AuthorDetailOut, Author)
+        if ids is not None:
+            return sparse_response(AuthorDetailOut, selected, await author_service.list_many_fields(session, ids, selected), "batch")
+        return sparse_response(AuthorDetailOut, selected, await author_service.consult_all_fields(session, selected))
+    if ids is not None:
+        return await author_service.list_many(session, ids, include)
+    return await author_service.list_detailed(session, include)
 
 
-@router.get("/{author_id}", response_model=AuthorOut)
-async def get_author(author_id: int, session: AsyncSession = Depends(get_async_db)):
-    return await author_service.consult_by_id(session, author_id)
+# ?include=books embebe los primeros libros del autor, ?include=book_count su total
+@router.get("/{author_id}", response_model=AuthorDetailOut, response_model_exclude_unset=True)
+async def get_author(
+    author_id: int,
+    include: List[Literal["book_count", "books"]] = Query([]),
+    books_limit: int = Query(50, ge=1, le=200),
+    fields: Optional[str] = Query(None, description="campos separados por coma", examples=["id,name"]),
+    session: AsyncSession = Depends(get_async_db)
+):
+    if fields is not None:
+        selected = parse_fields(fields, AuthorDetailOut, Author)
+        row = await author_service.consult_by_id_fields(session, author_id, selected)
+        return sparse_response(AuthorDetailOut, selected, row, "one")
+    return await author_service.detail(session, author_id, include, books_limit)
 
 
 @router.post("", response_model=AuthorOut, status_code=status.HTTP_201_CREATED)
@@ -29,7 +61,13 @@ async def update_author(author_id: int, updates: UpdateAuthor, session: AsyncSes
     return await author_service.update(session, author_id, updates)
 
 
+# ?books=reassign&reassign_to=ID mueve sus libros; ?books=cascade los borra
 @router.delete("/{author_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_author(author_id: int, session: AsyncSession = Depends(get_async_db)):
-    await author_service.delete(session, author_id)
+async def delete_author(
+    author_id: int,
+    books: Literal["restrict", "reassign", "cascade"] = Query("restrict"),
+    reassign_to: Optional[int] = Query(None),
+    session: AsyncSession = Depends(get_async_db)
+):
+    await author_service.delete(session, author_id, books, reassign_to)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,36 +1,106 @@
-from fastapi import APIRouter, Depends, Response, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import List, Literal, Optional, Union
 
-from app.db.session import get_async_db
+from app.db.session import get_async_db, EarlyReleaseRoute
 from app.services.book_service import book_service
-from app.schemas.book import CreateBook, UpdateBook, BookOut, SearchBook, SearchBookOut
+from app.services.hold_service import hold_service
+from app.services.suggest import book_suggester
+from app.services.book_events import book_event_hub
+from app.schemas.hold import HoldOut
+from app.schemas.batch import Batch
+from app.services.sparse import parse_fields, sparse_response
+from app.db.models.book import Book
+from app.schemas.book import CreateBook, UpdateBook, BookOut, SearchBook, SearchBookOut, SearchBookFacetedOut, SuggestionOut
 
-router = APIRouter(prefix="/books", tags=["books"])
+router = APIRouter(prefix="/books", tags=["books"], route_class=EarlyReleaseRoute)
 
 
 # Todos los endpoints NO requieren usuario autenticado
-@router.get("", response_model=List[BookOut])
-async def get_books(session: AsyncSession = Depends(get_async_db)):
+# ?fields=id,title: SELECT solo de esas columnas y JSON solo con ellas
+@router.get("", response_model=Union[List[BookOut], Batch[BookOut]])
+async def get_books(
+    ids: Optional[str] = Query(None, description="ids separados por coma", examples=["3,1,7"]),
+    fields: Optional[str] = Query(None, description="campos separados por coma", examples=["id,title"]),
+    session: AsyncSession = Depends(get_async_db)
+):
+    if fields is not None:
+        selected = parse_fields(fields, BookOut, Book)
+        if ids is not None:
+            return sparse_response(BookOut, selected, await book_service.consult_many(session, ids, selected), "batch")
+        return sparse_response(BookOut, selected, await book_service.consult_all_fields(session, selected))
+    if ids is not None:
+        return await book_service.consult_many(session, ids)
     return await book_service.consult_all(session)
 
 
-@router.get("/search", response_model=List[SearchBookOut])
+# ?facets=true devuelve {"results", "facets"} con conteos por año, autor y disponibilidad
+@router.get("/search", response_model=Union[List[SearchBookOut], SearchBookFacetedOut])
 async def search_books(
     title: Optional[str] = Query(None, example="El principito"),
     author_name: Optional[str] = Query(None, example="Agatha Christie"),
     year: Optional[int] = Query(None, example=2008),
+    year_from: Optional[int] = Query(None, ge=0, examples=[1900]),
+    year_to: Optional[int] = Query(None, ge=0, examples=[1950]),
+    available_only: bool = Query(False, description="Solo libros con ejemplares libres"),
+    sort: Optional[Literal["title", "year", "-year", "author"]] = Query(
+        None, description="Orden paginado; al ordenar por año se omiten los libros sin año"
+    ),
+    after_value: Optional[str] = Query(None, description="Valor del campo de orden del último libro recibido"),
+    after_id: Optional[int] = Query(None, description="id del último libro recibido"),
+    after_author_id: Optional[int] = Query(None, description="author_id del último libro recibido (sort=author)"),
+    limit: int = Query(50, ge=1, le=200, description="Tamaño de página (solo con sort)"),
+    fuzzy: bool = Query(False, description="Tolera errores de tipeo y ordena por similitud (sin sort)"),
+    facets: bool = Query(False, description="Agrega conteos por año, autor y disponibilidad"),
     session: AsyncSession = Depends(get_async_db)
 ):
-    search_data = SearchBook(title=title, author_name=author_name, year=year)
+    search_data = SearchBook(
+        title=title, author_name=author_name, year=year, year_from=year_from, year_to=year_to,
+        available_only=available_only, fuzzy=fuzzy, sort=sort, after_value=after_value,
+        after_id=after_id, after_author_id=after_author_id, limit=limit
+    )
+    if facets:
+        return await book_service.search_with_facets(session, search_data)
     return await book_service.search(session, search_data)
 
 
+# Autocompletado: prefijos de títulos y autores desde el índice en memoria (sin BD)
+@router.get("/suggest", response_model=List[SuggestionOut])
+async def suggest_books(
+    q: str = Query(..., min_length=1, max_length=100, examples=["hob"]),
+    limit: int = Query(10, ge=1, le=20)
+):
+    return book_suggester.suggest(q, limit)
+
+
+# Server-Sent Events con los cambios de disponibilidad: borrow, return, create,
+# delete y availability (edición de copies) ({"book_id", "available_count"}).
+# Sin BD; el cliente reconecta solo
+@router.get("/events", response_class=StreamingResponse)
+async def book_events():
+    if book_event_hub.full():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many event subscribers",
+            headers={"Retry-After": "5"},
+        )
+    return StreamingResponse(
+        book_event_hub.stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/{book_id}", response_model=BookOut)
 async def get_book(
     book_id: int,
+    fields: Optional[str] = Query(None, description="campos separados por coma", examples=["id,title"]),
     session: AsyncSession = Depends(get_async_db)
 ):
+    if fields is not None:
+        selected = parse_fields(fields, BookOut, Book)
+        return sparse_response(BookOut, selected, await book_service.consult_by_id_fields(session, book_id, selected), "one")
     return await book_service.consult_by_id(session, book_id)
 
 
@@ -76,3 +146,32 @@ async def return_book(
     session: AsyncSession = Depends(get_async_db)
 ):
     return await book_service.return_book(session, book_id, user_id)
+
+
+# Cola de reservas: al devolverse un ejemplar pasa a la primera reserva
+@router.post("/{book_id}/hold", response_model=HoldOut, status_code=status.HTTP_201_CREATED)
+async def place_hold(
+    book_id: int,
+    user_id: int,
+    session: AsyncSession = Depends(get_async_db)
+):
+    return await hold_service.place(session, book_id, user_id)
+
+
+@router.get("/{book_id}/hold", response_model=HoldOut)
+async def get_hold(
+    book_id: int,
+    user_id: int,
+    session: AsyncSession = Depends(get_async_db)
+):
+    return await hold_service.position(session, book_id, user_id)
+
+
+@router.delete("/{book_id}/hold", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_hold(
+    book_id: int,
+    user_id: int,
+    session: AsyncSession = Depends(get_async_db)
+):
+    await hold_service.cancel(session, book_id, user_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
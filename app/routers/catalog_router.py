@@ -0,0 +1,33 @@
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Response, status
+from fastapi.responses import FileResponse
+
+from app.services.catalog_snapshot import catalog_snapshot
+
+router = APIRouter(prefix="/catalog", tags=["catalog"])
+
+
+# Catálogo completo (libros y autores) en un archivo gzip precalculado. Se sirve
+# desde el disco con sendfile y admite Range para retomar descargas; con
+# If-None-Match igual al ETag responde 304 sin cuerpo. Archivo y ETag se toman
+# juntos del enlace a la versión vigente
+@router.get("/snapshot", response_class=FileResponse)
+async def get_catalog_snapshot(if_none_match: Optional[str] = Header(None)):
+    current = catalog_snapshot.current()
+    if current is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Catalog snapshot not ready",
+            headers={"Retry-After": "5"},
+        )
+    path, version = current
+    etag = f'"{version}"'
+    if if_none_match and etag in (t.strip() for t in if_none_match.split(",")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+    return FileResponse(
+        path,
+        media_type="application/gzip",
+        filename="catalog.json.gz",
+        headers={"etag": etag, "Cache-Control": "no-cache"},
+    )
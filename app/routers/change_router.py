@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.session import get_async_db, EarlyReleaseRoute
+from app.schemas.change import ChangeFeedOut
+from app.services.change_service import change_service
+
+router = APIRouter(prefix="/changes", tags=["changes"], route_class=EarlyReleaseRoute)
+
+
+# Cambios de libros, autores y usuarios posteriores a since, en orden. Para
+# sincronizar: empezar con since=0 y seguir con next_since mientras has_more
+@router.get("", response_model=ChangeFeedOut)
+async def get_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    session: AsyncSession = Depends(get_async_db),
+):
+    return await change_service.feed(session, since, limit)
@@ -0,0 +1,52 @@
+import asyncio
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+from app.core.lifespan import readiness
+from app.db.session import engine
+
+router = APIRouter(prefix="/health", tags=["health"])
+
+
+def pool_status() -> dict:
+    pool = engine.pool
+    stats = {}
+    for name in ("size", "checkedin", "checkedout", "overflow"):
+        method = getattr(pool, name, None)
+        if method is not None:
+            stats[name] = method()
+    return stats
+
+
+async def ping_database(timeout: float = 2.0) -> bool:
+    try:
+        async with asyncio.timeout(timeout):
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
+
+
+@router.get("/live")
+async def live():
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+async def ready():
+    """
+    Lista solo cuando terminó el calentamiento del arranque y la BD responde.
+    """
+    database_ok = readiness.ready and await ping_database()
+    body = {
+        "status": "ready" if database_ok else "not_ready",
+        "warmed_up": readiness.ready,
+        "warmup_seconds": readiness.warmup_seconds,
+        "error": readiness.error,
+        "database": database_ok,
+        "pool": pool_status(),
+    }
+    code = status.HTTP_200_OK if database_ok else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(status_code=code, content=body)
@@ -0,0 +1,21 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+
+from app.db.session import get_async_db, EarlyReleaseRoute
+from app.services.overdue_service import overdue_service
+from app.schemas.loan import OverdueLoanOut
+
+router = APIRouter(prefix="/loans", tags=["loans"], route_class=EarlyReleaseRoute)
+
+
+# Préstamos vencidos. Para la siguiente página enviar due_at e id (copy_id) del último recibido.
+@router.get("/overdue", response_model=List[OverdueLoanOut])
+async def get_overdue_loans(
+    after_due_at: Optional[datetime] = Query(None),
+    after_id: Optional[int] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    session: AsyncSession = Depends(get_async_db),
+):
+    return await overdue_service.list_overdue(session, after_due_at, after_id, limit)
@@ -1,19 +1,35 @@
-from fastapi import APIRouter, Depends, Response, status
+from fastapi import APIRouter, Depends, Response, status, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import EmailStr
-from typing import List
+from typing import List, Optional, Union
 
-from app.db.session import get_async_db
+from app.db.session import get_async_db, EarlyReleaseRoute
 from app.services.user_service import user_service
+from app.services.loan_service import loan_service
 from app.schemas.user import UserCreate, UserOut, UpdateUser
+from app.schemas.loan import LoanEventOut, BorrowedBookOut
+from app.schemas.batch import Batch
+from app.services.sparse import parse_fields, sparse_response
+from app.db.models.user import User
 
-router = APIRouter(prefix="/users", tags=["users"])
+router = APIRouter(prefix="/users", tags=["users"], route_class=EarlyReleaseRoute)
 
 
 
 # Obtener todos los usuarios
-@router.get("", response_model=List[UserOut])
-async def get_users(session: AsyncSession = Depends(get_async_db)):
+@router.get("", response_model=Union[List[UserOut], Batch[UserOut]])
+async def get_users(
+    ids: Optional[str] = Query(None, description="ids separados por coma", examples=["3,1,7"]),
+    fields: Optional[str] = Query(None, description="campos separados por coma", examples=["id,name"]),
+    session: AsyncSession = Depends(get_async_db)
+):
+    if fields is not None:
+        selected = parse_fields(fields, UserOut, User)
+        if ids is not None:
+            return sparse_response(UserOut, selected, await user_service.get_many(session, ids, selected), "batch")
+        return sparse_response(UserOut, selected, await user_service.get_all_users_fields(session, selected))
+    if ids is not None:
+        return await user_service.get_many(session, ids)
     return await user_service.get_all_users(session)
 
 
@@ -28,10 +44,39 @@ async def get_user_by_email(
 
 # Obtener usuario por ID
 @router.get("/{id}", response_model=UserOut)
-async def get_user(id: int, session: AsyncSession = Depends(get_async_db)):
+async def get_user(
+    id: int,
+    fields: Optional[str] = Query(None, description="campos separados por coma", examples=["id,name"]),
+    session: AsyncSession = Depends(get_async_db)
+):
+    if fields is not None:
+        selected = parse_fields(fields, UserOut, User)
+        return sparse_response(UserOut, selected, await user_service.get_by_id_fields(session, id, selected), "one")
     return await user_service.get_by_id_with_validation(session, id)
 
 
+# Historial de préstamos del usuario, del más reciente al más antiguo
+@router.get("/{id}/loans", response_model=List[LoanEventOut])
+async def get_user_loans(
+    id: int,
+    before_id: Optional[int] = Query(None, description="id del último evento recibido"),
+    limit: int = Query(50, ge=1, le=200),
+    session: AsyncSession = Depends(get_async_db),
+):
+    return await loan_service.user_history(session, id, before_id, limit)
+
+
+# Libros que el usuario tiene prestados ahora
+@router.get("/{id}/books", response_model=List[BorrowedBookOut])
+async def get_user_books(
+    id: int,
+    after_id: Optional[int] = Query(None, description="copy_id del último libro recibido"),
+    limit: int = Query(50, ge=1, le=200),
+    session: AsyncSession = Depends(get_async_db),
+):
+    return await loan_service.current_loans(session, id, after_id, limit)
+
+
 # Crear usuario
 @router.post("", response_model=UserOut, status_code=status.HTTP_201_CREATED)
 async def create_user(
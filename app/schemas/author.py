@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict, Field, field_serializer, field_validator
-from typing import Optional
+from typing import List, Optional
 from datetime import date, datetime
 
 class BaseAuthor(BaseModel): 
@@ -42,3 +42,18 @@ class UpdateAuthor(BaseAuthor):
 class AuthorOut(BaseAuthor):
     id: int
     name: str = Field(..., json_schema_extra={"example": "Juan Paramo"})
+
+
+# Libro embebido en el detalle del autor
+class AuthorBookOut(BaseModel):
+    id: int
+    title: str
+    publication_year: Optional[int]
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Out con datos opcionales (?include=); lo no pedido no se envía
+class AuthorDetailOut(AuthorOut):
+    book_count: Optional[int] = None
+    books: Optional[List[AuthorBookOut]] = None
@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+from typing import Generic, List, TypeVar
+
+T = TypeVar("T")
+
+
+# Lectura por lotes: items en el orden pedido y los ids que no existen
+
+class Batch(BaseModel, Generic[T]):
+    items: List[T]
+    missing: List[int]
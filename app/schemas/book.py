@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict, Field
-from typing import Optional
+from typing import List, Literal, Optional
 from fastapi import Query
 
 
@@ -18,6 +18,10 @@ class CreateBook(BaseModel):
         ..., 
         json_schema_extra={"examples": [312]}
     )
+    copies: int = Field(
+        1, ge=1,
+        json_schema_extra={"examples": [3]}
+    )
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -37,6 +41,10 @@ class UpdateBook(BaseModel):
         None, 
         json_schema_extra={"examples": [4321]}
     )
+    copies: Optional[int] = Field(
+        None, ge=1,
+        json_schema_extra={"examples": [5]}
+    )
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -48,7 +56,8 @@ class BookOut(BaseModel):
     title: str
     publication_year: Optional[int]
     author_id: int
-    borrower_id: Optional[int]
+    total_copies: int
+    available_count: int
 
     model_config = ConfigDict(
         from_attributes=True,
@@ -58,7 +67,8 @@ class BookOut(BaseModel):
                 "title": "Firewalls don't Stop Dragons",
                 "publication_year": 1,
                 "author_id": 123,
-                "borrower_id": 333
+                "total_copies": 3,
+                "available_count": 1
             }
         }
     )
@@ -70,6 +80,19 @@ class SearchBook(BaseModel):
     title: Optional[str] = None
     author_name: Optional[str] = None
     year: Optional[int] = None
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+    available_only: bool = False
+    # Tolera errores de tipeo: ordena por similitud de trigramas
+    fuzzy: bool = False
+    # Orden paginado por keyset: after_value es el valor del campo de orden del
+    # último recibido (title, publication_year o author_name) y after_id su id;
+    # por autor va además after_author_id (author_id del último)
+    sort: Optional[Literal["title", "year", "-year", "author"]] = None
+    after_value: Optional[str] = None
+    after_id: Optional[int] = None
+    after_author_id: Optional[int] = None
+    limit: int = 50
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -89,7 +112,8 @@ class SearchBookOut(BaseModel):
     title: str
     publication_year: Optional[int]
     author_name: str
-    borrower_id: Optional[int]
+    total_copies: int
+    available_count: int
 
     model_config = ConfigDict(
         from_attributes=True,
@@ -99,7 +123,51 @@ class SearchBookOut(BaseModel):
                 "title": "El Principito",
                 "publication_year": 1943,
                 "author_name": "Antoine de Saint-Exupéry",
-                "borrower_id": 2
+                "total_copies": 2,
+                "available_count": 0
             }
         }
     )
+
+
+# Facetas de la búsqueda (conteos sobre el mismo conjunto filtrado)
+
+class YearFacet(BaseModel):
+    year: Optional[int]
+    count: int
+
+
+class AuthorFacet(BaseModel):
+    author_id: int
+    author_name: str
+    count: int
+
+
+class AvailabilityFacet(BaseModel):
+    available: int = 0
+    borrowed: int = 0
+
+
+class SearchFacets(BaseModel):
+    years: List[YearFacet]
+    authors: List[AuthorFacet]
+    availability: AvailabilityFacet
+
+
+class SearchBookFacetedOut(BaseModel):
+    results: List[SearchBookOut]
+    facets: SearchFacets
+
+
+# Sugerencia de autocompletado (título o autor)
+
+class SuggestionOut(BaseModel):
+    kind: Literal["title", "author"]
+    id: int
+    text: str
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {"kind": "title", "id": 12, "text": "El Hobbit"}
+        }
+    )
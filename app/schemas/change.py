@@ -0,0 +1,33 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from typing import List, Literal
+
+
+# Cambio del catálogo: el cliente vuelve a pedir la entidad (o la borra si op="delete")
+
+class ChangeOut(BaseModel):
+    seq: int
+    entity: Literal["book", "author", "user"]
+    entity_id: int
+    op: Literal["upsert", "delete"]
+    changed_at: datetime
+
+    model_config = ConfigDict(
+        from_attributes=True,
+        json_schema_extra={
+            "example": {
+                "seq": 1042,
+                "entity": "book",
+                "entity_id": 15,
+                "op": "upsert",
+                "changed_at": "2025-11-20T10:15:00Z"
+            }
+        }
+    )
+
+
+# Página del registro; la siguiente se pide con since=next_since
+class ChangeFeedOut(BaseModel):
+    changes: List[ChangeOut]
+    next_since: int
+    has_more: bool
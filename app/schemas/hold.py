@@ -0,0 +1,25 @@
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+
+
+# Reserva en la cola de un libro
+
+class HoldOut(BaseModel):
+    id: int
+    book_id: int
+    user_id: int
+    position: int
+    created_at: datetime
+
+    model_config = ConfigDict(
+        from_attributes=True,
+        json_schema_extra={
+            "example": {
+                "id": 7,
+                "book_id": 15,
+                "user_id": 2,
+                "position": 3,
+                "created_at": "2025-11-20T10:15:00Z"
+            }
+        }
+    )
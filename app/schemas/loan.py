@@ -0,0 +1,77 @@
+from pydantic import BaseModel, ConfigDict, Field
+from datetime import datetime
+from typing import Optional
+from app.schemas.book import BookOut
+
+
+# Evento del historial de préstamos
+
+class LoanEventOut(BaseModel):
+    id: int
+    user_id: int
+    book_id: int
+    copy_id: Optional[int]
+    event: str
+    occurred_at: datetime
+
+    model_config = ConfigDict(
+        from_attributes=True,
+        json_schema_extra={
+            "example": {
+                "id": 120,
+                "user_id": 2,
+                "book_id": 15,
+                "copy_id": 41,
+                "event": "borrow",
+                "occurred_at": "2025-11-20T10:15:00Z"
+            }
+        }
+    )
+
+
+# Préstamo vencido (ejemplar todavía no devuelto)
+
+class OverdueLoanOut(BaseModel):
+    copy_id: int = Field(validation_alias="id")
+    book_id: int
+    borrower_id: int
+    borrowed_at: Optional[datetime]
+    due_at: datetime
+
+    model_config = ConfigDict(
+        from_attributes=True,
+        json_schema_extra={
+            "example": {
+                "copy_id": 41,
+                "book_id": 15,
+                "borrower_id": 2,
+                "borrowed_at": "2025-11-01T10:15:00Z",
+                "due_at": "2025-11-15T10:15:00Z"
+            }
+        }
+    )
+
+
+# Libro que el usuario tiene prestado ahora (columnas de BookOut + el préstamo)
+
+class BorrowedBookOut(BookOut):
+    copy_id: int
+    borrowed_at: Optional[datetime]
+    due_at: Optional[datetime]
+
+    model_config = ConfigDict(
+        from_attributes=True,
+        json_schema_extra={
+            "example": {
+                "id": 15,
+                "title": "Muerte en el Nilo",
+                "publication_year": 1937,
+                "author_id": 3,
+                "total_copies": 3,
+                "available_count": 1,
+                "copy_id": 41,
+                "borrowed_at": "2025-11-01T10:15:00Z",
+                "due_at": "2025-11-15T10:15:00Z"
+            }
+        }
+    )
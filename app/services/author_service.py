@@ -1,10 +1,15 @@
-from typing import List
+from typing import Iterable, List, Literal, Optional, Sequence, Union
 from fastapi import HTTPException, status
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.models.author import Author
-from app.schemas.author import CreateAuthor, UpdateAuthor
-from app.crud import author_crud
+from app.schemas.author import CreateAuthor, UpdateAuthor, AuthorDetailOut, AuthorBookOut
+from app.crud import author_crud, book_crud
+from app.exceptions import AuthorHasBooks
+from app.services.batch import fetch_batch
+from app.services.invalidation import invalidation_bus
+from app.services.single_flight import single_flight
 
 class AuthorService:
 
@@ -18,9 +23,10 @@ class AuthorService:
             )
         return author
 
-    # Consultar todos los autores
-    async def consult_all(self, session: AsyncSession) -> List[Author]:
-        authors = await author_crud.get_authors(session)
+    # Consultar todos los autores; los listados concurrentes comparten una consulta.
+    # Se comparten esquemas, no objetos ORM de la sesión de otra petición
+    async def consult_all(self, session: AsyncSession) -> List[AuthorDetailOut]:
+        authors = await single_flight.do(("authors",), lambda: self._read_authors_out(session))
         if not authors:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -28,17 +34,79 @@ class AuthorService:
             )
         return authors
 
+    async def _read_authors_out(self, session: AsyncSession) -> List[AuthorDetailOut]:
+        authors = await author_crud.get_authors(session)
+        return [
+            AuthorDetailOut(id=a.id, name=a.name, birth_date=a.birth_date, book_count=a.book_count)
+            for a in authors
+        ]
+
     # Consultar autor por ID
     async def consult_by_id(self, session: AsyncSession, author_id: int) -> Author:
         return await self.get_by_id_with_validation(session, author_id)
 
+    # Solo se asignan los campos pedidos, así el router puede omitir el resto.
+    # author puede ser el modelo o un AuthorDetailOut (consult_all)
+    def to_detail(self, author: Union[Author, AuthorDetailOut], include: Iterable[str], books=None) -> AuthorDetailOut:
+        extra = {}
+        if "book_count" in include:
+            extra["book_count"] = author.book_count
+        if books is not None:
+            extra["books"] = [AuthorBookOut.model_validate(b) for b in books]
+        return AuthorDetailOut(id=author.id, name=author.name, birth_date=author.birth_date, **extra)
+
+    # Listado; book_count sale de la columna desnormalizada, sin contar libros
+    async def list_detailed(self, session: AsyncSession, include: Iterable[str]) -> List[AuthorDetailOut]:
+        authors = await self.consult_all(session)
+        return [self.to_detail(a, include) for a in authors]
+
+    # ?ids=1,2,3 -> una sola consulta; orden del pedido y lista de ids inexistentes
+    async def list_many(self, session: AsyncSession, ids: str, include: Iterable[str]) -> dict:
+        batch = await fetch_batch(session, ids, author_crud.get_authors_by_ids)
+        batch["items"] = [self.to_detail(a, include) for a in batch["items"]]
+        return batch
+
+    # Variantes con ?fields=: solo se leen esas columnas (include no aplica)
+    async def list_many_fields(self, session: AsyncSession, ids: str, fields: Sequence[str]) -> dict:
+        return await fetch_batch(session, ids, lambda s, i: author_crud.get_authors_columns(s, fields, i))
+
+    async def consult_all_fields(self, session: AsyncSession, fields: Sequence[str]) -> List[Row]:
+        rows = await author_crud.get_authors_columns(session, fields)
+        if not rows:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No author has been registered"
+            )
+        return rows
+
+    async def consult_by_id_fields(self, session: AsyncSession, author_id: int, fields: Sequence[str]) -> Row:
+        rows = await author_crud.get_authors_columns(session, fields, [author_id])
+        if not rows:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Author not registered"
+            )
+        return rows[0]
+
+    # Detalle; ?include=books trae los primeros `books_limit` libros en una consulta
+    async def detail(
+        self, session: AsyncSession, author_id: int, include: Iterable[str], books_limit: int
+    ) -> AuthorDetailOut:
+        author = await self.get_by_id_with_validation(session, author_id)
+        books = None
+        if "books" in include:
+            books = await author_crud.get_author_books(session, author_id, books_limit)
+        return self.to_detail(author, include, books)
+
     # Registrar nuevo autor
     async def register(self, session: AsyncSession, author_data: CreateAuthor) -> Author:
         new_author = Author(
             name=author_data.name,
             birth_date=author_data.birth_date  
         )
-        return await author_crud.create_author(session, new_author)
+        author = await author_crud.create_author(session, new_author)
+        invalidation_bus.publish({"kind": "author", "op": "create", "id": author.id, "name": author.name})
+        return author
 
     # Actualizar autor
     async def update(self, session: AsyncSession, author_id: int, updates: UpdateAuthor) -> Author:
@@ -47,12 +115,44 @@ class AuthorService:
             author.name = updates.name
         if updates.birth_date is not None:
             author.birth_date = updates.birth_date 
-        return await author_crud.update_author(session, author)
+        author = await author_crud.update_author(session, author)
+        invalidation_bus.publish({"kind": "author", "op": "update", "id": author.id, "name": author.name})
+        return author
 
-    # Eliminar autor
-    async def delete(self, session: AsyncSession, author_id: int) -> None:
+    # Eliminar autor. Con libros: "restrict" lo impide, "reassign" los pasa a
+    # reassign_to y "cascade" los borra; todo con sentencias en bloque, sin cargar libros
+    async def delete(
+        self,
+        session: AsyncSession,
+        author_id: int,
+        books: Literal["restrict", "reassign", "cascade"] = "restrict",
+        reassign_to: Optional[int] = None,
+    ) -> None:
         author = await self.get_by_id_with_validation(session, author_id)
-        await author_crud.delete_author(session, author)
+        moved_book_ids: List[int] = []
+        deleted_book_ids: List[int] = []
+        if books == "reassign":
+            if reassign_to is None or reassign_to == author_id:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="reassign_to must be a different author"
+                )
+            await self.get_by_id_with_validation(session, reassign_to)
+            moved_book_ids = await author_crud.reassign_books(session, author_id, reassign_to)
+        elif books == "cascade":
+            if await book_crud.author_has_borrowed_copies(session, author_id):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Cannot delete books that are currently borrowed"
+                )
+            deleted_book_ids = await book_crud.delete_author_books(session, author_id)
+        elif await author_crud.has_books(session, author_id):
+            raise AuthorHasBooks()
+        await author_crud.delete_author(session, author, moved_book_ids, deleted_book_ids)
+        invalidation_bus.publish({
+            "kind": "author", "op": "delete", "id": author_id,
+            "reassign_to": reassign_to if books == "reassign" else None,
+        })
 
 # Instancia global
 author_service = AuthorService()
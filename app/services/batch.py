@@ -0,0 +1,36 @@
+from typing import Awaitable, Callable, List, Sequence
+from fastapi import HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+
+# "3,1,3" -> [3, 1]: sin repetidos, en el orden pedido y con tope de settings.BATCH_MAX_IDS
+def parse_ids(raw: str) -> List[int]:
+    try:
+        ids = list(dict.fromkeys(int(part) for part in raw.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail="ids must be comma separated integers")
+    if not ids:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_CONTENT, detail="ids must not be empty")
+    if len(ids) > settings.BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.BATCH_MAX_IDS} ids per request"
+        )
+    return ids
+
+
+# Resuelve todos los ids con una sola consulta (loader = WHERE id IN (...)) y
+# arma la respuesta en el orden pedido, informando los que no existen
+async def fetch_batch(
+    session: AsyncSession,
+    raw_ids: str,
+    loader: Callable[[AsyncSession, List[int]], Awaitable[Sequence]],
+) -> dict:
+    ids = parse_ids(raw_ids)
+    found = {row.id: row for row in await loader(session, ids)}
+    return {
+        "items": [found[i] for i in ids if i in found],
+        "missing": [i for i in ids if i not in found],
+    }
@@ -0,0 +1,105 @@
+import asyncio
+import json
+from typing import AsyncIterator, Set
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+metrics.describe("book_events_subscribers", "Conexiones abiertas en GET /books/events")
+metrics.describe("book_events_published_total", "Eventos de libros publicados a los suscriptores")
+metrics.describe("book_events_dropped_subscribers_total", "Suscriptores desconectados por no leer a tiempo")
+
+# Comentario SSE: mantiene viva la conexión a través de proxies sin generar eventos
+HEARTBEAT = b": ping\n\n"
+
+
+class _Subscriber:
+    __slots__ = ("queue", "dropped")
+
+    def __init__(self, buffer_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(buffer_size)
+        self.dropped = False
+
+
+class BookEventHub:
+    """
+    Difunde en el proceso los eventos de libros (borrow, return, create,
+    delete y availability, cuando una edición cambia los disponibles) a las
+    conexiones de GET /books/events.
+
+    Cada evento se codifica una sola vez como bloque SSE y todos los
+    suscriptores comparten esos bytes; una conexión inactiva solo ocupa su
+    cola vacía. Las colas son acotadas: si un cliente no lee y la suya se
+    llena, se lo desconecta en lugar de frenar a los demás o acumular memoria.
+    publish() no espera nunca; los servicios lo llaman tras el commit.
+    """
+
+    def __init__(self, buffer_size: int, max_subscribers: int, heartbeat: float):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.heartbeat = heartbeat
+        self._subscribers: Set[_Subscriber] = set()
+        self._next_id = 0
+
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def full(self) -> bool:
+        return len(self._subscribers) >= self.max_subscribers
+
+    def publish(self, event: str, data: dict) -> None:
+        self._next_id += 1
+        frame = f"id: {self._next_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n".encode()
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                self._drop(subscriber, slow=True)
+        metrics.inc("book_events_published_total", labels={"event": event})
+
+    # Bloques SSE para una conexión; termina si se la descarta o al cerrar el hub
+    async def stream(self) -> AsyncIterator[bytes]:
+        subscriber = _Subscriber(self.buffer_size)
+        self._subscribers.add(subscriber)
+        metrics.set("book_events_subscribers", len(self._subscribers))
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    frame = await asyncio.wait_for(subscriber.queue.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    frame = HEARTBEAT
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self._unsubscribe(subscriber)
+
+    # Al apagar: corta todas las conexiones para que el servidor no las espere
+    def close(self) -> None:
+        for subscriber in list(self._subscribers):
+            self._drop(subscriber, slow=False)
+
+    def _unsubscribe(self, subscriber: _Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+        metrics.set("book_events_subscribers", len(self._subscribers))
+
+    # Vacía la cola y deja solo la marca de fin: el stream termina en su próxima lectura
+    def _drop(self, subscriber: _Subscriber, slow: bool) -> None:
+        if subscriber.dropped:
+            return
+        subscriber.dropped = True
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+        self._unsubscribe(subscriber)
+        if slow:
+            metrics.inc("book_events_dropped_subscribers_total")
+
+
+# Instancia global
+book_event_hub = BookEventHub(
+    settings.BOOK_EVENTS_BUFFER_SIZE,
+    settings.BOOK_EVENTS_MAX_SUBSCRIBERS,
+    settings.BOOK_EVENTS_HEARTBEAT_SECONDS,
+)
@@ -1,11 +1,26 @@
-from typing import List
+from datetime import datetime, timedelta, UTC
+from typing import List, Optional, Sequence, Tuple
 from fastapi import HTTPException, status
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
+from app.core.config import settings
 from app.crud import book_crud, author_crud
 from app.db.models.book import Book
-from app.schemas.book import CreateBook, UpdateBook, SearchBook, SearchBookOut
+from app.db.models.book_copy import BookCopy
+from app.exceptions import BookNotAvailable
+from app.schemas.book import (
+    BookOut, CreateBook, UpdateBook, SearchBook, SearchBookOut,
+    SearchBookFacetedOut, SearchFacets, YearFacet, AuthorFacet, AvailabilityFacet
+)
 from app.services.user_service import user_service
+from app.services.loan_events import loan_event_writer
+from app.services.batch import fetch_batch
+from app.services.suggest import book_suggester
+from app.services.search_cache import search_cache, normalize_search, search_key
+from app.services.invalidation import invalidation_bus
+from app.services.single_flight import single_flight
 
 
 class BookService:
@@ -27,17 +42,52 @@ class BookService:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No books found")
         return books
 
-    async def consult_by_id(self, session: AsyncSession, book_id: int) -> Book:
-        return await self.get_by_id_with_validation(session, book_id)
+    # ?ids=1,2,3 -> una sola consulta; orden del pedido y lista de ids inexistentes.
+    # Con fields solo se leen esas columnas
+    async def consult_many(self, session: AsyncSession, ids: str, fields: Optional[Sequence[str]] = None) -> dict:
+        if fields is None:
+            return await fetch_batch(session, ids, book_crud.get_books_by_ids)
+        return await fetch_batch(session, ids, lambda s, i: book_crud.get_books_columns(s, fields, i))
+
+    # Igual que consult_all / consult_by_id pero solo con las columnas de ?fields=
+    async def consult_all_fields(self, session: AsyncSession, fields: Sequence[str]) -> List[Row]:
+        rows = await book_crud.get_books_columns(session, fields)
+        if not rows:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No books found")
+        return rows
+
+    async def consult_by_id_fields(self, session: AsyncSession, book_id: int, fields: Sequence[str]) -> Row:
+        rows = await book_crud.get_books_columns(session, fields, [book_id])
+        if not rows:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Book not found")
+        return rows[0]
+
+    # Las lecturas concurrentes del mismo libro comparten una sola consulta. Se
+    # comparte un BookOut: el objeto ORM es de la sesión de quien hizo la consulta
+    async def consult_by_id(self, session: AsyncSession, book_id: int) -> BookOut:
+        return await single_flight.do(("book", book_id), lambda: self._read_book_out(session, book_id))
+
+    async def _read_book_out(self, session: AsyncSession, book_id: int) -> BookOut:
+        return BookOut.model_validate(await self.get_by_id_with_validation(session, book_id))
 
     async def register(self, session: AsyncSession, book_data: CreateBook) -> Book:
         await self.is_valid_author_id(session, book_data.author_id)
         new_book = Book(
             title=book_data.title,
             publication_year=book_data.publication_year,
-            author_id=book_data.author_id
+            author_id=book_data.author_id,
+            total_copies=book_data.copies,
+            available_count=book_data.copies,
+            copies=[BookCopy() for _ in range(book_data.copies)]
         )
-        return await book_crud.create_book(session, new_book)
+        # El contador del autor se confirma en el mismo commit que el libro
+        await author_crud.shift_book_count(session, book_data.author_id, 1)
+        book = await book_crud.create_book(session, new_book)
+        invalidation_bus.publish({
+            "kind": "book", "op": "create", "id": book.id, "title": book.title,
+            "author_id": book.author_id, "available_count": book.available_count,
+        })
+        return book
 
     async def update(self, session: AsyncSession, book_id: int, updates: UpdateBook) -> Book:
         book = await self.get_by_id_with_validation(session, book_id)
@@ -46,53 +96,200 @@ class BookService:
             book.title = updates.title
         if updates.publication_year is not None:
             book.publication_year = updates.publication_year
-        if updates.author_id is not None:
+        if updates.author_id is not None and updates.author_id != book.author_id:
             await self.is_valid_author_id(session, updates.author_id)
+            await author_crud.shift_book_count(session, book.author_id, -1)
+            await author_crud.shift_book_count(session, updates.author_id, 1)
             book.author_id = updates.author_id
+        handed: List[Tuple[int, int]] = []
+        previous_available = book.available_count
+        if updates.copies is not None and updates.copies != book.total_copies:
+            handed = await self.change_copies(session, book, updates.copies)
+
+        book = await book_crud.update_book(session, book)
+        # Ejemplares nuevos que pasaron directo a la cola de reservas
+        for copy_id, user_id in handed:
+            loan_event_writer.record("borrow", user_id, book.id, copy_id)
+        # Cambiar copies mueve available_count: los suscriptores de /books/events lo reciben
+        invalidation_bus.publish({
+            "kind": "book", "op": "update", "id": book.id, "title": book.title,
+            "author_id": book.author_id, "available_count": book.available_count,
+            "availability_changed": book.available_count != previous_available,
+        })
+        return book
 
-        return await book_crud.update_book(session, book)
+    # Devuelve los ejemplares nuevos entregados a reservas [(id del ejemplar, usuario)]
+    async def change_copies(self, session: AsyncSession, book: Book, copies: int) -> List[Tuple[int, int]]:
+        if copies > book.total_copies:
+            due_at = datetime.now(UTC) + timedelta(days=settings.LOAN_PERIOD_DAYS)
+            return await book_crud.add_copies(session, book.id, copies - book.total_copies, due_at)
+        if not await book_crud.remove_free_copies(session, book.id, book.total_copies - copies):
+            await session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Cannot remove copies that are currently borrowed"
+            )
+        return []
 
     async def delete(self, session: AsyncSession, book_id: int) -> None:
         book = await self.get_by_id_with_validation(session, book_id)
-        if book.borrower_id is not None:
+        if book.available_count < book.total_copies:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Cannot delete a book that is currently borrowed"
             )
+        await author_crud.shift_book_count(session, book.author_id, -1)
         await book_crud.delete_book(session, book)
+        invalidation_bus.publish({"kind": "book", "op": "delete", "id": book_id})
 
+    # Los resultados se guardan en search_cache con la clave normalizada; cualquier
+    # escritura del catálogo sube la generación y las entradas viejas dejan de valer
     async def search(self, session: AsyncSession, book_search: SearchBook) -> List[SearchBookOut]:
-        books_query = await book_crud.search_book(session, book_search)
-        for b in books_query:
-            await session.refresh(b, attribute_names=["author"])
-        if not books_query:
+        if book_search.sort in ("year", "-year") and book_search.after_value is not None:
+            if not book_search.after_value.lstrip("-").isdigit():
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="after_value must be a year when sorting by year"
+                )
+        # La búsqueda difusa ordena por similitud: no admite sort ni keyset
+        if book_search.fuzzy and (
+            book_search.sort or book_search.after_value is not None
+            or book_search.after_id is not None or book_search.after_author_id is not None
+        ):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Fuzzy search does not support sort or keyset paging"
+            )
+        if book_search.sort == "author" and book_search.after_value is not None and book_search.after_author_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="after_author_id is required when sorting by author"
+            )
+        book_search = normalize_search(book_search)
+        key = search_key(book_search)
+        results = search_cache.get(key)
+        if results is None:
+            # Con la caché vacía, las búsquedas iguales en curso comparten la consulta
+            results = await single_flight.do(("search", key), lambda: self._search_and_store(session, book_search, key))
+        if not results:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Books not found")
-        return [
-            SearchBookOut(
-                id=b.id,
-                title=b.title,
-                publication_year=b.publication_year,
-                author_name=b.author.name if b.author else "",
-                borrower_id=b.borrower_id
+        return results
+
+    async def _search_and_store(self, session: AsyncSession, book_search: SearchBook, key: tuple) -> List[SearchBookOut]:
+        generation = search_cache.generation
+        if book_search.fuzzy:
+            results = await self.fuzzy_search(session, book_search)
+        else:
+            # search_book ya trae el autor con selectinload
+            results = [self.to_search_out(b) for b in await book_crud.search_book(session, book_search)]
+        search_cache.put(key, generation, results)
+        return results
+
+    def to_search_out(self, b: Book) -> SearchBookOut:
+        return SearchBookOut(
+            id=b.id,
+            title=b.title,
+            publication_year=b.publication_year,
+            author_name=b.author.name if b.author else "",
+            total_copies=b.total_copies,
+            available_count=b.available_count
+        )
+
+    # Resultados + facetas (años, autores, disponibles/prestados) del mismo conjunto;
+    # las facetas salen de una sola consulta con varios GROUP BY
+    async def search_with_facets(self, session: AsyncSession, book_search: SearchBook) -> SearchBookFacetedOut:
+        book_search = normalize_search(book_search)
+        results = await self.search(session, book_search)
+        ids = [r.id for r in results] if book_search.fuzzy else None
+        rows = await book_crud.search_facets(session, book_search, settings.SEARCH_FACET_TOP_AUTHORS, ids)
+
+        years, authors, availability = [], [], AvailabilityFacet()
+        for facet, key, label, count in rows:
+            if facet == "year":
+                years.append(YearFacet(year=key, count=count))
+            elif facet == "author":
+                authors.append(AuthorFacet(author_id=key, author_name=label, count=count))
+            else:
+                setattr(availability, label, count)
+        years.sort(key=lambda y: (y.year is None, y.year))
+        authors.sort(key=lambda a: (-a.count, a.author_id))
+        return SearchBookFacetedOut(
+            results=results,
+            facets=SearchFacets(years=years, authors=authors, availability=availability)
+        )
+
+    # Tolera errores de tipeo ("Agata Cristie"). Los candidatos salen de un índice de
+    # trigramas (pg_trgm en PostgreSQL, el índice en memoria en SQLite) y se ordenan
+    # por similitud; con título y autor se promedian ambas
+    async def fuzzy_search(self, session: AsyncSession, book_search: SearchBook) -> List[SearchBookOut]:
+        if not book_search.title and not book_search.author_name:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Fuzzy search needs a title or an author_name"
             )
-            for b in books_query
-        ]
+        threshold, limit = settings.FUZZY_SEARCH_THRESHOLD, settings.FUZZY_SEARCH_LIMIT
 
+        if book_crud.supports_trigram_search(session):
+            ranked = await book_crud.fuzzy_search_book(session, book_search, threshold, limit)
+        else:
+            partial_scores = []
+            if book_search.title:
+                partial_scores.append(book_suggester.similar("title", book_search.title, threshold))
+            if book_search.author_name:
+                by_author = book_suggester.similar("author", book_search.author_name, threshold)
+                partial_scores.append({
+                    book_id: by_author[author_id]
+                    for book_id, author_id in book_suggester.books_by_authors(by_author).items()
+                })
+            candidates = set.intersection(*(set(p) for p in partial_scores))
+            scores = {i: sum(p[i] for p in partial_scores) / len(partial_scores) for i in candidates}
+            # Con filtros de año o disponibilidad se recorta después de filtrar en SQL
+            best = sorted(scores, key=lambda i: (-scores[i], i))
+            filtered = (
+                book_search.year or book_search.year_from is not None
+                or book_search.year_to is not None or book_search.available_only
+            )
+            if not filtered:
+                best = best[:limit]
+            books = await book_crud.get_books_with_author(session, best, book_search) if best else []
+            ranked = sorted(((b, scores[b.id]) for b in books), key=lambda r: (-r[1], r[0].id))[:limit]
+        return [self.to_search_out(book) for book, _ in ranked]
+
+    # Toma cualquier ejemplar libre; el contador evita buscar si no queda ninguno
     async def borrow(self, session: AsyncSession, book_id: int, user_id: int) -> Book:
         await user_service.get_by_id_with_validation(session, user_id)
         book = await self.get_by_id_with_validation(session, book_id)
-        if book.borrower_id is not None:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Book is already borrowed")
-        book.borrower_id = user_id
-        return await book_crud.update_book(session, book)
+        if book.available_count <= 0:
+            raise BookNotAvailable()
+        due_at = datetime.now(UTC) + timedelta(days=settings.LOAN_PERIOD_DAYS)
+        claimed = await book_crud.claim_copy(session, book_id, user_id, due_at)
+        if claimed is None:
+            raise BookNotAvailable()
+        copy_id, available = claimed
+        set_committed_value(book, "available_count", available)
+        loan_event_writer.record("borrow", user_id, book_id, copy_id)
+        # available_count cambia en búsquedas, snapshot y eventos; el préstamo suma popularidad
+        invalidation_bus.publish({"kind": "loan", "op": "borrow", "id": book_id, "available_count": available, "bump": True})
+        return book
 
+    # Si hay reservas, el ejemplar pasa directamente a la primera de la cola
     async def return_book(self, session: AsyncSession, book_id: int, user_id: int) -> Book:
         await user_service.get_by_id_with_validation(session, user_id)
         book = await self.get_by_id_with_validation(session, book_id)
-        if book.borrower_id != user_id:
+        due_at = datetime.now(UTC) + timedelta(days=settings.LOAN_PERIOD_DAYS)
+        released = await book_crud.release_copy(session, book_id, user_id, due_at)
+        if released is None:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Book not borrowed by this user")
-        book.borrower_id = None
-        return await book_crud.update_book(session, book)
+        copy_id, available, next_user_id = released
+        set_committed_value(book, "available_count", available)
+        loan_event_writer.record("return", user_id, book_id, copy_id)
+        if next_user_id is not None:
+            loan_event_writer.record("borrow", next_user_id, book_id, copy_id)
+        invalidation_bus.publish({
+            "kind": "loan", "op": "return", "id": book_id, "available_count": available,
+            "bump": next_user_id is not None,
+        })
+        return book
 
 
 book_service = BookService()
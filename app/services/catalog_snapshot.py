@@ -0,0 +1,172 @@
+import asyncio
+import fcntl
+import gzip
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.crud import author_crud, book_crud
+from app.db.session import AsyncLocalSession
+from app.schemas.author import AuthorOut
+from app.schemas.book import BookOut
+
+logger = logging.getLogger("uvicorn.error")
+
+metrics.describe("catalog_snapshot_builds_total", "Reconstrucciones del snapshot del catálogo")
+metrics.describe("catalog_snapshot_bytes", "Tamaño comprimido del snapshot del catálogo")
+
+_books_adapter = TypeAdapter(List[BookOut])
+_authors_adapter = TypeAdapter(List[AuthorOut])
+
+
+class CatalogSnapshot:
+    """
+    Archivo gzip con todo el catálogo ({"books", "authors"}) con la misma
+    forma que GET /books y GET /authors.
+
+    GET /catalog/snapshot lo sirve directo del disco (sendfile, rangos, ETag):
+    una descarga completa no consulta la BD ni serializa nada.
+
+    Cada versión se guarda con su hash en el nombre (catalog.json.gz.<hash>) y
+    `path` es un enlace simbólico a la vigente, que se cambia de forma atómica.
+    El ETag sale del nombre al que apunta el enlace, así que siempre describe
+    los bytes que se sirven, en cualquier worker y aunque haya cambiado recién.
+
+    Reconstruye un solo worker: el que tiene el flock de `path`.lock (si muere,
+    el sistema lo suelta y lo toma otro en la próxima escritura). Las escrituras
+    llaman a mark_dirty(); la reconstrucción espera `debounce` segundos para
+    juntar las escrituras de una ráfaga en un solo rearmado. Antes de start()
+    (tests, scripts) solo se anota que quedó desactualizado.
+    """
+
+    # Versiones que se conservan: una descarga que resolvió el enlace justo
+    # antes del cambio todavía puede abrir la anterior
+    KEEP_VERSIONS = 2
+
+    def __init__(self, path: str, debounce: float, session_factory: async_sessionmaker = AsyncLocalSession):
+        self.path = Path(path)
+        self.debounce = debounce
+        self.session_factory = session_factory
+        self._dirty = False
+        self._started = False
+        self._task: Optional[asyncio.Task] = None
+        self._lock_fd: Optional[int] = None
+
+    # Versión vigente en el disco: (archivo, etag) o None si todavía no hay
+    def current(self) -> Optional[Tuple[Path, str]]:
+        try:
+            target = os.readlink(self.path)
+        except OSError:
+            return None
+        prefix = f"{self.path.name}."
+        if not target.startswith(prefix):
+            return None
+        return self.path.parent / target, target[len(prefix):]
+
+    def ready(self) -> bool:
+        return self.current() is not None
+
+    # Desde el lifespan: arma el primer snapshot sin esperar
+    def start(self) -> None:
+        self._started = True
+        self.mark_dirty()
+
+    async def stop(self) -> None:
+        self._started = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def mark_dirty(self) -> None:
+        self._dirty = True
+        if self._started and (self._task is None or self._task.done()) and self._owns_rebuild():
+            self._task = asyncio.get_running_loop().create_task(self._rebuild_when_quiet(), name="catalog-snapshot")
+
+    # flock no bloqueante: lo consigue un solo proceso a la vez y se libera solo si muere
+    def _owns_rebuild(self) -> bool:
+        if self._lock_fd is not None:
+            return True
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path.with_name(f"{self.path.name}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    # Si llegan escrituras durante la reconstrucción, se vuelve a armar al final
+    async def _rebuild_when_quiet(self) -> None:
+        while self._dirty:
+            if self.ready():
+                await asyncio.sleep(self.debounce)
+            self._dirty = False
+            try:
+                await self.rebuild()
+            except Exception as e:
+                logger.error(f"Falló la reconstrucción del snapshot del catálogo: {e}")
+
+    async def rebuild(self) -> None:
+        async with self.session_factory() as session:
+            books = await book_crud.get_books(session)
+            authors = await author_crud.get_authors(session)
+            payload = b"".join([
+                b'{"books":',
+                _books_adapter.dump_json(_books_adapter.validate_python(books, from_attributes=True)),
+                b',"authors":',
+                _authors_adapter.dump_json(_authors_adapter.validate_python(authors, from_attributes=True)),
+                b"}",
+            ])
+        # La compresión y la escritura no bloquean el event loop
+        size = await asyncio.to_thread(self._write, payload)
+        metrics.inc("catalog_snapshot_builds_total")
+        metrics.set("catalog_snapshot_bytes", size)
+        logger.info(f"Snapshot del catálogo: {len(books)} libros, {len(authors)} autores, {size} bytes")
+
+    # Escribe la versión (si ya existe esa misma, no hace falta) y cambia el
+    # enlace con os.replace: una descarga en curso sigue leyendo la anterior
+    def _write(self, payload: bytes) -> int:
+        compressed = gzip.compress(payload, compresslevel=9, mtime=0)
+        etag = hashlib.sha256(compressed).hexdigest()[:32]
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        version = self.path.with_name(f"{self.path.name}.{etag}")
+        if not version.exists():
+            tmp = version.with_name(f"{version.name}.tmp")
+            tmp.write_bytes(compressed)
+            os.replace(tmp, version)
+        link = self.path.with_name(f"{self.path.name}.link.tmp")
+        link.unlink(missing_ok=True)
+        link.symlink_to(version.name)
+        os.replace(link, self.path)
+        self._prune(version)
+        return len(compressed)
+
+    # Borra las versiones viejas, salvo las KEEP_VERSIONS más recientes
+    def _prune(self, current: Path) -> None:
+        # Solo las versiones (el hash tiene largo fijo): no el lock ni los temporales
+        versions = [
+            v for v in self.path.parent.glob(f"{self.path.name}.*")
+            if v != current and len(v.name) == len(current.name)
+        ]
+        versions.sort(key=lambda v: v.stat().st_mtime, reverse=True)
+        for old in versions[self.KEEP_VERSIONS - 1:]:
+            old.unlink(missing_ok=True)
+
+
+# Instancia global
+catalog_snapshot = CatalogSnapshot(settings.CATALOG_SNAPSHOT_PATH, settings.CATALOG_SNAPSHOT_DEBOUNCE_SECONDS)
@@ -0,0 +1,51 @@
+import logging
+from datetime import datetime, timedelta, UTC
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.scheduler import PeriodicTask
+from app.crud import change_crud
+from app.db.session import AsyncLocalSession
+from app.schemas.change import ChangeFeedOut, ChangeOut
+
+logger = logging.getLogger("uvicorn.error")
+
+metrics.describe("changes_compacted_total", "Cambios del catálogo eliminados por la compactación")
+
+
+class ChangeService:
+
+    # Primero se numeran los cambios confirmados desde la última lectura; se lee
+    # una fila de más para saber si hay otra página sin contar
+    async def feed(self, session: AsyncSession, since: int, limit: int) -> ChangeFeedOut:
+        await change_crud.assign_sequence(session)
+        await session.commit()
+        rows = await change_crud.get_changes(session, since, limit + 1)
+        changes = [ChangeOut.model_validate(c) for c in rows[:limit]]
+        return ChangeFeedOut(
+            changes=changes,
+            next_since=changes[-1].seq if changes else since,
+            has_more=len(rows) > limit,
+        )
+
+    # Pasada la retención queda solo el último cambio de cada entidad: un cliente
+    # atrasado igual ve el estado final, y uno nuevo recorre un registro corto
+    async def compact(
+        self,
+        session_factory: async_sessionmaker = AsyncLocalSession,
+        retention: timedelta = timedelta(hours=settings.CHANGES_RETENTION_HOURS),
+    ) -> int:
+        async with session_factory() as session:
+            removed = await change_crud.compact_changes(session, datetime.now(UTC) - retention)
+        if removed:
+            metrics.inc("changes_compacted_total", removed)
+            logger.info(f"Compactación del registro de cambios: {removed} filas")
+        return removed
+
+
+# Instancia global
+change_service = ChangeService()
+
+change_compactor = PeriodicTask("changes-compaction", settings.CHANGES_COMPACT_INTERVAL_SECONDS, change_service.compact)
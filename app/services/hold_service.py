@@ -0,0 +1,56 @@
+from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import book_crud, hold_crud
+from app.db.models.hold import Hold
+from app.schemas.hold import HoldOut
+from app.services.book_service import book_service
+from app.services.user_service import user_service
+
+
+class HoldService:
+
+    async def get_by_user_with_validation(self, session: AsyncSession, book_id: int, user_id: int) -> Hold:
+        hold = await hold_crud.get_hold(session, book_id, user_id)
+        if not hold:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Hold not found")
+        return hold
+
+    async def to_out(self, session: AsyncSession, hold: Hold) -> HoldOut:
+        position = await hold_crud.get_hold_position(session, hold)
+        return HoldOut(
+            id=hold.id,
+            book_id=hold.book_id,
+            user_id=hold.user_id,
+            position=position,
+            created_at=hold.created_at
+        )
+
+    # Solo se reserva si no queda ningún ejemplar libre (si no, se presta directamente)
+    # y si el usuario no tiene ya un ejemplar del título
+    async def place(self, session: AsyncSession, book_id: int, user_id: int) -> HoldOut:
+        await user_service.get_by_id_with_validation(session, user_id)
+        book = await book_service.get_by_id_with_validation(session, book_id)
+        if book.available_count > 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Book is available, borrow it instead")
+        if await book_crud.user_has_copy(session, book_id, user_id):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="User already has this book")
+        try:
+            hold = await hold_crud.create_hold(session, Hold(book_id=book_id, user_id=user_id))
+        except IntegrityError:
+            await session.rollback()
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="User already has a hold on this book")
+        return await self.to_out(session, hold)
+
+    async def position(self, session: AsyncSession, book_id: int, user_id: int) -> HoldOut:
+        hold = await self.get_by_user_with_validation(session, book_id, user_id)
+        return await self.to_out(session, hold)
+
+    async def cancel(self, session: AsyncSession, book_id: int, user_id: int) -> None:
+        hold = await self.get_by_user_with_validation(session, book_id, user_id)
+        await hold_crud.delete_hold(session, hold)
+
+
+# Instancia global
+hold_service = HoldService()
@@ -0,0 +1,301 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.book_events import book_event_hub
+from app.services.catalog_snapshot import catalog_snapshot
+from app.services.search_cache import search_cache
+from app.services.suggest import book_suggester
+
+logger = logging.getLogger("uvicorn.error")
+
+metrics.describe("invalidation_messages_total", "Invalidaciones enviadas (sent) y recibidas de otros workers (received)")
+metrics.describe("invalidation_resyncs_total", "Resincronizaciones completas por mensajes perdidos o reconexión")
+
+
+# Aplica en este proceso lo que implica una escritura del catálogo: índice de
+# sugerencias, generación de la caché de búsquedas, snapshot y eventos SSE.
+# Mensajes:
+#   {"kind": "book", "op": "create" | "update" | "delete", "id", "title", "author_id", "available_count",
+#    "availability_changed"}
+#   {"kind": "loan", "op": "borrow" | "return", "id", "available_count", "bump"}
+#   {"kind": "author", "op": "create" | "update" | "delete", "id", "name", "reassign_to"}
+def apply_invalidation(message: dict) -> None:
+    kind, op, item_id = message["kind"], message["op"], message["id"]
+    if kind == "book":
+        if op == "delete":
+            book_suggester.remove_book(item_id)
+        else:
+            book_suggester.put_book(item_id, message["title"], message["author_id"])
+        if op != "update":
+            book_event_hub.publish(op, {"book_id": item_id, "available_count": message.get("available_count", 0)})
+        elif message.get("availability_changed"):
+            book_event_hub.publish("availability", {"book_id": item_id, "available_count": message["available_count"]})
+    elif kind == "loan":
+        if message.get("bump"):
+            book_suggester.bump(item_id)
+        book_event_hub.publish(op, {"book_id": item_id, "available_count": message["available_count"]})
+    elif kind == "author":
+        if op == "delete":
+            if message.get("reassign_to") is not None:
+                book_suggester.reassign_books(item_id, message["reassign_to"])
+            book_suggester.remove_author(item_id)
+        else:
+            book_suggester.put_author(item_id, message["name"])
+    search_cache.bump()
+    catalog_snapshot.mark_dirty()
+
+
+class InvalidationBus:
+    """
+    Difunde las escrituras del catálogo a todos los workers.
+
+    publish() aplica el mensaje en este proceso y lo envía a los demás con
+    el origen (un id por proceso) y un número de secuencia. Quien recibe
+    ignora sus propios mensajes y, si la secuencia de un origen salta, perdió
+    alguno: en lugar de adivinar qué cambió se resincroniza completo
+    (reconstruye el índice de sugerencias y descarta cachés y snapshot).
+
+    Cada `heartbeat` segundos se envía un latido con la última secuencia
+    publicada; si supera la última recibida de ese origen, se perdió el final
+    de una ráfaga (que ningún mensaje posterior delataría). La secuencia de
+    un origen empieza en 1, así que lo perdido antes de conocerlo también se
+    nota; un worker que arranca tarde resincroniza una vez por cada origen
+    que ya había publicado.
+
+    Esta clase base solo aplica localmente (un solo worker, tests); el
+    transporte lo ponen UnixSocketBus y PostgresNotifyBus.
+    """
+
+    def __init__(self, heartbeat: float = settings.INVALIDATION_BUS_HEARTBEAT_SECONDS):
+        self.origin = uuid.uuid4().hex
+        self.heartbeat = heartbeat
+        self._seq = 0
+        self._last_seen: Dict[str, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def publish(self, message: dict) -> None:
+        apply_invalidation(message)
+        self._seq += 1
+        data = json.dumps({**message, "origin": self.origin, "seq": self._seq}).encode()
+        metrics.inc("invalidation_messages_total", labels={"direction": "sent"})
+        self._send(data)
+
+    def _send(self, data: bytes) -> None:
+        pass
+
+    # Los transportes lo lanzan en start()
+    async def _beat(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            self._send(json.dumps({"kind": "heartbeat", "origin": self.origin, "seq": self._seq}).encode())
+
+    def _receive(self, data: bytes) -> None:
+        try:
+            message = json.loads(data)
+            origin, seq = message.pop("origin"), message.pop("seq")
+        except (ValueError, KeyError) as e:
+            logger.error(f"Invalidación ilegible: {e}")
+            return
+        if origin == self.origin:
+            return
+        heartbeat = message.get("kind") == "heartbeat"
+        if not heartbeat:
+            metrics.inc("invalidation_messages_total", labels={"direction": "received"})
+        last = self._last_seen.get(origin, 0)
+        self._last_seen[origin] = max(last, seq)
+        # El latido repite la última secuencia; un mensaje trae la siguiente
+        missed = seq > last if heartbeat else seq != last + 1
+        if missed:
+            logger.warning(f"Invalidaciones perdidas de {origin[:8]} ({last} -> {seq}); resincronizando")
+            self.request_resync()
+            return
+        if heartbeat:
+            return
+        apply_invalidation(message)
+
+    def request_resync(self) -> None:
+        self._spawn(self.resync())
+
+    async def resync(self) -> None:
+        metrics.inc("invalidation_resyncs_total")
+        search_cache.bump()
+        catalog_snapshot.mark_dirty()
+        try:
+            await book_suggester.build()
+        except Exception as e:
+            logger.error(f"Falló la resincronización del índice de sugerencias: {e}")
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+class UnixSocketBus(InvalidationBus):
+    """
+    Workers de un mismo host: cada uno escucha en un socket Unix de datagramas
+    dentro de `directory` y publicar es enviar a todos los sockets de ahí.
+    La lista de sockets se guarda y se vuelve a leer del directorio cada
+    `heartbeat` segundos (un worker nuevo empieza a recibir a lo sumo ese
+    tiempo después y lo anterior lo cubre su resincronización). Los de
+    workers muertos se borran al fallar el envío. Si el buffer de un receptor
+    está lleno el datagrama se pierde y el salto de secuencia dispara la
+    resincronización.
+    """
+
+    def __init__(self, directory: str, heartbeat: float = settings.INVALIDATION_BUS_HEARTBEAT_SECONDS):
+        super().__init__(heartbeat)
+        self.directory = directory
+        self.path: Optional[str] = None
+        self._sock: Optional[socket.socket] = None
+        self._peers: List[str] = []
+        self._peers_read_at: Optional[float] = None
+
+    async def start(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self.path = os.path.join(self.directory, f"{os.getpid()}-{self.origin[:8]}.sock")
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        self._sock.setblocking(False)
+        asyncio.get_running_loop().add_reader(self._sock.fileno(), self._on_readable)
+        self._spawn(self._beat())
+
+    async def stop(self) -> None:
+        await super().stop()
+        if self._sock is not None:
+            asyncio.get_running_loop().remove_reader(self._sock.fileno())
+            self._sock.close()
+            self._sock = None
+        if self.path is not None:
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+
+    def _on_readable(self) -> None:
+        while self._sock is not None:
+            try:
+                data = self._sock.recv(65536)
+            except BlockingIOError:
+                return
+            self._receive(data)
+
+    def _read_peers(self) -> None:
+        self._peers = [
+            path for path in (os.path.join(self.directory, name) for name in os.listdir(self.directory))
+            if path.endswith(".sock") and path != self.path
+        ]
+        self._peers_read_at = time.monotonic()
+
+    def _send(self, data: bytes) -> None:
+        if self._sock is None:
+            return
+        if self._peers_read_at is None or time.monotonic() - self._peers_read_at >= self.heartbeat:
+            self._read_peers()
+        for path in list(self._peers):
+            try:
+                self._sock.sendto(data, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                self._peers.remove(path)
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            except OSError as e:
+                # Buffer lleno: el receptor lo detecta por la secuencia
+                logger.warning(f"No se pudo enviar la invalidación a {os.path.basename(path)}: {e}")
+
+
+class PostgresNotifyBus(InvalidationBus):
+    """
+    Workers en varios hosts: LISTEN/NOTIFY de PostgreSQL sobre una conexión
+    asyncpg propia (fuera del pool). Al reconectar se resincroniza, porque
+    las notificaciones de mientras tanto se perdieron.
+    """
+
+    def __init__(
+        self, dsn: str, channel: str, reconnect_interval: float = 1.0,
+        heartbeat: float = settings.INVALIDATION_BUS_HEARTBEAT_SECONDS,
+    ):
+        super().__init__(heartbeat)
+        self.dsn = dsn.replace("+asyncpg", "")
+        self.channel = channel
+        self.reconnect_interval = reconnect_interval
+        self._conn = None
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        self._spawn(self._listen())
+        self._spawn(self._beat())
+
+    async def stop(self) -> None:
+        await super().stop()
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    async def _listen(self) -> None:
+        import asyncpg
+
+        connected_before = False
+        while True:
+            try:
+                conn = await asyncpg.connect(self.dsn)
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _: lost.set())
+                await conn.add_listener(self.channel, self._on_notify)
+                self._conn = conn
+                if connected_before:
+                    self.request_resync()
+                connected_before = True
+                await lost.wait()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Bus de invalidación sin conexión a PostgreSQL: {e}")
+            self._conn = None
+            await asyncio.sleep(self.reconnect_interval)
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        self._receive(payload.encode())
+
+    def _send(self, data: bytes) -> None:
+        self._spawn(self._notify(data.decode()))
+
+    # Sin conexión el mensaje se pierde; los demás lo notan por la secuencia
+    async def _notify(self, payload: str) -> None:
+        if self._conn is None:
+            return
+        try:
+            async with self._lock:
+                await self._conn.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+        except Exception as e:
+            logger.error(f"No se pudo publicar la invalidación: {e}")
+
+
+def create_bus(kind: str = settings.INVALIDATION_BUS) -> InvalidationBus:
+    if kind == "unix":
+        return UnixSocketBus(settings.INVALIDATION_BUS_SOCKET_DIR)
+    if kind == "postgres":
+        return PostgresNotifyBus(settings.DATABASE_URL, settings.INVALIDATION_BUS_CHANNEL)
+    return InvalidationBus()
+
+
+# Instancia global
+invalidation_bus = create_bus()
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from datetime import datetime, UTC
+from typing import List, Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.crud import loan_crud
+from app.db.session import AsyncLocalSession
+
+logger = logging.getLogger("uvicorn.error")
+
+# Marca que se encola al cerrar para que la tarea escriba su lote y termine
+_STOP = object()
+
+metrics.describe("loan_events_written_total", "Eventos de préstamo guardados")
+metrics.describe("loan_events_dropped_total", "Eventos de préstamo descartados (cola llena o error)")
+
+
+class LoanEventWriter:
+    """
+    Escritor en segundo plano del historial de préstamos.
+
+    `record` solo encola (no espera a la BD), así el préstamo no paga la
+    escritura. Una tarea junta los eventos y los inserta en un solo INSERT
+    cuando hay `batch_size` o pasó `flush_interval`. Al cerrar la app, `stop`
+    escribe lo que quede en la cola.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = AsyncLocalSession,
+        batch_size: int = settings.LOAN_EVENTS_BATCH_SIZE,
+        flush_interval: float = settings.LOAN_EVENTS_FLUSH_INTERVAL_MS / 1000,
+        max_queue: int = settings.LOAN_EVENTS_QUEUE_SIZE,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, event: str, user_id: int, book_id: int, copy_id: Optional[int] = None) -> None:
+        try:
+            self._queue.put_nowait({
+                "event": event,
+                "user_id": user_id,
+                "book_id": book_id,
+                "copy_id": copy_id,
+                "occurred_at": datetime.now(UTC),
+            })
+        except asyncio.QueueFull:
+            metrics.inc("loan_events_dropped_total", labels={"reason": "queue_full"})
+            logger.warning(f"Cola de eventos llena, se descarta {event} de libro {book_id}")
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            await self._queue.put(_STOP)
+            await self._task
+        self._task = None
+        await self.flush()
+
+    # Escribe todo lo pendiente en lotes de batch_size
+    async def flush(self) -> None:
+        while not self._queue.empty():
+            batch = [self._queue.get_nowait() for _ in range(min(self.batch_size, self._queue.qsize()))]
+            await self._write(batch)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            if first is _STOP:
+                return
+            batch = [first]
+            stopping = False
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+            if stopping:
+                return
+
+    async def _write(self, batch: List[dict]) -> None:
+        try:
+            async with self.session_factory() as session:
+                await loan_crud.insert_loan_events(session, batch)
+        except Exception as e:
+            metrics.inc("loan_events_dropped_total", len(batch), labels={"reason": "error"})
+            logger.error(f"No se pudieron guardar {len(batch)} eventos de préstamo: {e}")
+            return
+        metrics.inc("loan_events_written_total", len(batch))
+
+
+# Instancia global
+loan_event_writer = LoanEventWriter()
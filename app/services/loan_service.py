@@ -0,0 +1,35 @@
+from typing import List, Optional
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud import loan_crud
+from app.db.models.loan_event import LoanEvent
+from app.services.user_service import user_service
+
+
+class LoanService:
+
+    # Historial de préstamos de un usuario (paginado con before_id = id del último recibido)
+    async def user_history(
+        self, session: AsyncSession, user_id: int, before_id: Optional[int], limit: int
+    ) -> List[LoanEvent]:
+        events = await loan_crud.get_user_loan_events(session, user_id, before_id, limit)
+        # Solo se consulta el usuario si no hay resultados, para distinguir 404 de lista vacía
+        if not events and before_id is None:
+            await user_service.get_by_id_with_validation(session, user_id)
+        return events
+
+    # Libros que el usuario tiene hoy (paginado con after_id = copy_id del último recibido).
+    # validate_user=False cuando el id viene de un token ya verificado
+    async def current_loans(
+        self, session: AsyncSession, user_id: int, after_id: Optional[int], limit: int,
+        validate_user: bool = True
+    ) -> List[Row]:
+        loans = await loan_crud.get_user_borrowed_books(session, user_id, after_id, limit)
+        if validate_user and not loans and after_id is None:
+            await user_service.get_by_id_with_validation(session, user_id)
+        return loans
+
+
+# Instancia global
+loan_service = LoanService()
@@ -0,0 +1,61 @@
+import asyncio
+import logging
+from datetime import datetime, UTC
+from typing import List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.core.scheduler import PeriodicTask
+from app.crud import loan_crud
+from app.db.models.book_copy import BookCopy
+from app.db.session import AsyncLocalSession
+from app.services.loan_events import loan_event_writer
+
+logger = logging.getLogger("uvicorn.error")
+
+metrics.describe("overdue_loans_processed_total", "Préstamos vencidos procesados por el barrido")
+
+
+class OverdueService:
+
+    # Listado de préstamos vencidos paginado por (due_at, id)
+    async def list_overdue(
+        self,
+        session: AsyncSession,
+        after_due_at: Optional[datetime],
+        after_id: Optional[int],
+        limit: int,
+    ) -> List[BookCopy]:
+        return await loan_crud.get_overdue_copies(session, datetime.now(UTC), after_due_at, after_id, limit)
+
+    # Barrido: procesa vencidos en lotes acotados, cada lote en su propia transacción
+    async def sweep(
+        self,
+        session_factory: async_sessionmaker = AsyncLocalSession,
+        batch_size: int = settings.OVERDUE_SWEEP_BATCH_SIZE,
+        max_batches: int = settings.OVERDUE_SWEEP_MAX_BATCHES,
+    ) -> int:
+        processed = 0
+        now = datetime.now(UTC)
+        for _ in range(max_batches):
+            async with session_factory() as session:
+                rows = await loan_crud.mark_overdue_batch(session, now, batch_size)
+            for copy_id, book_id, borrower_id in rows:
+                loan_event_writer.record("overdue", borrower_id, book_id, copy_id)
+            processed += len(rows)
+            if len(rows) < batch_size:
+                break
+            # Deja correr a las peticiones entre lotes
+            await asyncio.sleep(0)
+        if processed:
+            metrics.inc("overdue_loans_processed_total", processed)
+            logger.info(f"Barrido de vencidos: {processed} préstamos procesados")
+        return processed
+
+
+# Instancia global
+overdue_service = OverdueService()
+
+overdue_sweeper = PeriodicTask("overdue-sweep", settings.OVERDUE_SWEEP_INTERVAL_SECONDS, overdue_service.sweep)
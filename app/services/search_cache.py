@@ -0,0 +1,112 @@
+from collections import OrderedDict
+from typing import Hashable, List, Optional, Tuple
+
+from pydantic import TypeAdapter
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.schemas.book import SearchBook, SearchBookOut
+
+metrics.describe("search_cache_requests_total", "Búsquedas de libros atendidas por la caché (hit) o por la BD (miss)")
+metrics.describe("search_cache_hit_ratio", "Proporción de búsquedas atendidas por la caché")
+metrics.describe("search_cache_bytes", "Tamaño aproximado (JSON) de los resultados guardados en la caché")
+
+_results_adapter = TypeAdapter(List[SearchBookOut])
+
+
+# "  El  HOBBIT " -> "el hobbit"; las búsquedas por texto usan ilike, así que la
+# clave y la consulta pueden usar el texto normalizado sin cambiar el resultado
+def _normalize_text(value: Optional[str]) -> Optional[str]:
+    if value is None:
+        return None
+    return " ".join(value.split()).lower() or None
+
+
+def normalize_search(book_search: SearchBook) -> SearchBook:
+    return book_search.model_copy(update={
+        "title": _normalize_text(book_search.title),
+        "author_name": _normalize_text(book_search.author_name),
+    })
+
+
+# Clave estable: pares (campo, valor) ordenados por nombre de campo
+def search_key(book_search: SearchBook) -> Tuple[Tuple[str, Hashable], ...]:
+    return tuple(sorted(book_search.model_dump().items()))
+
+
+class SearchCache:
+    """
+    Caché LRU de resultados de /books/search acotada por bytes.
+
+    Cada entrada guarda la generación del catálogo con la que se calculó.
+    BookService / AuthorService llaman a bump() en cada escritura; una entrada
+    de una generación anterior se descarta recién cuando se la consulta, sin
+    recorrer la caché. Las entradas viejas que nadie consulta salen por LRU.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.generation = 0
+        self._entries: "OrderedDict[tuple, Tuple[int, List[SearchBookOut], int]]" = OrderedDict()
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def bump(self) -> None:
+        self.generation += 1
+
+    def get(self, key: tuple) -> Optional[List[SearchBookOut]]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] != self.generation:
+            self._discard(key)
+            entry = None
+        if entry is None:
+            self._record(hit=False)
+            return None
+        self._entries.move_to_end(key)
+        self._record(hit=True)
+        return entry[1]
+
+    # generation es la que había antes de consultar la BD: si hubo una escritura
+    # en el medio, la entrada ya nace vencida
+    def put(self, key: tuple, generation: int, results: List[SearchBookOut]) -> None:
+        if generation != self.generation:
+            return
+        size = len(_results_adapter.dump_json(results)) + len(repr(key))
+        if size > self.max_bytes:
+            return
+        self._discard(key)
+        self._entries[key] = (generation, results, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            self._discard(next(iter(self._entries)))
+        metrics.set("search_cache_bytes", self._bytes)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+        metrics.set("search_cache_bytes", 0)
+
+    def _discard(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def _record(self, hit: bool) -> None:
+        if hit:
+            self._hits += 1
+        else:
+            self._misses += 1
+        metrics.inc("search_cache_requests_total", labels={"result": "hit" if hit else "miss"})
+        metrics.set("search_cache_hit_ratio", self._hits / (self._hits + self._misses))
+
+
+# Instancia global
+search_cache = SearchCache(settings.SEARCH_CACHE_MAX_BYTES)
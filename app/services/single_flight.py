@@ -0,0 +1,68 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+from app.core.config import settings
+from app.core.metrics import metrics
+
+metrics.describe("single_flight_shared_total", "Lecturas que reutilizaron una consulta idéntica en curso")
+metrics.describe("single_flight_fallbacks_total", "Lecturas que dejaron de esperar al líder y consultaron por su cuenta")
+
+T = TypeVar("T")
+
+
+# El líder se canceló (p. ej. el cliente cortó): sus seguidores consultan solos
+class _LeaderGone(Exception):
+    pass
+
+
+class SingleFlight:
+    """
+    Agrupa lecturas idénticas concurrentes en una sola consulta.
+
+    La primera llamada con una clave (el líder) ejecuta la consulta; las que
+    llegan mientras está en curso esperan su resultado, o su excepción, en
+    lugar de ir a la BD. Un seguidor espera como mucho `timeout` segundos y
+    después consulta por su cuenta, así un líder lento no los frena a todos.
+    La clave se libera al terminar: no es una caché.
+    """
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        leader = self._calls.get(key)
+        if leader is not None:
+            metrics.inc("single_flight_shared_total")
+            try:
+                # shield: si este seguidor se cancela, el líder y los demás siguen
+                return await asyncio.wait_for(asyncio.shield(leader), self.timeout)
+            except (asyncio.TimeoutError, _LeaderGone):
+                metrics.inc("single_flight_fallbacks_total")
+                return await fn()
+
+        future = asyncio.get_running_loop().create_future()
+        # Sin seguidores nadie lee la excepción; se marca como leída
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._calls[key] = future
+        try:
+            result = await fn()
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        except BaseException:
+            future.set_exception(_LeaderGone())
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+
+# Instancia global (la usan BookService y AuthorService)
+single_flight = SingleFlight(settings.SINGLE_FLIGHT_TIMEOUT_MS / 1000)
@@ -0,0 +1,56 @@
+from functools import lru_cache
+from typing import Any, List, Tuple, Type
+
+from fastapi import HTTPException, Response, status
+from pydantic import BaseModel, ConfigDict, TypeAdapter, create_model, field_serializer
+
+from app.db.base import Base
+from app.schemas.batch import Batch
+
+
+# "title,id" -> ("id", "title"): solo campos del schema que son columnas del modelo,
+# en el orden del schema para que cada combinación tenga una sola clave de caché
+def parse_fields(raw: str, schema: Type[BaseModel], model: Type[Base]) -> Tuple[str, ...]:
+    requested = {part.strip() for part in raw.split(",") if part.strip()}
+    allowed = [name for name in schema.model_fields if name in model.__table__.c]
+    unknown = requested.difference(allowed)
+    if unknown or not requested:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_CONTENT,
+            detail=f"Invalid fields {sorted(unknown)}; allowed: {', '.join(allowed)}"
+        )
+    return tuple(name for name in allowed if name in requested)
+
+
+# Modelo con solo `fields`, creado una vez por combinación. Copia los serializers
+# del schema original para que las fechas salgan con el mismo formato
+@lru_cache(maxsize=256)
+def sparse_model(schema: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    serializers = {}
+    for name, decorator in schema.__pydantic_decorators__.field_serializers.items():
+        selected = [f for f in decorator.info.fields if f in fields]
+        if selected:
+            serializers[name] = field_serializer(*selected, mode=decorator.info.mode)(decorator.func)
+    return create_model(  # type: ignore
+        f"{schema.__name__}_{'_'.join(fields)}",
+        __config__=ConfigDict(from_attributes=True),
+        __validators__=serializers,
+        **{name: (schema.model_fields[name].annotation, ...) for name in fields},
+    )
+
+
+@lru_cache(maxsize=768)
+def sparse_adapter(schema: Type[BaseModel], fields: Tuple[str, ...], shape: str) -> TypeAdapter:
+    model = sparse_model(schema, fields)
+    if shape == "many":
+        return TypeAdapter(List[model])  # type: ignore
+    if shape == "batch":
+        return TypeAdapter(Batch[model])  # type: ignore
+    return TypeAdapter(model)
+
+
+# Serializa filas proyectadas directamente a JSON (sin pasar por response_model).
+# shape: "one" = una fila, "many" = lista, "batch" = {"items", "missing"}
+def sparse_response(schema: Type[BaseModel], fields: Tuple[str, ...], content: Any, shape: str = "many") -> Response:
+    adapter = sparse_adapter(schema, fields, shape)
+    return Response(content=adapter.dump_json(adapter.validate_python(content)), media_type="application/json")
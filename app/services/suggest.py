@@ -0,0 +1,241 @@
+import heapq
+import logging
+import re
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter, OrderedDict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.crud import author_crud, book_crud, loan_crud
+from app.db.session import AsyncLocalSession
+
+logger = logging.getLogger("uvicorn.error")
+
+# (clave normalizada, tipo, id); el tipo es "title" o "author"
+Entry = Tuple[str, str, int]
+
+
+# "Agatha  Christie" -> "agatha christie": minúsculas, sin tildes y espacios simples
+def normalize(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return " ".join("".join(c for c in decomposed if not unicodedata.combining(c)).split())
+
+
+# Trigramas como los de pg_trgm: cada palabra con dos espacios delante y uno detrás
+def trigrams(text: str) -> FrozenSet[str]:
+    grams = set()
+    for word in re.findall(r"\w+", normalize(text)):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+class SuggestIndex:
+    """
+    Índice de prefijos en memoria para autocompletar títulos y autores.
+
+    Es un arreglo ordenado de (clave, tipo, id): un prefijo es un rango
+    contiguo que se encuentra con bisect. Cada título o nombre se indexa desde
+    cada palabra ("el hobbit" y "hobbit") para que "hob" lo encuentre.
+    Se construye al arrancar y lo mantienen los servicios en cada escritura;
+    una consulta nunca toca la BD.
+
+    Los prefijos ya resueltos se guardan en una caché LRU de `cache_size`
+    prefijos. Una escritura descarta solo los prefijos de las claves que
+    cambiaron (se buscan directo, sin recorrer la caché). Los préstamos no
+    descartan nada: el orden por popularidad puede quedar un poco viejo y se
+    recalcula cuando la entrada pasa `ranking_max_age` segundos.
+
+    También guarda un índice invertido trigrama -> ids para la búsqueda
+    difusa en SQLite (en PostgreSQL la hace pg_trgm): solo se puntúan los
+    títulos o autores que comparten algún trigrama con la consulta.
+    """
+
+    def __init__(self, cache_size: int = 4096, ranking_max_age: float = 60.0):
+        self._entries: List[Entry] = []
+        self._labels: Dict[Tuple[str, int], str] = {}
+        self._popularity: Dict[Tuple[str, int], int] = {}
+        self._book_author: Dict[int, int] = {}
+        self._author_books: Dict[int, Set[int]] = {}
+        self._grams: Dict[str, Dict[str, Set[int]]] = {"title": {}, "author": {}}
+        self._item_grams: Dict[Tuple[str, int], FrozenSet[str]] = {}
+        # prefijo -> {limit: (momento en que se calculó, resultado)}
+        self._cache: "OrderedDict[str, Dict[int, Tuple[float, List[dict]]]]" = OrderedDict()
+        self._cache_size = cache_size
+        self._ranking_max_age = ranking_max_age
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    @staticmethod
+    def _keys(text: str) -> List[str]:
+        words = normalize(text).split(" ")
+        return list(dict.fromkeys(" ".join(words[i:]) for i in range(len(words)) if words[i]))
+
+    def _add(self, kind: str, item_id: int, text: str) -> None:
+        self._labels[(kind, item_id)] = text
+        self._popularity.setdefault((kind, item_id), 0)
+        for key in self._keys(text):
+            insort(self._entries, (key, kind, item_id))
+        self._add_grams(kind, item_id, text)
+        self._invalidate(kind, item_id)
+
+    def _remove(self, kind: str, item_id: int) -> None:
+        self._invalidate(kind, item_id)
+        text = self._labels.pop((kind, item_id), None)
+        if text is None:
+            return
+        for key in self._keys(text):
+            pos = bisect_left(self._entries, (key, kind, item_id))
+            if pos < len(self._entries) and self._entries[pos] == (key, kind, item_id):
+                del self._entries[pos]
+        postings = self._grams[kind]
+        for gram in self._item_grams.pop((kind, item_id), ()):
+            postings[gram].discard(item_id)
+            if not postings[gram]:
+                del postings[gram]
+
+    def _add_grams(self, kind: str, item_id: int, text: str) -> None:
+        grams = trigrams(text)
+        self._item_grams[(kind, item_id)] = grams
+        postings = self._grams[kind]
+        for gram in grams:
+            postings.setdefault(gram, set()).add(item_id)
+
+    def _set_book_author(self, book_id: int, author_id: Optional[int]) -> None:
+        previous = self._book_author.pop(book_id, None)
+        if previous is not None:
+            self._author_books.get(previous, set()).discard(book_id)
+        if author_id is not None:
+            self._book_author[book_id] = author_id
+            self._author_books.setdefault(author_id, set()).add(book_id)
+
+    # Descarta de la caché los prefijos que pueden incluir a este título o autor:
+    # son los prefijos de sus claves, así que cuesta lo largo del texto y no el
+    # tamaño de la caché
+    def _invalidate(self, kind: str, item_id: int) -> None:
+        text = self._labels.get((kind, item_id))
+        if not self._cache or text is None:
+            return
+        for key in self._keys(text):
+            for end in range(1, len(key) + 1):
+                self._cache.pop(key[:end], None)
+
+    # Carga completa desde books, authors y la cantidad de préstamos por libro
+    async def build(self, session_factory: async_sessionmaker = AsyncLocalSession) -> None:
+        async with session_factory() as session:
+            books = await book_crud.get_books_columns(session, ["title", "author_id"])
+            authors = await author_crud.get_authors_columns(session, ["name"])
+            borrows = await loan_crud.count_borrows_by_book(session)
+
+        fresh = SuggestIndex(self._cache_size, self._ranking_max_age)
+        items = [("title", b.id, b.title) for b in books] + [("author", a.id, a.name) for a in authors]
+        for kind, item_id, text in items:
+            fresh._labels[(kind, item_id)] = text
+            fresh._popularity[(kind, item_id)] = 0
+            fresh._entries.extend((key, kind, item_id) for key in self._keys(text))
+            fresh._add_grams(kind, item_id, text)
+        fresh._entries.sort()
+        for book in books:
+            fresh._set_book_author(book.id, book.author_id)
+        for book_id, count in borrows:
+            if book_id in fresh._book_author:
+                fresh._popularity[("title", book_id)] = count
+                author_key = ("author", fresh._book_author[book_id])
+                if author_key in fresh._popularity:
+                    fresh._popularity[author_key] += count
+
+        # Se reemplaza todo de una vez: las consultas ven el índice viejo o el nuevo
+        self._entries, self._labels = fresh._entries, fresh._labels
+        self._popularity, self._book_author = fresh._popularity, fresh._book_author
+        self._author_books, self._grams, self._item_grams = fresh._author_books, fresh._grams, fresh._item_grams
+        self._cache = OrderedDict()
+        logger.info(f"Índice de sugerencias: {len(books)} libros, {len(authors)} autores")
+
+    # Escrituras (las llaman BookService / AuthorService tras el commit)
+    def put_book(self, book_id: int, title: str, author_id: int) -> None:
+        self._remove("title", book_id)
+        self._add("title", book_id, title)
+        self._set_book_author(book_id, author_id)
+
+    def remove_book(self, book_id: int) -> None:
+        self._remove("title", book_id)
+        self._popularity.pop(("title", book_id), None)
+        self._set_book_author(book_id, None)
+
+    def put_author(self, author_id: int, name: str) -> None:
+        self._remove("author", author_id)
+        self._add("author", author_id, name)
+
+    def remove_author(self, author_id: int) -> None:
+        self._remove("author", author_id)
+        self._popularity.pop(("author", author_id), None)
+        for book_id in list(self._author_books.get(author_id, ())):
+            self.remove_book(book_id)
+        self._author_books.pop(author_id, None)
+
+    def reassign_books(self, from_author_id: int, to_author_id: int) -> None:
+        for book_id in list(self._author_books.get(from_author_id, ())):
+            self._set_book_author(book_id, to_author_id)
+
+    # Un préstamo sube la popularidad del libro y de su autor. No toca la caché:
+    # el nuevo orden se ve cuando vence la entrada (ranking_max_age)
+    def bump(self, book_id: int) -> None:
+        if ("title", book_id) not in self._popularity:
+            return
+        self._popularity[("title", book_id)] += 1
+        author_key = ("author", self._book_author.get(book_id, -1))
+        if author_key in self._popularity:
+            self._popularity[author_key] += 1
+
+    def suggest(self, query: str, limit: int = 10) -> List[dict]:
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        now = time.monotonic()
+        by_limit = self._cache.get(prefix)
+        cached = by_limit.get(limit) if by_limit is not None else None
+        if cached is not None and now - cached[0] < self._ranking_max_age:
+            self._cache.move_to_end(prefix)
+            return cached[1]
+
+        start = bisect_left(self._entries, (prefix,))
+        end = bisect_left(self._entries, (prefix + "\uffff",), start)
+        matches = {(kind, item_id) for _, kind, item_id in self._entries[start:end]}
+        best = heapq.nlargest(
+            limit, matches, key=lambda item: (self._popularity.get(item, 0), -len(self._labels[item]))
+        )
+        result = [{"kind": kind, "id": item_id, "text": self._labels[(kind, item_id)]} for kind, item_id in best]
+
+        if by_limit is None:
+            by_limit = self._cache[prefix] = {}
+            # LRU: sale el prefijo usado hace más tiempo
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(prefix)
+        by_limit[limit] = (now, result)
+        return result
+
+    # Similitud de trigramas (|A ∩ B| / |A ∪ B|, como pg_trgm) contra los títulos o
+    # autores que comparten al menos un trigrama. Devuelve {id: similitud} >= threshold
+    def similar(self, kind: str, text: str, threshold: float) -> Dict[int, float]:
+        query = trigrams(text)
+        postings = self._grams[kind]
+        shared = Counter(item_id for gram in query for item_id in postings.get(gram, ()))
+        scores = {}
+        for item_id, common in shared.items():
+            score = common / (len(query) + len(self._item_grams[(kind, item_id)]) - common)
+            if score >= threshold:
+                scores[item_id] = score
+        return scores
+
+    def books_by_authors(self, author_ids: Iterable[int]) -> Dict[int, int]:
+        return {book_id: author_id for author_id in author_ids for book_id in self._author_books.get(author_id, ())}
+
+
+# Instancia global
+book_suggester = SuggestIndex()
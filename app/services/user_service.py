@@ -2,9 +2,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import HTTPException, status
 from app.crud import user_crud
 from app.db.models.user import User
+from app.exceptions import UserHasLoans
+from app.services.batch import fetch_batch
 from app.core.security import encrypt_password, validate_password
 from sqlalchemy import select
-from typing import Optional
+from typing import List, Optional, Sequence
+from sqlalchemy.engine import Row
 
 
 class UserService:
@@ -50,6 +53,13 @@ class UserService:
             )
         return user
 
+    # ?ids=1,2,3 -> una sola consulta; orden del pedido y lista de ids inexistentes.
+    # Con fields solo se leen esas columnas
+    async def get_many(self, session: AsyncSession, ids: str, fields: Optional[Sequence[str]] = None) -> dict:
+        if fields is None:
+            return await fetch_batch(session, ids, user_crud.get_users_by_ids)
+        return await fetch_batch(session, ids, lambda s, i: user_crud.get_users_columns(s, fields, i))
+
     # Listar todos los usuarios
     async def get_all_users(self, session: AsyncSession):
         users = await user_crud.get_users(session)
@@ -60,6 +70,25 @@ class UserService:
             )
         return users
 
+    # Igual que get_all_users / get_by_id_with_validation pero solo con las columnas de ?fields=
+    async def get_all_users_fields(self, session: AsyncSession, fields: Sequence[str]) -> List[Row]:
+        rows = await user_crud.get_users_columns(session, fields)
+        if not rows:
+            raise HTTPException(
+                status_code=404,
+                detail="No users registered"
+            )
+        return rows
+
+    async def get_by_id_fields(self, session: AsyncSession, user_id: int, fields: Sequence[str]) -> Row:
+        rows = await user_crud.get_users_columns(session, fields, [user_id])
+        if not rows:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User not found"
+            )
+        return rows[0]
+
     # Actualizar usuario
     async def update_user(
         self,
@@ -89,9 +118,11 @@ class UserService:
 
         return await user_crud.update_user(session, user)
 
-    # Eliminar usuario
+    # Eliminar usuario (no se puede si todavía tiene libros prestados)
     async def delete_user(self, session: AsyncSession, user_id: int) -> None:
         user = await self.get_by_id_with_validation(session, user_id)
+        if await user_crud.has_borrowed_copies(session, user_id):
+            raise UserHasLoans()
         await user_crud.delete_user(session, user)
 
 
@@ -0,0 +1,71 @@
+"""
+Micro-benchmark: costo por llamada de las búsquedas por ID con select() nuevo
+en cada llamada vs lambda_stmt cacheado.
+
+Uso:
+    python -m app.test.bench_statements
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.db.base import Base
+from app.db.models import Author, Book, User
+from app.crud import book_crud, user_crud
+from app.schemas.book import SearchBook
+
+ITERATIONS = 5000
+
+
+async def timed(label: str, fn) -> float:
+    for _ in range(200):
+        await fn()
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await fn()
+    per_call = (time.perf_counter() - started) / ITERATIONS * 1e6
+    print(f"{label:<40} {per_call:8.1f} us/llamada")
+    return per_call
+
+
+async def main():
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+    async with factory() as session:
+        author = Author(name="Agatha Christie")
+        session.add(author)
+        await session.flush()
+        session.add_all([Book(title=f"Libro {i}", author_id=author.id, publication_year=1900 + i) for i in range(50)])
+        session.add(User(name="Ana", email="ana@example.com", password_hash="x"))
+        await session.commit()
+
+    async with factory() as session:
+        async def plain_book():
+            result = await session.execute(select(Book).where(Book.id == 7))
+            return result.scalar_one_or_none()
+
+        async def plain_user():
+            result = await session.execute(select(User).where(User.email == "ana@example.com"))
+            return result.scalar_one_or_none()
+
+        search = SearchBook(title="Libro", author_name="Agatha", year=1907)
+
+        await timed("select() get_book_by_id", plain_book)
+        await timed("lambda_stmt get_book_by_id", lambda: book_crud.get_book_by_id(session, 7))
+        await timed("select() get_user_by_email", plain_user)
+        await timed("lambda_stmt get_user_by_email", lambda: user_crud.get_user_by_email(session, "ana@example.com"))
+        await timed("lambda_stmt search_book (3 filtros)", lambda: book_crud.search_book(session, search))
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
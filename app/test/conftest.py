@@ -3,12 +3,14 @@ import asyncio
 import os
 import tempfile
 import pytest
+import pytest_asyncio
 from httpx import AsyncClient
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.exc import OperationalError
 from app.main import app
 from app.db.base import Base
 from app.db.session import get_async_db as real_get_async_db
+from app.services.search_cache import search_cache
 
 # --- Usar un archivo sqlite temporal para pruebas (evita problemas de memoria compartida) ---
 _tmp_file = tempfile.NamedTemporaryFile(prefix="kamina_test_", suffix=".db", delete=False)
@@ -63,3 +65,23 @@ async def client(session: AsyncSession):
 
     # limpiar override para evitar efectos colaterales entre tests
     app.dependency_overrides.pop(real_get_async_db, None)
+
+
+# La caché de búsquedas es global: cada test arranca con la caché vacía
+@pytest.fixture(autouse=True)
+def empty_search_cache():
+    search_cache.clear()
+
+
+# Sesión sobre un sqlite real y limpio por test (para pruebas de la capa CRUD)
+@pytest_asyncio.fixture
+async def db_session(tmp_path):
+    db_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/crud.db")
+    async with db_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    factory = async_sessionmaker(bind=db_engine, expire_on_commit=False, class_=AsyncSession)
+    async with factory() as db:
+        yield db
+
+    await db_engine.dispose()
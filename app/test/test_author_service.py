@@ -113,8 +113,9 @@ async def test_delete_author_success():
     existing_author = Author(id=1, name="Author to delete")
     
     with patch('app.crud.author_crud.get_author_by_id', return_value=existing_author):
-        with patch('app.crud.author_crud.delete_author', return_value=None):
-            await author_service.delete(mock_session, 1)
+        with patch('app.crud.author_crud.has_books', return_value=False):
+            with patch('app.crud.author_crud.delete_author', return_value=None):
+                await author_service.delete(mock_session, 1)
             
     # Verifica que se llamó a la función de eliminación
     # Esto se puede verificar con más detalle en el test del CRUD
@@ -131,3 +132,87 @@ async def test_delete_author_not_found():
             
     assert exc.value.status_code == 404
     assert exc.value.detail == "Author not registered"
+
+
+@pytest.mark.asyncio
+async def test_book_count_follows_book_changes(db_session):
+    """El contador de libros se mantiene al crear, mover y borrar libros"""
+    from app.schemas.book import CreateBook, UpdateBook
+    from app.services.book_service import book_service
+
+    first = await author_service.register(db_session, CreateAuthor(name="Agatha Christie"))
+    second = await author_service.register(db_session, CreateAuthor(name="J. R. R. Tolkien"))
+    first_id, second_id = first.id, second.id
+    books = [
+        await book_service.register(db_session, CreateBook(title=f"Libro {i}", author_id=first_id))
+        for i in range(3)
+    ]
+    book_ids = [b.id for b in books]
+    await book_service.update(db_session, book_ids[0], UpdateBook(author_id=second_id))
+    await book_service.delete(db_session, book_ids[1])
+    db_session.expire_all()
+
+    listing = await author_service.list_detailed(db_session, ["book_count"])
+    detail = await author_service.detail(db_session, first_id, ["books"], books_limit=10)
+
+    assert [(a.id, a.book_count) for a in listing] == [(first_id, 1), (second_id, 1)]
+    assert [b.id for b in detail.books] == [book_ids[2]]
+    assert "book_count" not in detail.model_dump(exclude_unset=True)
+
+
+async def seed_author_books(db, count: int) -> int:
+    from app.db.models import Book
+
+    author = Author(name="Agatha Christie", book_count=count)
+    db.add(author)
+    await db.flush()
+    db.add_all([Book(title=f"Libro {i}", author_id=author.id) for i in range(count)])
+    await db.commit()
+    author_id = author.id
+    db.expire_all()
+    return author_id
+
+
+async def count_delete_statements(db, author_id: int) -> int:
+    from sqlalchemy import event
+
+    statements = []
+    sync_engine = db.bind.sync_engine
+    listener = lambda *args: statements.append(args[2])
+    event.listen(sync_engine, "before_cursor_execute", listener)
+    try:
+        with pytest.raises(HTTPException):
+            await author_service.delete(db, author_id)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", listener)
+    return len(statements)
+
+
+@pytest.mark.asyncio
+async def test_delete_guard_constant_queries(db_session):
+    """La validación cuesta las mismas consultas con 1 o con 200 libros"""
+    few = await seed_author_books(db_session, 1)
+    many = await seed_author_books(db_session, 200)
+
+    assert await count_delete_statements(db_session, few) == await count_delete_statements(db_session, many)
+
+
+@pytest.mark.asyncio
+async def test_delete_reassign_and_cascade(db_session):
+    """Los libros se reasignan o se borran en bloque antes de borrar al autor"""
+    from sqlalchemy import func, select
+    from app.db.models import Book, BookCopy
+
+    source = await seed_author_books(db_session, 3)
+    target = await seed_author_books(db_session, 1)
+
+    await author_service.delete(db_session, source, books="reassign", reassign_to=target)
+    db_session.expire_all()
+    moved = await author_service.detail(db_session, target, ["book_count"], books_limit=1)
+    assert moved.book_count == 4
+
+    db_session.add(BookCopy(book_id=(await db_session.execute(select(Book.id))).scalars().first()))
+    await db_session.commit()
+    await author_service.delete(db_session, target, books="cascade")
+    assert (await db_session.execute(select(func.count()).select_from(Book))).scalar_one() == 0
+    assert (await db_session.execute(select(func.count()).select_from(BookCopy))).scalar_one() == 0
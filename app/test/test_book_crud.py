@@ -0,0 +1,279 @@
+import pytest
+from datetime import datetime, timedelta, UTC
+from sqlalchemy import func, select
+
+from app.crud import book_crud, user_crud
+from app.db.models import Author, Book, BookCopy, User
+from app.schemas.book import SearchBook
+
+DUE = datetime.now(UTC) + timedelta(days=14)
+
+
+async def seed(db):
+    agatha = Author(name="Agatha Christie")
+    tolkien = Author(name="J. R. R. Tolkien")
+    db.add_all([agatha, tolkien])
+    await db.flush()
+    db.add_all([
+        Book(title="Asesinato en el Orient Express", publication_year=1934, author_id=agatha.id),
+        Book(title="Muerte en el Nilo", publication_year=1937, author_id=agatha.id),
+        Book(title="El Hobbit", publication_year=1937, author_id=tolkien.id),
+    ])
+    db.add(User(name="Ana", email="ana@example.com", password_hash="x"))
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_cached_lookups_use_current_parameters(db_session):
+    """Las sentencias cacheadas no reutilizan valores de llamadas anteriores"""
+    await seed(db_session)
+
+    first = await book_crud.get_book_by_id(db_session, 1)
+    second = await book_crud.get_book_by_id(db_session, 3)
+    missing = await book_crud.get_book_by_id(db_session, 99)
+    user = await user_crud.get_user_by_email(db_session, "ana@example.com")
+
+    assert first.title == "Asesinato en el Orient Express"
+    assert second.title == "El Hobbit"
+    assert missing is None
+    assert (await user_crud.get_user_by_id(db_session, user.id)).email == "ana@example.com"
+    assert await user_crud.get_user_by_email(db_session, "otro@example.com") is None
+
+
+@pytest.mark.asyncio
+async def test_search_book_filter_shapes(db_session):
+    """Cada combinación de filtros devuelve los libros correctos"""
+    await seed(db_session)
+
+    by_year = await book_crud.search_book(db_session, SearchBook(year=1937))
+    by_author = await book_crud.search_book(db_session, SearchBook(author_name="agatha"))
+    combined = await book_crud.search_book(db_session, SearchBook(author_name="agatha", year=1937))
+    by_title = await book_crud.search_book(db_session, SearchBook(title="hobbit"))
+    everything = await book_crud.search_book(db_session, SearchBook())
+
+    assert sorted(b.title for b in by_year) == ["El Hobbit", "Muerte en el Nilo"]
+    assert len(by_author) == 2
+    assert [b.title for b in combined] == ["Muerte en el Nilo"]
+    assert [b.title for b in by_title] == ["El Hobbit"]
+    assert len(everything) == 3
+
+
+async def seed_copies(db, copies: int):
+    author = Author(name="Agatha Christie")
+    db.add(author)
+    await db.flush()
+    book = Book(
+        title="Muerte en el Nilo", author_id=author.id, total_copies=copies,
+        copies=[BookCopy() for _ in range(copies)]
+    )
+    users = [User(name=f"U{i}", email=f"u{i}@example.com", password_hash="x") for i in range(copies + 1)]
+    db.add(book)
+    db.add_all(users)
+    await db.commit()
+    return book, users
+
+
+@pytest.mark.asyncio
+async def test_claim_copy_until_exhausted(db_session):
+    """Cada préstamo toma un ejemplar distinto y el contador baja hasta 0"""
+    book, users = await seed_copies(db_session, 2)
+
+    first = await book_crud.claim_copy(db_session, book.id, users[0].id, DUE)
+    second = await book_crud.claim_copy(db_session, book.id, users[1].id, DUE)
+    third = await book_crud.claim_copy(db_session, book.id, users[2].id, DUE)
+
+    assert first[0] != second[0]
+    assert (first[1], second[1]) == (1, 0)
+    assert third is None
+    held = (await db_session.execute(select(func.count()).where(BookCopy.borrower_id.is_not(None)))).scalar_one()
+    assert held == 2
+
+
+@pytest.mark.asyncio
+async def test_release_copy_restores_counter(db_session):
+    """Devolver libera el ejemplar del usuario y suma al contador"""
+    book, users = await seed_copies(db_session, 1)
+    copy_id, _ = await book_crud.claim_copy(db_session, book.id, users[0].id, DUE)
+
+    assert await book_crud.release_copy(db_session, book.id, users[1].id, DUE) is None
+    assert await book_crud.release_copy(db_session, book.id, users[0].id, DUE) == (copy_id, 1, None)
+
+
+@pytest.mark.asyncio
+async def test_remove_free_copies_keeps_borrowed(db_session):
+    """Solo se pueden quitar ejemplares libres"""
+    book, users = await seed_copies(db_session, 3)
+    await book_crud.claim_copy(db_session, book.id, users[0].id, DUE)
+
+    book_id = book.id
+    assert await book_crud.remove_free_copies(db_session, book_id, 3) is False
+    await db_session.rollback()
+    assert await book_crud.remove_free_copies(db_session, book_id, 2) is True
+    await db_session.commit()
+
+    refreshed = await book_crud.get_book_by_id(db_session, book_id)
+    await db_session.refresh(refreshed)
+    assert (refreshed.total_copies, refreshed.available_count) == (1, 0)
+
+
+@pytest.mark.asyncio
+async def test_batch_keeps_request_order(db_session):
+    """La lectura por lotes respeta el orden pedido e informa los ids inexistentes"""
+    from fastapi import HTTPException
+    from app.services.batch import fetch_batch, parse_ids
+
+    await seed(db_session)
+
+    batch = await fetch_batch(db_session, "3,99,1,3", book_crud.get_books_by_ids)
+
+    assert [b.id for b in batch["items"]] == [3, 1]
+    assert batch["missing"] == [99]
+    with pytest.raises(HTTPException):
+        parse_ids(",".join(str(i) for i in range(1000)))
+
+
+@pytest.mark.asyncio
+async def test_sparse_fields_projection(db_session):
+    """?fields= proyecta las columnas en el SELECT y reutiliza el modelo por combinación"""
+    import json
+    from fastapi import HTTPException
+    from app.schemas.book import BookOut
+    from app.schemas.user import UserOut
+    from app.services.sparse import parse_fields, sparse_model, sparse_response
+
+    await seed(db_session)
+    fields = parse_fields("title,id", BookOut, Book)
+    rows = await book_crud.get_books_columns(db_session, fields, [2])
+    users = await user_crud.get_users_columns(db_session, parse_fields("registered_at", UserOut, User))
+
+    assert fields == ("id", "title")
+    assert sparse_model(BookOut, fields) is sparse_model(BookOut, parse_fields("id,title", BookOut, Book))
+    assert json.loads(sparse_response(BookOut, fields, rows).body) == [{"id": 2, "title": "Muerte en el Nilo"}]
+    assert list(json.loads(sparse_response(UserOut, ("registered_at",), users[0], "one").body)) == ["registered_at"]
+    with pytest.raises(HTTPException):
+        parse_fields("password_hash", UserOut, User)
+
+
+@pytest.mark.asyncio
+async def test_search_facets_single_statement(db_session):
+    """Las facetas cuentan sobre el mismo conjunto filtrado"""
+    from app.services.book_service import book_service
+
+    from sqlalchemy import update
+
+    await seed(db_session)
+    await db_session.execute(update(Book).where(Book.id == 2).values(available_count=0))
+    await db_session.commit()
+    db_session.expire_all()
+
+    everything = await book_service.search_with_facets(db_session, SearchBook())
+    agatha = await book_service.search_with_facets(db_session, SearchBook(author_name="agatha"))
+
+    assert [(y.year, y.count) for y in everything.facets.years] == [(1934, 1), (1937, 2)]
+    assert [(a.author_name, a.count) for a in everything.facets.authors] == [("Agatha Christie", 2), ("J. R. R. Tolkien", 1)]
+    assert everything.facets.availability.model_dump() == {"available": 2, "borrowed": 1}
+    assert len(agatha.results) == 2
+    assert [a.author_name for a in agatha.facets.authors] == ["Agatha Christie"]
+    assert agatha.facets.availability.borrowed == 1
+
+
+@pytest.mark.asyncio
+async def test_search_book_ranges_and_keyset_sorts(db_session):
+    """Rango de años, solo disponibles y paginación por keyset en cada orden"""
+    from sqlalchemy import update
+
+    await seed(db_session)
+    db_session.add(Book(title="Sin año", author_id=1))
+    await db_session.execute(update(Book).where(Book.id == 2).values(available_count=0))
+    await db_session.commit()
+    db_session.expire_all()
+
+    async def pages(sort, **filters):
+        seen, after_value, after_id, after_author_id = [], None, None, None
+        while True:
+            page = await book_crud.search_book(db_session, SearchBook(
+                sort=sort, after_value=after_value, after_id=after_id,
+                after_author_id=after_author_id, limit=2, **filters
+            ))
+            if not page:
+                return seen
+            seen += [b.title for b in page]
+            last = page[-1]
+            after_id, after_author_id = last.id, last.author_id
+            after_value = {"title": last.title, "author": last.author.name}.get(sort, str(last.publication_year))
+
+    ranged = await book_crud.search_book(db_session, SearchBook(year_from=1935, year_to=1940))
+    available = await book_crud.search_book(db_session, SearchBook(available_only=True, year_from=1930))
+
+    assert sorted(b.title for b in ranged) == ["El Hobbit", "Muerte en el Nilo"]
+    assert sorted(b.title for b in available) == ["Asesinato en el Orient Express", "El Hobbit"]
+    assert await pages("title") == ["Asesinato en el Orient Express", "El Hobbit", "Muerte en el Nilo", "Sin año"]
+    assert await pages("year") == ["Asesinato en el Orient Express", "Muerte en el Nilo", "El Hobbit"]
+    assert await pages("-year") == ["El Hobbit", "Muerte en el Nilo", "Asesinato en el Orient Express"]
+    assert await pages("author") == ["Asesinato en el Orient Express", "Muerte en el Nilo", "Sin año", "El Hobbit"]
+    assert await pages("title", available_only=True) == ["Asesinato en el Orient Express", "El Hobbit", "Sin año"]
+
+
+@pytest.mark.asyncio
+async def test_author_sort_pages_authors_with_same_name(db_session):
+    """Dos autores con el mismo nombre: el cursor lleva también author_id"""
+    first, second = Author(name="Anónimo"), Author(name="Anónimo")
+    db_session.add_all([first, second])
+    await db_session.flush()
+    db_session.add_all([
+        Book(title="Lazarillo", author_id=second.id),
+        Book(title="Cantar de mio Cid", author_id=first.id),
+    ])
+    await db_session.commit()
+
+    page = await book_crud.search_book(db_session, SearchBook(sort="author", limit=1))
+    rest = await book_crud.search_book(db_session, SearchBook(
+        sort="author", after_value=page[0].author.name, after_id=page[0].id,
+        after_author_id=page[0].author_id, limit=5,
+    ))
+
+    assert [b.title for b in page + rest] == ["Cantar de mio Cid", "Lazarillo"]
+
+
+@pytest.mark.asyncio
+async def test_sorted_search_plans_avoid_temp_btree(db_session):
+    """Cada orden paginado recorre un índice: el plan no ordena en memoria"""
+    from sqlalchemy import event, insert, text
+
+    # Un catálogo con estadísticas (ANALYZE), como en producción
+    authors = [Author(name=f"Autor {i:02d}") for i in range(20)]
+    db_session.add_all(authors)
+    await db_session.flush()
+    await db_session.execute(insert(Book), [
+        dict(title=f"Libro {i:03d}", publication_year=1900 + i % 100, author_id=authors[i % 20].id,
+             total_copies=1, available_count=i % 4 != 0)
+        for i in range(400)
+    ])
+    await db_session.commit()
+    await db_session.execute(text("ANALYZE"))
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("SELECT books"):
+            statements.append((statement, parameters))
+
+    sync_engine = db_session.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", capture)
+    try:
+        for sort in ("title", "year", "-year", "author"):
+            for filters in ({}, {"available_only": True}):
+                for after in (None, "1"):
+                    await book_crud.search_book(db_session, SearchBook(
+                        sort=sort, after_value=after, after_id=0 if after else None,
+                        after_author_id=0 if after else None, limit=5, **filters
+                    ))
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", capture)
+
+    assert len(statements) == 16
+    conn = await db_session.connection()
+    for statement, parameters in statements:
+        plan = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+        details = " | ".join(row[-1] for row in plan)
+        assert "TEMP B-TREE" not in details, f"{statement}\n{details}"
@@ -0,0 +1,97 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from app.db.models import Author, Book, BookCopy, User
+from app.services.book_events import BookEventHub, HEARTBEAT
+from app.services.book_service import book_service
+
+
+async def next_frame(stream):
+    return await asyncio.wait_for(stream.__anext__(), 1)
+
+
+@pytest.mark.asyncio
+async def test_subscribers_share_published_frames():
+    """Cada suscriptor recibe los eventos en orden; sin eventos llega el heartbeat"""
+    hub = BookEventHub(buffer_size=4, max_subscribers=2, heartbeat=0.01)
+    first, second = hub.stream(), hub.stream()
+    await next_frame(first), await next_frame(second)  # retry:
+
+    hub.publish("borrow", {"book_id": 1, "available_count": 0})
+
+    frame = await next_frame(first)
+    assert frame == await next_frame(second)
+    assert frame == b'id: 1\nevent: borrow\ndata: {"book_id": 1, "available_count": 0}\n\n'
+    assert await next_frame(first) == HEARTBEAT
+    assert hub.full()
+    await first.aclose()
+    assert hub.subscribers() == 1
+    await second.aclose()
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_is_dropped():
+    """Un cliente que no lee se desconecta al llenarse su cola; los demás siguen"""
+    hub = BookEventHub(buffer_size=2, max_subscribers=10, heartbeat=10)
+    slow, fast = hub.stream(), hub.stream()
+    await next_frame(slow), await next_frame(fast)
+
+    received = []
+    for i in range(5):
+        hub.publish("return", {"book_id": i, "available_count": 1})
+        received.append(await next_frame(fast))
+
+    assert len(received) == 5
+    assert hub.subscribers() == 1
+    with pytest.raises(StopAsyncIteration):
+        await next_frame(slow)
+
+    hub.close()
+    with pytest.raises(StopAsyncIteration):
+        await next_frame(fast)
+    assert hub.subscribers() == 0
+
+
+@pytest.mark.asyncio
+async def test_borrow_and_return_publish_after_commit(db_session):
+    """borrow / return_book publican el nuevo available_count"""
+    author = Author(name="Agatha Christie")
+    user = User(name="Ana", email="ana@example.com", password_hash="x")
+    db_session.add_all([author, user])
+    await db_session.flush()
+    book = Book(title="Muerte en el Nilo", author_id=author.id, total_copies=1, available_count=1, copies=[BookCopy()])
+    db_session.add(book)
+    await db_session.commit()
+    book_id, user_id = book.id, user.id
+
+    with patch("app.services.invalidation.book_event_hub") as hub:
+        await book_service.borrow(db_session, book_id, user_id)
+        await book_service.return_book(db_session, book_id, user_id)
+
+    assert [c.args for c in hub.publish.call_args_list] == [
+        ("borrow", {"book_id": book_id, "available_count": 0}),
+        ("return", {"book_id": book_id, "available_count": 1}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_copies_update_publishes_availability(db_session):
+    """Cambiar copies publica el nuevo available_count; editar el título no"""
+    from app.schemas.book import UpdateBook
+
+    author = Author(name="Agatha Christie")
+    db_session.add(author)
+    await db_session.flush()
+    book = Book(title="Muerte en el Nilo", author_id=author.id, total_copies=1, available_count=1, copies=[BookCopy()])
+    db_session.add(book)
+    await db_session.commit()
+    book_id = book.id
+
+    with patch("app.services.invalidation.book_event_hub") as hub:
+        await book_service.update(db_session, book_id, UpdateBook(copies=3))
+        await book_service.update(db_session, book_id, UpdateBook(title="Muerte en el Nilo (2da ed.)"))
+
+    assert [c.args for c in hub.publish.call_args_list] == [
+        ("availability", {"book_id": book_id, "available_count": 3}),
+    ]
@@ -1,13 +1,14 @@
 # test_book_service.py
 
 import pytest
-from unittest.mock import AsyncMock, patch
+from unittest.mock import ANY, AsyncMock, patch
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.models.book import Book
 from app.db.models.author import Author
 from app.schemas.book import CreateBook, UpdateBook, SearchBook
 from app.services.book_service import book_service
+from app.exceptions import BookNotAvailable
 
 
 @pytest.mark.asyncio
@@ -141,7 +142,7 @@ async def test_delete_book_success():
 async def test_delete_book_borrowed():
     """Test para eliminar libro que está prestado"""
     mock_session = AsyncMock(spec=AsyncSession)
-    borrowed_book = Book(id=1, title="Book", author_id=1, publication_year=2024, borrower_id=1)
+    borrowed_book = Book(id=1, title="Book", author_id=1, publication_year=2024, total_copies=2, available_count=1)
     
     with patch('app.crud.book_crud.get_book_by_id', return_value=borrowed_book):
         with pytest.raises(HTTPException) as exc:
@@ -186,55 +187,71 @@ async def test_search_books_empty():
 async def test_borrow_book_success():
     """Test para prestar libro exitoso"""
     mock_session = AsyncMock(spec=AsyncSession)
-    fake_book = Book(id=1, title="Book to borrow", author_id=1, publication_year=2024)
+    fake_book = Book(id=1, title="Book to borrow", author_id=1, publication_year=2024, total_copies=3)
     fake_user = type('User', (), {'id': 1, 'name': 'Test User'})()
     
     with patch('app.crud.book_crud.get_book_by_id', return_value=fake_book):
         with patch('app.services.user_service.user_service.get_by_id_with_validation', return_value=fake_user):
-            with patch('app.crud.book_crud.update_book', return_value=fake_book):
+            with patch('app.crud.book_crud.claim_copy', return_value=(10, 2)) as mock_claim:
                 result = await book_service.borrow(mock_session, 1, 1)
                 
-    assert result.borrower_id == 1
+    mock_claim.assert_awaited_once_with(mock_session, 1, 1, ANY)
+    assert result.available_count == 2
+    assert result.total_copies == 3
 
 
 @pytest.mark.asyncio
 async def test_borrow_book_already_borrowed():
-    """Test para prestar libro que ya está prestado"""
+    """Test para prestar libro sin ejemplares disponibles"""
     mock_session = AsyncMock(spec=AsyncSession)
-    borrowed_book = Book(id=1, title="Book", author_id=1, publication_year=2024, borrower_id=2)
+    borrowed_book = Book(id=1, title="Book", author_id=1, publication_year=2024, total_copies=1, available_count=0)
     
     with patch('app.crud.book_crud.get_book_by_id', return_value=borrowed_book):
-        with pytest.raises(HTTPException) as exc:
-            await book_service.borrow(mock_session, 1, 1)
+        with patch('app.crud.book_crud.claim_copy') as mock_claim:
+            with pytest.raises(BookNotAvailable) as exc:
+                await book_service.borrow(mock_session, 1, 1)
             
+    mock_claim.assert_not_called()
     assert exc.value.status_code == 400
-    assert exc.value.detail == "Book is already borrowed"
+
+
+@pytest.mark.asyncio
+async def test_borrow_book_last_copy_taken_concurrently():
+    """Si otro préstamo se llevó el último ejemplar, claim_copy no devuelve nada"""
+    mock_session = AsyncMock(spec=AsyncSession)
+    fake_book = Book(id=1, title="Book", author_id=1, publication_year=2024)
+    
+    with patch('app.crud.book_crud.get_book_by_id', return_value=fake_book):
+        with patch('app.crud.book_crud.claim_copy', return_value=None):
+            with pytest.raises(BookNotAvailable):
+                await book_service.borrow(mock_session, 1, 1)
 
 
 @pytest.mark.asyncio
 async def test_return_book_success():
     """Test para devolver libro exitoso"""
     mock_session = AsyncMock(spec=AsyncSession)
-    fake_book = Book(id=1, title="Book to return", author_id=1, publication_year=2024, borrower_id=1)
+    fake_book = Book(id=1, title="Book to return", author_id=1, publication_year=2024, total_copies=2, available_count=0)
     fake_user = type('User', (), {'id': 1, 'name': 'Test User'})()
     
     with patch('app.crud.book_crud.get_book_by_id', return_value=fake_book):
         with patch('app.services.user_service.user_service.get_by_id_with_validation', return_value=fake_user):
-            with patch('app.crud.book_crud.update_book', return_value=fake_book):
+            with patch('app.crud.book_crud.release_copy', return_value=(10, 1, None)):
                 result = await book_service.return_book(mock_session, 1, 1)
                 
-    assert result.borrower_id is None
+    assert result.available_count == 1
 
 
 @pytest.mark.asyncio
 async def test_return_book_wrong_user():
     """Test para devolver libro por usuario incorrecto"""
     mock_session = AsyncMock(spec=AsyncSession)
-    fake_book = Book(id=1, title="Book", author_id=1, publication_year=2024, borrower_id=2)
+    fake_book = Book(id=1, title="Book", author_id=1, publication_year=2024, available_count=0)
     
     with patch('app.crud.book_crud.get_book_by_id', return_value=fake_book):
-        with pytest.raises(HTTPException) as exc:
-            await book_service.return_book(mock_session, 1, 1)
+        with patch('app.crud.book_crud.release_copy', return_value=None):
+            with pytest.raises(HTTPException) as exc:
+                await book_service.return_book(mock_session, 1, 1)
             
     assert exc.value.status_code == 400
     assert exc.value.detail == "Book not borrowed by this user"
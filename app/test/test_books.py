@@ -33,8 +33,7 @@ async def test_register_book_success(mocker):
         id=1,
         title="Test Book",
         publication_year=2024,
-        author_id=1,
-        borrower_id=None
+        author_id=1
     )
 
     mock_create = mocker.patch(
@@ -0,0 +1,98 @@
+import asyncio
+import gzip
+import json
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.main import app
+from app.db.base import Base
+from app.db.models import Author, Book
+from app.services.catalog_snapshot import CatalogSnapshot
+
+client = TestClient(app)
+
+
+async def make_snapshot(tmp_path, debounce=0.01):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/catalog.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    async with factory() as db:
+        author = Author(name="Agatha Christie")
+        db.add(author)
+        await db.flush()
+        db.add(Book(title="Muerte en el Nilo", author_id=author.id))
+        await db.commit()
+    return engine, CatalogSnapshot(str(tmp_path / "snap" / "catalog.json.gz"), debounce, factory)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_served_from_disk(tmp_path):
+    """El snapshot se sirve con ETag, 304 y rangos"""
+    engine, snapshot = await make_snapshot(tmp_path)
+
+    with patch("app.routers.catalog_router.catalog_snapshot", snapshot):
+        assert client.get("/catalog/snapshot").status_code == 503
+        await snapshot.rebuild()
+        full = client.get("/catalog/snapshot")
+        cached = client.get("/catalog/snapshot", headers={"If-None-Match": full.headers["etag"]})
+        partial = client.get("/catalog/snapshot", headers={"Range": "bytes=0-9"})
+
+    catalog = json.loads(gzip.decompress(full.content))
+    assert [b["title"] for b in catalog["books"]] == ["Muerte en el Nilo"]
+    assert [a["name"] for a in catalog["authors"]] == ["Agatha Christie"]
+    assert full.headers["etag"] == f'"{snapshot.current()[1]}"'
+    assert cached.status_code == 304
+    assert partial.status_code == 206 and partial.content == full.content[:10]
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_writes_are_debounced(tmp_path):
+    """Una ráfaga de escrituras produce una sola reconstrucción"""
+    engine, snapshot = await make_snapshot(tmp_path, debounce=0.05)
+    snapshot.start()
+    await snapshot._task
+    assert snapshot.ready()
+
+    with patch.object(snapshot, "rebuild", wraps=snapshot.rebuild) as rebuild:
+        for _ in range(10):
+            snapshot.mark_dirty()
+        await asyncio.wait_for(snapshot._task, 1)
+
+    assert rebuild.await_count == 1
+    await snapshot.stop()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_single_builder_and_etag_from_disk(tmp_path):
+    """Solo un worker reconstruye; los demás toman el ETag del archivo vigente"""
+    engine, owner = await make_snapshot(tmp_path)
+    other = CatalogSnapshot(str(owner.path), owner.debounce, owner.session_factory)
+    owner.start()
+    other.start()
+    await owner._task
+
+    assert other._task is None
+    assert other.current() == owner.current()
+    first = owner.current()
+
+    # Mismo contenido, mismo ETag; con otro contenido cambia y la versión vieja se conserva
+    await owner.rebuild()
+    assert owner.current() == first
+    async with owner.session_factory() as db:
+        db.add(Author(name="Jorge Luis Borges"))
+        await db.commit()
+    await owner.rebuild()
+    assert other.current()[1] != first[1]
+    assert first[0].exists()
+
+    # Al soltar el lock, lo toma el otro
+    await owner.stop()
+    other.mark_dirty()
+    assert other._task is not None
+    await other.stop()
+    await engine.dispose()
@@ -0,0 +1,94 @@
+import pytest
+from datetime import timedelta
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.db.base import Base
+from app.db.models import Author, Book, Change, User
+from app.schemas.author import CreateAuthor, UpdateAuthor
+from app.schemas.book import CreateBook, UpdateBook
+from app.services.author_service import author_service
+from app.services.book_service import book_service
+from app.services.change_service import change_service
+from app.services.user_service import user_service
+
+
+async def write_catalog(db):
+    agatha = await author_service.register(db, CreateAuthor(name="Agatha Christie"))
+    other = await author_service.register(db, CreateAuthor(name="Otro"))
+    nilo = await book_service.register(db, CreateBook(title="Muerte en el Nilo", author_id=agatha.id, copies=1))
+    ids = agatha.id, other.id, nilo.id
+    await book_service.update(db, nilo.id, UpdateBook(title="Muerte en el Nilo (2da ed.)"))
+    await author_service.update(db, agatha.id, UpdateAuthor(name="Agatha Mary Christie"))
+    await author_service.delete(db, agatha.id, books="reassign", reassign_to=other.id)
+    return ids
+
+
+@pytest.mark.asyncio
+async def test_feed_pages_in_order(db_session):
+    """Cada escritura deja su cambio y el registro se pagina por seq"""
+    agatha, other, nilo = await write_catalog(db_session)
+
+    first = await change_service.feed(db_session, 0, 4)
+    rest = await change_service.feed(db_session, first.next_since, 100)
+    empty = await change_service.feed(db_session, rest.next_since, 100)
+
+    seen = [(c.entity, c.entity_id, c.op) for c in first.changes + rest.changes]
+    assert seen == [
+        ("author", agatha, "upsert"), ("author", other, "upsert"), ("book", nilo, "upsert"),
+        ("book", nilo, "upsert"), ("author", agatha, "upsert"),
+        ("book", nilo, "upsert"), ("author", agatha, "delete"),
+    ]
+    assert first.has_more and not rest.has_more
+    assert empty.changes == [] and empty.next_since == rest.next_since
+
+
+@pytest.mark.asyncio
+async def test_failed_write_leaves_no_change(db_session):
+    """Si la escritura no se confirma tampoco queda el cambio"""
+    from app.exceptions import BookNotAvailable
+
+    author = Author(name="Agatha Christie")
+    db_session.add_all([author, User(name="Ana", email="ana@example.com", password_hash="x")])
+    await db_session.flush()
+    # El contador dice que hay uno libre pero no hay ejemplares: el préstamo falla
+    db_session.add(Book(title="Muerte en el Nilo", author_id=author.id, total_copies=1, available_count=1))
+    await db_session.commit()
+
+    with pytest.raises(BookNotAvailable):
+        await book_service.borrow(db_session, 1, 1)
+    await db_session.rollback()
+
+    assert (await change_service.feed(db_session, 0, 10)).changes == []
+
+
+@pytest.mark.asyncio
+async def test_compaction_keeps_latest_per_entity(tmp_path):
+    """Pasada la retención queda solo el último cambio de cada entidad"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/changes.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    async with factory() as db:
+        agatha, other, nilo = await write_catalog(db)
+
+    assert await change_service.compact(factory, retention=timedelta(days=1)) == 0
+    removed = await change_service.compact(factory, retention=timedelta(seconds=-1))
+
+    async with factory() as db:
+        left = (await db.execute(select(Change.entity, Change.entity_id, Change.op).order_by(Change.id))).all()
+    assert removed == 4
+    assert left == [("author", other, "upsert"), ("book", nilo, "upsert"), ("author", agatha, "delete")]
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_sequence_assigned_after_commit(db_session):
+    """Las escrituras no numeran; el feed numera en orden lo ya confirmado"""
+    await write_catalog(db_session)
+    assert (await db_session.execute(select(Change.seq))).scalars().all() == [None] * 7
+
+    await change_service.feed(db_session, 0, 1)
+    rows = (await db_session.execute(select(Change.id, Change.seq).order_by(Change.id))).all()
+
+    assert [seq for _, seq in rows] == list(range(1, 8))
@@ -0,0 +1,142 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi import HTTPException
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError, InterfaceError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+from app.core.metrics import metrics
+from app.db import session as session_module
+from app.db.circuit import CircuitBreaker, CLOSED, HALF_OPEN, OPEN
+from app.db.session import ResilientSession, get_async_db
+from app.exceptions import DatabaseUnavailable
+
+
+def make_breaker(probe=None, **overrides):
+    options = dict(error_rate=0.5, min_calls=4, window_seconds=60, probe_interval=0.01, half_open_successes=2)
+    options.update(overrides)
+    return CircuitBreaker(probe=probe or AsyncMock(), name="test", **options)
+
+
+def db_error():
+    return OperationalError("SELECT 1", {}, Exception("connection refused"))
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_on_error_rate():
+    """Con la tasa de error superada el circuito se abre y rechaza"""
+    breaker = make_breaker(probe=AsyncMock(side_effect=OSError("caída")))
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.allow() is False
+    assert metrics.get("db_circuit_transitions_total", {"circuit": "test", "from": CLOSED, "to": OPEN}) >= 1
+    breaker._probe_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_breaker_probe_half_open_then_closed():
+    """Una sonda exitosa lleva a semiabierto y los éxitos cierran el circuito"""
+    breaker = make_breaker(min_calls=1)
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    await asyncio.wait_for(breaker._probe_task, 1)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is True
+
+    breaker.record_success()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+
+
+@pytest.mark.asyncio
+async def test_breaker_half_open_failure_reopens():
+    """Un fallo en semiabierto vuelve a abrir el circuito"""
+    breaker = make_breaker(min_calls=1)
+    breaker.record_failure()
+    await asyncio.wait_for(breaker._probe_task, 1)
+
+    breaker.probe = AsyncMock(side_effect=OSError("caída"))
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    breaker._probe_task.cancel()
+
+
+@pytest.mark.asyncio
+async def test_get_async_db_fails_fast_when_open():
+    """Con el circuito abierto no se abre sesión y se responde 503"""
+    with patch.object(session_module.db_breaker, "state", OPEN):
+        with pytest.raises(DatabaseUnavailable) as exc:
+            await get_async_db().__anext__()
+
+    assert isinstance(exc.value, HTTPException)
+    assert exc.value.status_code == 503
+    assert "Retry-After" in exc.value.headers
+
+
+@pytest.mark.asyncio
+async def test_get_async_db_maps_transient_errors_to_503():
+    """Cualquier error transitorio de la BD en la petición responde 503, no 500"""
+    for error in (db_error(), InterfaceError("SELECT 1", {}, Exception("cerrada")), OSError("reset")):
+        dependency = get_async_db()
+        await dependency.__anext__()
+        with pytest.raises(HTTPException) as exc:
+            await dependency.athrow(error)
+        assert exc.value.status_code == 503
+
+
+@pytest.mark.asyncio
+async def test_resilient_session_retries_reads(tmp_path):
+    """Una lectura con errores transitorios se reintenta y cuenta una sola vez en el circuito"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/retry.db")
+    breaker = make_breaker(min_calls=10)
+    real_execute = AsyncSession.execute
+    calls = {"n": 0, "failures": 2}
+
+    async def flaky_execute(self, statement, *args, **kwargs):
+        calls["n"] += 1
+        if calls["n"] <= calls["failures"]:
+            raise db_error()
+        return await real_execute(self, statement, *args, **kwargs)
+
+    with patch.object(ResilientSession, "breaker", breaker), \
+            patch.object(session_module.settings, "DB_RETRY_ATTEMPTS", 2), \
+            patch.object(session_module.settings, "DB_RETRY_BASE_MS", 0):
+        with patch.object(AsyncSession, "execute", flaky_execute):
+            async with ResilientSession(bind=engine) as db:
+                result = await db.execute(select(text("1")))
+            assert result.scalar_one() == 1
+            assert calls["n"] == 3
+            assert [ok for _, ok in breaker._calls] == [True]
+
+            # Sin éxito en ningún intento: un solo fallo
+            calls.update(n=0, failures=10)
+            async with ResilientSession(bind=engine) as db:
+                with pytest.raises(OperationalError):
+                    await db.execute(select(text("1")))
+
+    assert calls["n"] == 3
+    assert [ok for _, ok in breaker._calls] == [True, False]
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_resilient_session_does_not_retry_writes(tmp_path):
+    """Las sentencias que no son SELECT no se reintentan"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/retry.db")
+    breaker = make_breaker(min_calls=10)
+
+    with patch.object(ResilientSession, "breaker", breaker):
+        with patch.object(AsyncSession, "execute", AsyncMock(side_effect=db_error())) as mock_execute:
+            async with ResilientSession(bind=engine) as db:
+                with pytest.raises(OperationalError):
+                    await db.execute(text("DELETE FROM books"))
+
+    assert mock_execute.await_count == 1
+    await engine.dispose()
@@ -0,0 +1,95 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.concurrency import AIMDLimiter, ConcurrencyLimitMiddleware
+from app.core.metrics import metrics
+
+
+def make_limiter(**overrides):
+    options = dict(
+        initial_limit=2, min_limit=1, max_limit=10,
+        latency_target=0.1, queue_size=1, queue_timeout=0.05,
+    )
+    options.update(overrides)
+    return AIMDLimiter(**options)
+
+
+@pytest.mark.asyncio
+async def test_limiter_queues_then_sheds():
+    """Dentro del límite pasa, el exceso espera en cola y el resto se rechaza"""
+    limiter = make_limiter()
+    assert await limiter.acquire()
+    assert await limiter.acquire()
+
+    queued = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert await limiter.acquire() is False  # cola llena
+
+    limiter.release(0.01)
+    assert await queued is True
+    assert limiter.in_flight == 2
+    assert limiter.shed == 1
+
+
+@pytest.mark.asyncio
+async def test_limiter_queue_deadline():
+    """Una petición en cola que no consigue lugar a tiempo se rechaza"""
+    limiter = make_limiter(initial_limit=1)
+    assert await limiter.acquire()
+
+    before = metrics.get("concurrency_shed_total")
+    assert await limiter.acquire() is False
+    assert metrics.get("concurrency_shed_total") == before + 1
+    assert metrics.get("concurrency_queue_depth") == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_adapts_to_latency():
+    """La latencia alta reduce el límite y la baja lo aumenta"""
+    limiter = make_limiter(initial_limit=8)
+
+    await limiter.acquire()
+    limiter.release(1.0)
+    assert limiter.limit == pytest.approx(7.2)
+
+    await limiter.acquire()
+    limiter.release(0.01)
+    assert limiter.limit == pytest.approx(7.2 + 1 / 7.2)
+
+    await limiter.acquire()
+    limiter.release(0.01, failed=True)
+    assert limiter.limit < 7.2
+
+
+def test_middleware_rejects_with_retry_after():
+    """Sin lugar disponible la respuesta es 503 con Retry-After"""
+    limiter = make_limiter(initial_limit=1, min_limit=1, queue_size=0)
+    limiter.in_flight = 1  # simula una petición en curso
+
+    app = FastAPI()
+    app.add_middleware(ConcurrencyLimitMiddleware, limiter=limiter, retry_after=3)
+
+    @app.get("/books")
+    async def books():
+        return []
+
+    @app.get("/health/live")
+    async def live():
+        return {"status": "ok"}
+
+    # Responde desde el SuggestIndex en memoria, no ocupa la BD
+    @app.get("/books/suggest")
+    async def suggest():
+        return []
+
+    client = TestClient(app)
+    rejected = client.get("/books")
+    exempt = client.get("/health/live")
+    suggest_response = client.get("/books/suggest")
+
+    assert rejected.status_code == 503
+    assert rejected.headers["retry-after"] == "3"
+    assert exempt.status_code == 200
+    assert suggest_response.status_code == 200
@@ -0,0 +1,91 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.main import app
+from app.core import lifespan as lifespan_module
+from app.core.lifespan import readiness, warm_up, warm_up_pool, warm_up_until_ready
+from app.db.base import Base
+
+client = TestClient(app)
+
+
+@pytest.mark.asyncio
+async def test_warm_up_pool_opens_connections(tmp_path):
+    """Las conexiones abiertas quedan disponibles en el pool"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/warm.db")
+    opened = await warm_up_pool(engine, 3)
+
+    assert opened == 3
+    assert engine.pool.checkedin() == 3
+    assert engine.pool.checkedout() == 0
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_marks_ready(tmp_path):
+    """Tras un calentamiento correcto el servicio queda listo"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/warm.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+    with patch.object(lifespan_module, "warm_up_argon2", new_callable=AsyncMock):
+        await warm_up(engine, factory)
+
+    assert readiness.ready is True
+    assert readiness.error is None
+    readiness.ready = False
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_warm_up_failure_not_ready():
+    """Si el calentamiento falla, el servicio no se marca como listo"""
+    with patch.object(lifespan_module, "warm_up_pool", side_effect=OSError("sin conexión")):
+        await warm_up()
+
+    assert readiness.ready is False
+    assert readiness.error == "sin conexión"
+
+
+@pytest.mark.asyncio
+async def test_warm_up_retries_until_ready(tmp_path):
+    """Si el calentamiento falla se reintenta con espera hasta quedar listo"""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/retry.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+    with patch.object(lifespan_module, "warm_up_argon2", new_callable=AsyncMock):
+        with patch.object(lifespan_module, "warm_up_pool", side_effect=[OSError("sin conexión"), 1]) as pool:
+            await warm_up_until_ready(engine, factory, base_delay=0, max_delay=0)
+
+    assert pool.call_count == 2
+    assert readiness.ready is True
+    readiness.ready = False
+    await engine.dispose()
+
+
+def test_ready_endpoint_not_ready():
+    """/health/ready responde 503 mientras no terminó el calentamiento"""
+    readiness.ready = False
+    response = client.get("/health/ready")
+
+    assert response.status_code == 503
+    assert response.json()["warmed_up"] is False
+
+
+def test_ready_endpoint_ready():
+    """/health/ready responde 200 cuando está calentado y la BD responde"""
+    readiness.ready = True
+    try:
+        with patch("app.routers.health.ping_database", new_callable=AsyncMock, return_value=True):
+            response = client.get("/health/ready")
+    finally:
+        readiness.ready = False
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "ready"
+    assert "size" in response.json()["pool"]
@@ -0,0 +1,110 @@
+import pytest
+from fastapi import HTTPException
+from unittest.mock import patch
+
+from app.crud import book_crud, hold_crud
+from app.db.models import Author, Book, BookCopy, Hold, User
+from app.services.book_service import book_service
+from app.services.hold_service import hold_service
+from app.test.test_book_crud import DUE
+
+
+async def seed_borrowed(db, waiting: int):
+    author = Author(name="Agatha Christie")
+    db.add(author)
+    await db.flush()
+    book = Book(title="Muerte en el Nilo", author_id=author.id, copies=[BookCopy()])
+    users = [User(name=f"U{i}", email=f"u{i}@example.com", password_hash="x") for i in range(waiting + 1)]
+    db.add(book)
+    db.add_all(users)
+    await db.commit()
+    book_id, user_ids = book.id, [u.id for u in users]
+    await book_crud.claim_copy(db, book_id, user_ids[0], DUE)
+    # Cada petición usa su propia sesión; aquí se descarta el mapa de identidad
+    db.expire_all()
+    return book_id, user_ids
+
+
+@pytest.mark.asyncio
+async def test_hold_positions_are_fifo(db_session):
+    """Las reservas se atienden en orden de llegada"""
+    book_id, user_ids = await seed_borrowed(db_session, 3)
+
+    placed = [await hold_service.place(db_session, book_id, uid) for uid in user_ids[1:]]
+    await hold_service.cancel(db_session, book_id, user_ids[1])
+    last = await hold_service.position(db_session, book_id, user_ids[3])
+
+    assert [h.position for h in placed] == [1, 2, 3]
+    assert last.position == 2
+
+
+@pytest.mark.asyncio
+async def test_duplicate_hold_conflict(db_session):
+    """Un usuario no puede reservar dos veces el mismo libro"""
+    book_id, user_ids = await seed_borrowed(db_session, 1)
+    await hold_service.place(db_session, book_id, user_ids[1])
+
+    with pytest.raises(HTTPException) as exc:
+        await hold_service.place(db_session, book_id, user_ids[1])
+
+    assert exc.value.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_hold_rejected_when_available(db_session):
+    """Si hay ejemplares libres no se reserva"""
+    book_id, user_ids = await seed_borrowed(db_session, 1)
+    await book_crud.release_copy(db_session, book_id, user_ids[0], DUE)
+
+    with pytest.raises(HTTPException) as exc:
+        await hold_service.place(db_session, book_id, user_ids[1])
+
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_return_hands_copy_to_head_of_queue(db_session):
+    """Al devolver, el ejemplar pasa a la primera reserva sin quedar libre"""
+    book_id, user_ids = await seed_borrowed(db_session, 2)
+    await hold_service.place(db_session, book_id, user_ids[1])
+    await hold_service.place(db_session, book_id, user_ids[2])
+
+    with patch("app.services.book_service.loan_event_writer") as writer:
+        book = await book_service.return_book(db_session, book_id, user_ids[0])
+
+    assert book.available_count == 0
+    assert [c.args[:2] for c in writer.record.call_args_list] == [("return", user_ids[0]), ("borrow", user_ids[1])]
+    assert await hold_crud.get_hold(db_session, book_id, user_ids[1]) is None
+    second = await hold_service.position(db_session, book_id, user_ids[2])
+    assert second.position == 1
+    released = await book_crud.release_copy(db_session, book_id, user_ids[1], DUE)
+    assert released[2] == user_ids[2]
+
+
+@pytest.mark.asyncio
+async def test_new_copies_go_to_head_of_queue(db_session):
+    """Los ejemplares agregados pasan a las primeras reservas; el resto queda libre"""
+    from app.schemas.book import UpdateBook
+
+    book_id, user_ids = await seed_borrowed(db_session, 2)
+    await hold_service.place(db_session, book_id, user_ids[1])
+
+    with patch("app.services.book_service.loan_event_writer") as writer:
+        book = await book_service.update(db_session, book_id, UpdateBook(copies=3))
+
+    assert (book.total_copies, book.available_count) == (3, 1)
+    assert [c.args[:2] for c in writer.record.call_args_list] == [("borrow", user_ids[1])]
+    assert await hold_crud.get_hold(db_session, book_id, user_ids[1]) is None
+    assert await book_crud.user_has_copy(db_session, book_id, user_ids[1])
+
+
+@pytest.mark.asyncio
+async def test_hold_rejected_for_current_borrower(db_session):
+    """Quien ya tiene un ejemplar del título no puede hacer cola por él"""
+    book_id, user_ids = await seed_borrowed(db_session, 1)
+
+    with pytest.raises(HTTPException) as exc:
+        await hold_service.place(db_session, book_id, user_ids[0])
+
+    assert exc.value.status_code == 400
+    assert exc.value.detail == "User already has this book"
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+import socket
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.services.invalidation import InvalidationBus, UnixSocketBus
+from app.services.search_cache import search_cache
+
+MESSAGE = {"kind": "book", "op": "update", "id": 1, "title": "El Hobbit", "author_id": 2, "available_count": 1}
+
+
+async def wait_for_calls(mock, count):
+    for _ in range(100):
+        if mock.call_count >= count:
+            return
+        await asyncio.sleep(0.005)
+
+
+@pytest.mark.asyncio
+async def test_unix_bus_reaches_other_workers(tmp_path):
+    """Lo publicado en un worker se aplica en los demás, no dos veces en el propio"""
+    directory = str(tmp_path / "bus")
+    first, second = UnixSocketBus(directory), UnixSocketBus(directory)
+    await first.start()
+    await second.start()
+
+    with patch("app.services.invalidation.apply_invalidation") as apply:
+        first.publish(MESSAGE)
+        await wait_for_calls(apply, 2)
+
+    assert [c.args[0] for c in apply.call_args_list] == [MESSAGE, MESSAGE]
+    await first.stop()
+    await second.stop()
+    assert os.listdir(directory) == []
+
+
+@pytest.mark.asyncio
+async def test_dead_worker_socket_is_removed(tmp_path):
+    """El socket de un worker que murió sin limpiar se borra al publicar"""
+    directory = tmp_path / "bus"
+    directory.mkdir()
+    dead = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    dead.bind(str(directory / "1-dead.sock"))
+    dead.close()
+    bus = UnixSocketBus(str(directory))
+    await bus.start()
+
+    with patch("app.services.invalidation.apply_invalidation"):
+        bus.publish(MESSAGE)
+
+    assert os.listdir(directory) == [os.path.basename(bus.path)]
+    await bus.stop()
+
+
+@pytest.mark.asyncio
+async def test_sequence_gap_triggers_resync():
+    """Si falta un mensaje de un origen se resincroniza en lugar de aplicar"""
+    bus = InvalidationBus()
+
+    def message(seq):
+        return json.dumps({**MESSAGE, "origin": "otro", "seq": seq}).encode()
+
+    with patch("app.services.invalidation.apply_invalidation") as apply, \
+            patch("app.services.invalidation.book_suggester.build", new_callable=AsyncMock) as build:
+        generation = search_cache.generation
+        bus._receive(message(1))
+        bus._receive(message(2))
+        bus._receive(message(4))
+        bus._receive(json.dumps({**MESSAGE, "origin": bus.origin, "seq": 9}).encode())
+        await asyncio.gather(*bus._tasks)
+
+    assert apply.call_count == 2
+    build.assert_awaited_once()
+    assert search_cache.generation > generation
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_reveals_lost_last_message():
+    """Un latido con una secuencia mayor a la recibida delata el último mensaje perdido"""
+    bus = InvalidationBus()
+
+    def received(seq, kind="book"):
+        bus._receive(json.dumps({**MESSAGE, "kind": kind, "origin": "otro", "seq": seq}).encode())
+
+    with patch("app.services.invalidation.apply_invalidation") as apply, \
+            patch("app.services.invalidation.book_suggester.build", new_callable=AsyncMock) as build:
+        received(1)
+        received(1, kind="heartbeat")
+        await asyncio.gather(*bus._tasks)
+        assert build.await_count == 0
+
+        received(2, kind="heartbeat")
+        await asyncio.gather(*bus._tasks)
+        assert build.await_count == 1
+
+        # Lo perdido antes de conocer al origen también cuenta
+        bus._receive(json.dumps({**MESSAGE, "origin": "nuevo", "seq": 3}).encode())
+        await asyncio.gather(*bus._tasks)
+
+    assert apply.call_count == 1
+    assert build.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_unix_bus_caches_peer_list(tmp_path):
+    """La lista de sockets se lee del directorio una vez por intervalo, no por mensaje"""
+    directory = str(tmp_path / "bus")
+    first, second = UnixSocketBus(directory, heartbeat=60), UnixSocketBus(directory, heartbeat=60)
+    await first.start()
+    await second.start()
+
+    with patch("app.services.invalidation.apply_invalidation") as apply, \
+            patch("app.services.invalidation.os.listdir", wraps=os.listdir) as listdir:
+        for _ in range(3):
+            first.publish(MESSAGE)
+        await wait_for_calls(apply, 6)
+
+    assert listdir.call_count == 1
+    assert apply.call_count == 6
+    await first.stop()
+    await second.stop()
@@ -0,0 +1,128 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi import HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.crud import loan_crud
+from app.db.base import Base
+from app.db.models import LoanEvent
+from app.services.loan_events import LoanEventWriter
+from app.services.loan_service import loan_service
+
+
+async def make_factory(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/events.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine, async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+
+async def count_events(factory) -> int:
+    async with factory() as db:
+        return (await db.execute(select(func.count()).select_from(LoanEvent))).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_writer_flushes_by_size(tmp_path):
+    """Al llegar a batch_size se escribe el lote en un solo INSERT"""
+    engine, factory = await make_factory(tmp_path)
+    writer = LoanEventWriter(session_factory=factory, batch_size=3, flush_interval=10, max_queue=100)
+    writer.start()
+
+    with patch("app.crud.loan_crud.insert_loan_events", wraps=loan_crud.insert_loan_events) as spy:
+        for i in range(3):
+            writer.record("borrow", user_id=1, book_id=i, copy_id=i)
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+            if spy.await_count:
+                break
+
+    assert spy.await_count == 1
+    assert len(spy.await_args.args[1]) == 3
+    assert await count_events(factory) == 3
+    await writer.stop()
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_writer_stop_flushes_pending(tmp_path):
+    """Al cerrar se escriben los eventos que quedaban en la cola"""
+    engine, factory = await make_factory(tmp_path)
+    writer = LoanEventWriter(session_factory=factory, batch_size=100, flush_interval=60, max_queue=100)
+    writer.start()
+    for i in range(5):
+        writer.record("return", user_id=2, book_id=i)
+
+    await writer.stop()
+
+    assert writer.pending() == 0
+    assert await count_events(factory) == 5
+    await engine.dispose()
+
+
+def test_writer_drops_when_full():
+    """Con la cola llena se descarta el evento sin bloquear"""
+    writer = LoanEventWriter(session_factory=AsyncMock(), batch_size=10, flush_interval=1, max_queue=1)
+    writer.record("borrow", 1, 1)
+    writer.record("borrow", 1, 2)
+
+    assert writer.pending() == 1
+
+
+@pytest.mark.asyncio
+async def test_user_history_keyset_pagination(db_session):
+    """El historial se pagina hacia atrás con before_id"""
+    await loan_crud.insert_loan_events(db_session, [
+        {"event": "borrow", "user_id": 1, "book_id": i, "copy_id": None, "occurred_at": func.now()}
+        for i in range(5)
+    ] + [{"event": "borrow", "user_id": 2, "book_id": 9, "copy_id": None, "occurred_at": func.now()}])
+
+    first_page = await loan_service.user_history(db_session, 1, None, 2)
+    second_page = await loan_service.user_history(db_session, 1, first_page[-1].id, 2)
+    last_page = await loan_service.user_history(db_session, 1, second_page[-1].id, 2)
+
+    assert [e.book_id for e in first_page] == [4, 3]
+    assert [e.book_id for e in second_page] == [2, 1]
+    assert [e.book_id for e in last_page] == [0]
+
+
+@pytest.mark.asyncio
+async def test_user_history_unknown_user(db_session):
+    """Sin eventos se valida que el usuario exista"""
+    with pytest.raises(HTTPException) as exc:
+        await loan_service.user_history(db_session, 99, None, 10)
+
+    assert exc.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_current_loans_paginated(db_session):
+    """Los libros prestados de un usuario se paginan por copy_id"""
+    from app.crud import book_crud
+    from app.db.models import Author, Book, BookCopy, User
+    from app.test.test_book_crud import DUE
+
+    author = Author(name="Agatha Christie")
+    db_session.add(author)
+    await db_session.flush()
+    books = [Book(title=f"Libro {i}", author_id=author.id, copies=[BookCopy()]) for i in range(3)]
+    users = [User(name="Ana", email="ana@example.com", password_hash="x"),
+             User(name="Beto", email="beto@example.com", password_hash="x")]
+    db_session.add_all(books + users)
+    await db_session.commit()
+    book_ids, (ana, beto) = [b.id for b in books], [u.id for u in users]
+    for book_id in book_ids[:2]:
+        await book_crud.claim_copy(db_session, book_id, ana, DUE)
+    await book_crud.claim_copy(db_session, book_ids[2], beto, DUE)
+
+    first_page = await loan_service.current_loans(db_session, ana, None, 1)
+    second_page = await loan_service.current_loans(db_session, ana, first_page[-1].copy_id, 1)
+    last_page = await loan_service.current_loans(db_session, ana, second_page[-1].copy_id, 1)
+
+    assert [r.id for r in first_page + second_page] == book_ids[:2]
+    assert first_page[0].available_count == 0
+    assert last_page == []
+    with pytest.raises(HTTPException):
+        await loan_service.current_loans(db_session, 99, None, 10)
@@ -0,0 +1,87 @@
+import pytest
+from datetime import datetime, timedelta, UTC
+from unittest.mock import AsyncMock, patch
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.scheduler import PeriodicTask
+from app.db.base import Base
+from app.db.models import Author, Book, BookCopy, User
+from app.services.overdue_service import overdue_service
+
+
+async def seed(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/overdue.db")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+    now = datetime.now(UTC)
+    async with factory() as db:
+        author = Author(name="Agatha Christie")
+        user = User(name="Ana", email="ana@example.com", password_hash="x")
+        db.add_all([author, user])
+        await db.flush()
+        due_dates = [now - timedelta(days=d) for d in (5, 3, 1)] + [now + timedelta(days=3)]
+        book = Book(title="Nilo", author_id=author.id, total_copies=5, available_count=1, copies=[
+            BookCopy(borrower_id=user.id, borrowed_at=now - timedelta(days=20), due_at=due)
+            for due in due_dates
+        ] + [BookCopy()])
+        db.add(book)
+        await db.commit()
+    return engine, factory
+
+
+@pytest.mark.asyncio
+async def test_sweep_processes_overdue_in_batches(tmp_path):
+    """El barrido procesa todos los vencidos en lotes y no repite"""
+    engine, factory = await seed(tmp_path)
+
+    with patch("app.services.overdue_service.loan_event_writer") as writer:
+        first = await overdue_service.sweep(factory, batch_size=2, max_batches=10)
+        second = await overdue_service.sweep(factory, batch_size=2, max_batches=10)
+
+    assert first == 3
+    assert second == 0
+    assert writer.record.call_count == 3
+    assert {c.args[0] for c in writer.record.call_args_list} == {"overdue"}
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_sweep_respects_max_batches(tmp_path):
+    """Cada ejecución procesa como mucho max_batches lotes"""
+    engine, factory = await seed(tmp_path)
+
+    with patch("app.services.overdue_service.loan_event_writer"):
+        processed = await overdue_service.sweep(factory, batch_size=1, max_batches=2)
+
+    assert processed == 2
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_list_overdue_keyset(tmp_path):
+    """El listado de vencidos se pagina por (due_at, id) del más antiguo al más nuevo"""
+    engine, factory = await seed(tmp_path)
+
+    async with factory() as db:
+        first_page = await overdue_service.list_overdue(db, None, None, 2)
+        last = first_page[-1]
+        second_page = await overdue_service.list_overdue(db, last.due_at, last.id, 2)
+
+    assert len(first_page) == 2
+    assert first_page[0].due_at < first_page[1].due_at
+    assert len(second_page) == 1
+    assert second_page[0].due_at > last.due_at
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_periodic_task_survives_errors():
+    """Un error en la tarea periódica se registra y no se propaga"""
+    job = AsyncMock(side_effect=RuntimeError("falló"))
+    task = PeriodicTask("test", 60, job)
+
+    await task.run_once()
+
+    job.assert_awaited_once()
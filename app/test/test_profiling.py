@@ -0,0 +1,70 @@
+import os
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.profiling import ProfilerMiddleware, install_sql_timer
+
+
+def build_app(tmp_path, min_interval=0.0):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/profile.db")
+    install_sql_timer(engine)
+
+    app = FastAPI()
+    app.add_middleware(
+        ProfilerMiddleware,
+        token="secreto",
+        min_interval=min_interval,
+        sample_interval=0.001,
+        output_dir=str(tmp_path / "profiles"),
+    )
+
+    @app.get("/ping")
+    async def ping():
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        return {"ok": True}
+
+    return app
+
+
+def test_profile_with_valid_token(tmp_path):
+    """Con el token correcto se devuelven cabeceras de perfil y se guarda el archivo"""
+    client = TestClient(build_app(tmp_path))
+    response = client.get("/ping", headers={"X-Debug-Profile": "secreto"})
+
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+    assert float(response.headers["x-profile-sql-ms"]) > 0
+    assert int(response.headers["x-profile-sql-statements"]) >= 1
+    assert os.path.exists(tmp_path / "profiles" / f"{profile_id}.collapsed")
+    assert os.path.exists(tmp_path / "profiles" / f"{profile_id}.json")
+
+
+def test_profile_query_flag(tmp_path):
+    """El parámetro ?__profile= funciona igual que la cabecera"""
+    client = TestClient(build_app(tmp_path))
+    response = client.get("/ping", params={"__profile": "secreto"})
+
+    assert "x-profile-id" in response.headers
+
+
+def test_profile_invalid_token_is_ignored(tmp_path):
+    """Un token inválido no perfila la petición"""
+    client = TestClient(build_app(tmp_path))
+    response = client.get("/ping", headers={"X-Debug-Profile": "otro"})
+
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+
+
+def test_profile_rate_limited(tmp_path):
+    """Dentro del intervalo mínimo la segunda petición no se perfila"""
+    client = TestClient(build_app(tmp_path, min_interval=3600))
+    first = client.get("/ping", headers={"X-Debug-Profile": "secreto"})
+    second = client.get("/ping", headers={"X-Debug-Profile": "secreto"})
+
+    assert "x-profile-id" in first.headers
+    assert "x-profile-id" not in second.headers
+    assert second.headers["x-profile"] == "rate-limited"
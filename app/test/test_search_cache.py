@@ -0,0 +1,65 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.metrics import metrics
+from app.db.models import Book
+from app.schemas.book import SearchBook, SearchBookOut
+from app.services.book_service import book_service
+from app.services.search_cache import SearchCache, normalize_search, search_cache, search_key
+
+
+def results(n: int):
+    return [SearchBookOut(
+        id=i, title=f"Libro {i}", publication_year=None, author_name="Ana", total_copies=1, available_count=1
+    ) for i in range(n)]
+
+
+def test_key_is_normalized():
+    """Mayúsculas, espacios y orden de los parámetros no cambian la clave"""
+    a = normalize_search(SearchBook(title="  El   HOBBIT ", year=1937))
+    b = normalize_search(SearchBook(year=1937, title="el hobbit"))
+
+    assert a.title == "el hobbit"
+    assert search_key(a) == search_key(b)
+    assert search_key(a) != search_key(normalize_search(SearchBook(title="el hobbit")))
+
+
+def test_generation_and_byte_bound():
+    """Una escritura invalida sin recorrer la caché y el tamaño se acota en bytes"""
+    cache = SearchCache(max_bytes=2000)
+    cache.put(("a",), cache.generation, results(3))
+    assert cache.get(("a",))[0].title == "Libro 0"
+
+    cache.bump()
+    assert cache.get(("a",)) is None
+    assert cache.size_bytes == 0
+
+    # Resultado calculado antes de una escritura: no se guarda
+    generation = cache.generation
+    cache.bump()
+    cache.put(("b",), generation, results(1))
+    assert len(cache) == 0
+
+    for i in range(20):
+        cache.put((i,), cache.generation, results(3))
+    assert 0 < cache.size_bytes <= 2000
+    assert cache.get((0,)) is None and cache.get((19,)) is not None
+
+
+@pytest.mark.asyncio
+async def test_service_search_uses_cache():
+    """La misma búsqueda normalizada no vuelve a la BD hasta la próxima escritura"""
+    mock_session = AsyncMock(spec=AsyncSession)
+    fake_books = [Book(id=1, title="El Hobbit", author_id=1, publication_year=1937)]
+
+    with patch("app.crud.book_crud.search_book", return_value=fake_books) as crud:
+        await book_service.search(mock_session, SearchBook(title="Hobbit"))
+        again = await book_service.search(mock_session, SearchBook(title=" hobbit "))
+        assert crud.await_count == 1
+        search_cache.bump()
+        await book_service.search(mock_session, SearchBook(title="hobbit"))
+
+    assert crud.await_count == 2
+    assert again[0].title == "El Hobbit"
+    assert 0 < metrics.get("search_cache_hit_ratio") < 1
@@ -0,0 +1,84 @@
+from fastapi import APIRouter, Depends, FastAPI, HTTPException
+from fastapi.testclient import TestClient
+from pydantic import BaseModel, field_validator
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.db.session import EarlyReleaseRoute, track_session
+
+
+def build_app(tmp_path):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/session.db")
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    seen = {}
+
+    async def get_db():
+        async with factory() as session:
+            yield track_session(session)
+
+    # Como get_current_user: usa la sesión pero el endpoint no la recibe
+    async def get_number(session: AsyncSession = Depends(get_db)):
+        result = await session.execute(text("SELECT 7"))
+        return result.scalar_one()
+
+    class Out(BaseModel):
+        value: int
+
+        # Se ejecuta durante la serialización de la respuesta
+        @field_validator("value")
+        def record_pool(cls, value):
+            seen["checked_out_while_serializing"] = engine.pool.checkedout()
+            return value
+
+    router = APIRouter(route_class=EarlyReleaseRoute)
+
+    @router.get("/value", response_model=Out)
+    async def read_value(session: AsyncSession = Depends(get_db)):
+        result = await session.execute(text("SELECT 7"))
+        seen["checked_out_in_handler"] = engine.pool.checkedout()
+        return {"value": result.scalar_one()}
+
+    @router.get("/nested", response_model=Out)
+    async def read_nested(number: int = Depends(get_number)):
+        seen["checked_out_in_handler"] = engine.pool.checkedout()
+        return {"value": number}
+
+    @router.get("/missing")
+    async def missing(session: AsyncSession = Depends(get_db)):
+        raise HTTPException(status_code=404, detail="No existe")
+
+    app = FastAPI()
+    app.include_router(router)
+    return app, engine, seen
+
+
+def test_connection_released_before_serialization(tmp_path):
+    """La conexión vuelve al pool antes de serializar la respuesta"""
+    app, engine, seen = build_app(tmp_path)
+    response = TestClient(app).get("/value")
+
+    assert response.status_code == 200
+    assert response.json() == {"value": 7}
+    assert seen["checked_out_in_handler"] == 1
+    assert seen["checked_out_while_serializing"] == 0
+
+
+def test_sub_dependency_session_released_before_serialization(tmp_path):
+    """La sesión que solo usa una sub-dependencia también se libera antes de serializar"""
+    app, engine, seen = build_app(tmp_path)
+    response = TestClient(app).get("/nested")
+
+    assert response.status_code == 200
+    assert response.json() == {"value": 7}
+    assert seen["checked_out_in_handler"] == 1
+    assert seen["checked_out_while_serializing"] == 0
+
+
+def test_early_failure_never_checks_out(tmp_path):
+    """Un handler que falla antes de consultar nunca toma conexión"""
+    app, engine, seen = build_app(tmp_path)
+    response = TestClient(app).get("/missing")
+
+    assert response.status_code == 404
+    assert engine.pool.checkedout() == 0
+    assert engine.pool.checkedin() == 0
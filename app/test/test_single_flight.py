@@ -0,0 +1,69 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Book
+from app.services.book_service import book_service
+from app.services.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_query():
+    """Las llamadas concurrentes con la misma clave comparten resultado y excepción"""
+    flight = SingleFlight(timeout=1)
+    calls = 0
+
+    async def slow(value):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        if value is None:
+            raise HTTPException(status_code=404)
+        return value
+
+    results = await asyncio.gather(*(flight.do("k", lambda: slow(7)) for _ in range(5)))
+    errors = await asyncio.gather(*(flight.do("k", lambda: slow(None)) for _ in range(3)), return_exceptions=True)
+
+    assert results == [7] * 5
+    assert calls == 2
+    assert all(isinstance(e, HTTPException) for e in errors)
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_followers_stop_waiting_for_slow_or_cancelled_leader():
+    """Un seguidor que espera demasiado, o cuyo líder se cancela, consulta por su cuenta"""
+    flight = SingleFlight(timeout=0.01)
+
+    async def value(v, delay):
+        await asyncio.sleep(delay)
+        return v
+
+    leader = asyncio.create_task(flight.do("k", lambda: value("líder", 1)))
+    await asyncio.sleep(0)
+    assert await flight.do("k", lambda: value("propio", 0)) == "propio"
+
+    flight.timeout = 1
+    follower = asyncio.create_task(flight.do("k", lambda: value("propio", 0)))
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await follower == "propio"
+
+
+@pytest.mark.asyncio
+async def test_consult_by_id_coalesced():
+    """Varias lecturas concurrentes del mismo libro hacen una sola consulta"""
+    mock_session = AsyncMock(spec=AsyncSession)
+    book = Book(id=1, title="El Hobbit", author_id=1)
+
+    async def get_book(session, book_id):
+        await asyncio.sleep(0.01)
+        return book
+
+    with patch("app.crud.book_crud.get_book_by_id", side_effect=get_book) as crud:
+        results = await asyncio.gather(*(book_service.consult_by_id(mock_session, 1) for _ in range(10)))
+
+    assert crud.await_count == 1
+    assert all(r.title == "El Hobbit" for r in results)
@@ -0,0 +1,156 @@
+import pytest
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from app.crud import loan_crud
+from app.db.models import Author, Book
+from app.services.suggest import SuggestIndex, normalize
+
+
+def test_normalize_folds_case_and_accents():
+    """Las claves no distinguen mayúsculas, tildes ni espacios repetidos"""
+    assert normalize("  Gabriel  García Márquez ") == "gabriel garcia marquez"
+
+
+def test_prefix_matches_any_word():
+    """Un prefijo encuentra títulos y autores desde cualquier palabra"""
+    index = SuggestIndex()
+    index.put_author(1, "J. R. R. Tolkien")
+    index.put_book(1, "El Hobbit", 1)
+    index.put_book(2, "Hombres de maíz", 1)
+
+    assert [s["text"] for s in index.suggest("hob")] == ["El Hobbit"]
+    assert {s["id"] for s in index.suggest("ho")} == {1, 2}
+    assert index.suggest("tolk") == [{"kind": "author", "id": 1, "text": "J. R. R. Tolkien"}]
+    assert index.suggest("xyz") == []
+
+
+def test_popularity_orders_and_writes_update():
+    """Los más prestados salen primero y las escrituras se reflejan al instante"""
+    index = SuggestIndex()
+    index.put_book(1, "Muerte en el Nilo", 1)
+    index.put_book(2, "Muerte en la vicaría", 1)
+    assert len(index.suggest("muerte", limit=1)) == 1
+
+    index.bump(2)
+    assert index.suggest("muerte")[0]["id"] == 2
+
+    index.put_book(2, "Asesinato en la vicaría", 1)
+    assert [s["id"] for s in index.suggest("muerte")] == [1]
+    index.remove_book(1)
+    assert index.suggest("muerte") == []
+
+
+def test_loans_reorder_after_max_age():
+    """Un préstamo no descarta la caché; el nuevo orden aparece al vencer la entrada"""
+    index = SuggestIndex(ranking_max_age=3600)
+    index.put_book(1, "Muerte en el Nilo", 1)
+    index.put_book(2, "Muerte en la vicaría", 1)
+    first = index.suggest("muerte", limit=1)[0]["id"]
+
+    index.bump(3 - first)
+    assert index.suggest("muerte", limit=1)[0]["id"] == first
+
+    index._ranking_max_age = 0
+    assert index.suggest("muerte", limit=1)[0]["id"] == 3 - first
+
+
+def test_cache_evicts_least_recently_used():
+    """Con la caché llena sale el prefijo usado hace más tiempo, no toda la caché"""
+    index = SuggestIndex(cache_size=2)
+    index.put_book(1, "El Hobbit", 1)
+    index.suggest("el")
+    index.suggest("hob")
+    index.suggest("el")
+    index.suggest("e")
+
+    assert list(index._cache) == ["el", "e"]
+
+
+@pytest.mark.asyncio
+async def test_build_from_database(db_session):
+    """Al arrancar se carga desde books/authors con la popularidad de los préstamos"""
+    author = Author(name="Agatha Christie")
+    db_session.add(author)
+    await db_session.flush()
+    books = [Book(title="Muerte en el Nilo", author_id=author.id), Book(title="Muerte en la vicaría", author_id=author.id)]
+    db_session.add_all(books)
+    await db_session.commit()
+    await loan_crud.insert_loan_events(db_session, [
+        {"event": "borrow", "user_id": 1, "book_id": books[1].id, "copy_id": None, "occurred_at": func.now()}
+    ])
+
+    index = SuggestIndex()
+    await index.build(async_sessionmaker(bind=db_session.bind, class_=AsyncSession))
+
+    assert len(index) == 3
+    assert index.suggest("muerte")[0]["text"] == "Muerte en la vicaría"
+    assert index.suggest("agatha")[0]["kind"] == "author"
+
+
+@pytest.mark.asyncio
+async def test_fuzzy_search_tolerates_typos(db_session):
+    """La búsqueda difusa encuentra "Agata Cristie" y ordena por similitud"""
+    from fastapi import HTTPException
+    from unittest.mock import patch
+    from app.schemas.book import SearchBook
+    from app.services.book_service import book_service
+
+    agatha, tolkien = Author(name="Agatha Christie"), Author(name="J. R. R. Tolkien")
+    db_session.add_all([agatha, tolkien])
+    await db_session.flush()
+    db_session.add_all([
+        Book(title="Muerte en el Nilo", author_id=agatha.id, publication_year=1937),
+        Book(title="Asesinato en el Orient Express", author_id=agatha.id, publication_year=1934),
+        Book(title="El Hobbit", author_id=tolkien.id, publication_year=1937),
+    ])
+    await db_session.commit()
+    index = SuggestIndex()
+    await index.build(async_sessionmaker(bind=db_session.bind, class_=AsyncSession))
+
+    with patch("app.services.book_service.book_suggester", index):
+        by_author = await book_service.search(db_session, SearchBook(author_name="Agata Cristie", fuzzy=True))
+        by_title = await book_service.search(db_session, SearchBook(title="muerte en el nilo", fuzzy=True))
+        with_year = await book_service.search(db_session, SearchBook(author_name="Agata Cristie", year=1934, fuzzy=True))
+        with pytest.raises(HTTPException):
+            await book_service.search(db_session, SearchBook(title="zzzz", fuzzy=True))
+
+    assert {b.title for b in by_author} == {"Muerte en el Nilo", "Asesinato en el Orient Express"}
+    assert by_title[0].title == "Muerte en el Nilo"
+    assert [b.title for b in with_year] == ["Asesinato en el Orient Express"]
+
+
+@pytest.mark.asyncio
+async def test_fuzzy_search_applies_range_and_availability(db_session):
+    """La búsqueda difusa respeta year_from/year_to y available_only; sort no se admite"""
+    from fastapi import HTTPException
+    from unittest.mock import patch
+    from app.schemas.book import SearchBook
+    from app.services.book_service import book_service
+
+    agatha = Author(name="Agatha Christie")
+    db_session.add(agatha)
+    await db_session.flush()
+    db_session.add_all([
+        Book(title="Muerte en el Nilo", author_id=agatha.id, publication_year=1937, total_copies=1, available_count=0),
+        Book(title="Asesinato en el Orient Express", author_id=agatha.id, publication_year=1934,
+             total_copies=1, available_count=1),
+        Book(title="Telón", author_id=agatha.id, publication_year=1975, total_copies=1, available_count=1),
+    ])
+    await db_session.commit()
+    index = SuggestIndex()
+    await index.build(async_sessionmaker(bind=db_session.bind, class_=AsyncSession))
+
+    with patch("app.services.book_service.book_suggester", index):
+        available = await book_service.search(
+            db_session, SearchBook(author_name="Agata Cristie", available_only=True, fuzzy=True)
+        )
+        ranged = await book_service.search(
+            db_session, SearchBook(author_name="Agata Cristie", year_from=1935, year_to=1980, fuzzy=True)
+        )
+        with pytest.raises(HTTPException) as exc:
+            await book_service.search(db_session, SearchBook(author_name="Agata", sort="title", fuzzy=True))
+
+    assert {b.title for b in available} == {"Asesinato en el Orient Express", "Telón"}
+    assert {b.title for b in ranged} == {"Muerte en el Nilo", "Telón"}
+    assert exc.value.status_code == 400
@@ -196,8 +196,9 @@ async def test_delete_user_success():
     fake_user = User(id=1, name="Test User", email="test@example.com", password_hash="hash")
     
     with patch('app.crud.user_crud.get_user_by_id', return_value=fake_user):
-        with patch('app.crud.user_crud.delete_user', return_value=None):
-            await user_service.delete_user(mock_session, 1)
+        with patch('app.crud.user_crud.has_borrowed_copies', return_value=False):
+            with patch('app.crud.user_crud.delete_user', return_value=None):
+                await user_service.delete_user(mock_session, 1)
             
     # Verifica que se llamó a la función de eliminación
 
@@ -213,3 +214,27 @@ async def test_delete_user_not_found():
             
     assert exc.value.status_code == 404
     assert exc.value.detail == "User not found"
+
+
+@pytest.mark.asyncio
+async def test_delete_user_with_loans(db_session):
+    """No se borra un usuario con libros prestados"""
+    from app.crud import book_crud
+    from app.db.models import Author, Book, BookCopy
+    from app.exceptions import UserHasLoans
+    from app.test.test_book_crud import DUE
+
+    author = Author(name="Agatha Christie")
+    db_session.add(author)
+    await db_session.flush()
+    book = Book(title="Muerte en el Nilo", author_id=author.id, copies=[BookCopy()])
+    user = User(name="Ana", email="ana@example.com", password_hash="x")
+    db_session.add_all([book, user])
+    await db_session.commit()
+    book_id, user_id = book.id, user.id
+    await book_crud.claim_copy(db_session, book_id, user_id, DUE)
+
+    with pytest.raises(UserHasLoans):
+        await user_service.delete_user(db_session, user_id)
+    await book_crud.release_copy(db_session, book_id, user_id, DUE)
+    await user_service.delete_user(db_session, user_id)
@@ -215,6 +215,7 @@ async def test_delete_user_success(mocker):
     fake_user = User(id=1, name="John", email="john@example.com", password_hash="x")
 
     mocker.patch.object(user_service, "get_by_id_with_validation", return_value=fake_user)
+    mocker.patch("app.crud.user_crud.has_borrowed_copies", return_value=False)
     mock_delete = mocker.patch("app.crud.user_crud.delete_user", return_value=None)
 
     result = await user_service.delete_user(session=mock_session, user_id=1)